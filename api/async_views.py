@@ -0,0 +1,200 @@
+"""
+Async versions of the read-heavy JSON endpoints, for serving under ASGI.
+
+They return the same responses as their counterparts in `api.views`, but
+authenticate with `request.auser()` and read through the async ORM, so a
+slow query suspends the request instead of pinning a worker. Work on the
+in-memory indexes, which may rebuild from the database, runs through
+`sync_to_async`.
+"""
+from typing import AsyncIterator
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.forms.models import model_to_dict
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+
+from .catalog import hobby_catalog
+from .compact import compact_response, wants_compact
+from .events import get_backend
+from .friend_graph import friend_graph
+from .friendships import friends_page
+from .models import FriendRequests
+from .response_cache import cache_per_user
+from .routers import replica_reads
+from .serializers import auser_cards, card_fields
+from .similarity import similar_users_page
+from .views import catalog_response, create_hobbies
+
+
+@login_required(login_url='/login/')
+@replica_reads
+@cache_per_user('profile')
+async def get_profile_data(request: HttpRequest) -> JsonResponse:
+    """
+    Async version of `api.views.get_profile_data`.
+    """
+    if request.method == 'GET':
+        user = await request.auser()
+
+        profile_data = model_to_dict(
+            user,
+            fields=['username', 'email', 'first_name', 'last_name', 'date_of_birth', 'friend_count',
+                    'pending_request_count']
+        )
+        profile_data['hobbies'] = [hobby async for hobby in user.hobbies.values_list('id', 'name')]
+        return JsonResponse(profile_data)
+
+    return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+
+@login_required(login_url='/login/')
+@replica_reads
+@cache_per_user('friends')
+async def get_friends_list(request: HttpRequest) -> JsonResponse:
+    """
+    Async version of `api.views.get_friends_list`.
+    """
+    if request.method == 'GET':
+        user = await request.auser()
+
+        try:
+            rows, pagination = await sync_to_async(friends_page)(user, request.GET)
+        except ValidationError as e:
+            return JsonResponse({'error': e.message}, status=400)
+        friend_ids = [friend_id for friend_id, _ in rows]
+
+        if wants_compact(request):
+            cards = await auser_cards(friend_ids, shared_counts=dict(rows), with_hobby_ids=True)
+            return await sync_to_async(compact_response)(
+                request, 'friends', cards, card_fields(shared_hobbies=True), pagination
+            )
+
+        response_data = await auser_cards(friend_ids, shared_counts=dict(rows))
+        return JsonResponse({'friends': response_data, **pagination}, status=200)
+
+    return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+
+@login_required(login_url='/login/')
+@cache_per_user('friend_requests')
+async def get_received_friend_requests(request: HttpRequest) -> JsonResponse:
+    """
+    Async version of `api.views.get_received_friend_requests`.
+    """
+    if request.method == 'GET':
+        user = await request.auser()
+        compact = wants_compact(request)
+
+        incoming_requests = [
+            row async for row in
+            FriendRequests.objects.filter(receiver=user).order_by('id').values_list('id', 'sender_id')
+        ]
+
+        senders = await auser_cards([sender_id for _, sender_id in incoming_requests], with_hobby_ids=compact)
+        response_data = [
+            {'id': request_id, **card}
+            for (request_id, _), card in zip(incoming_requests, senders)
+        ]
+
+        if compact:
+            return await sync_to_async(compact_response)(
+                request, 'friend_requests', response_data, ['id', *card_fields()]
+            )
+
+        return JsonResponse({'friend_requests': response_data}, status=200)
+
+    return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+
+@login_required(login_url='/login/')
+@replica_reads
+async def user_similarity(request: HttpRequest) -> JsonResponse:
+    """
+    Async version of `api.views.user_similarity`.
+    """
+    user = await request.auser()
+    user_hobbies = {hobby_id async for hobby_id in user.hobbies.values_list('id', flat=True)}
+
+    try:
+        rows, pagination = await sync_to_async(similar_users_page)(user.id, user_hobbies, request.GET)
+    except ValidationError as e:
+        return JsonResponse({'error': e.message}, status=400)
+
+    user_ids = [other_id for other_id, _ in rows]
+    mutual_counts = await sync_to_async(friend_graph.mutual_counts)(user.id, user_ids)
+    compact = wants_compact(request)
+    cards = await auser_cards(
+        user_ids, shared_counts=dict(rows), mutual_counts=mutual_counts, with_hobby_ids=compact
+    )
+
+    if compact:
+        return await sync_to_async(compact_response)(
+            request, 'users', cards, card_fields(shared_hobbies=True, mutual_friends=True), pagination
+        )
+    return JsonResponse({'users': cards, **pagination})
+
+
+@login_required(login_url='/login/')
+@replica_reads
+async def hobbies_api(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of `api.views.hobbies_api`.
+    """
+    if request.method == 'GET':
+        try:
+            return catalog_response(request, await sync_to_async(hobby_catalog.snapshot)())
+        except Exception as e:
+            return JsonResponse({"error": str(e)})
+
+    elif request.method == 'POST':
+        try:
+            return await sync_to_async(create_hobbies)(json.loads(request.body))
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
+        except Exception as e:
+            return JsonResponse({"error": str(e)})
+    else:
+        return JsonResponse({"error": "Invalid request method."}, status=405)
+
+
+async def events(request: HttpRequest) -> HttpResponse:
+    """
+    Streams the logged-in user's notifications as Server-Sent Events.
+
+    The session is checked once when the stream opens; after that an idle
+    connection costs no database work, only a comment line every
+    `settings.EVENTS_HEARTBEAT` seconds (default 15) to keep proxies from
+    closing it. Streams end after `settings.EVENTS_MAX_DURATION` seconds
+    (default 300) and browsers reconnect on their own. Needs ASGI.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+
+    # Nothing else reads the database for the rest of the stream
+    await sync_to_async(close_old_connections)()
+
+    response = StreamingHttpResponse(_event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _event_stream(user_id: int) -> AsyncIterator[str]:
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT', 15)
+    closes_at = time.monotonic() + getattr(settings, 'EVENTS_MAX_DURATION', 300)
+
+    yield 'retry: 3000\n\n'
+    async for event in get_backend().listen(user_id, heartbeat):
+        if event is None:
+            yield ': heartbeat\n\n'
+        else:
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        if time.monotonic() >= closes_at:
+            break
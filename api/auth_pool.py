@@ -0,0 +1,152 @@
+"""
+Password verification off the request thread, with throttling of failed logins.
+
+`hashing_pool` runs `authenticate()` in a bounded thread pool. PBKDF2 in
+`hashlib` releases the GIL, so hashes run in parallel, and the pool caps how
+many run at once. When `settings.LOGIN_HASH_QUEUE` logins are already
+waiting, or one waits longer than `settings.LOGIN_HASH_TIMEOUT` seconds,
+`PoolBusy` is raised so the caller can shed load instead of piling up.
+
+`login_throttle` counts failed attempts per (username, IP) in process
+memory and rejects further attempts before any hashing once
+`settings.LOGIN_MAX_FAILURES` fail within `settings.LOGIN_FAILURE_WINDOW`
+seconds.
+
+Verification still goes through the configured authentication backends, so
+`check_password` keeps upgrading stored hashes on a successful login when
+the hasher or its cost changes.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Callable, Optional
+import contextvars
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+# Throttled (username, IP) pairs kept in memory; the oldest are evicted first
+MAX_TRACKED_ATTEMPTS = 100000
+
+
+class PoolBusy(Exception):
+    """
+    Raised when the hashing pool cannot take or finish a task in time.
+    """
+
+
+class HashingPool:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+
+    @staticmethod
+    def workers() -> int:
+        return getattr(settings, 'LOGIN_HASH_WORKERS', None) or os.cpu_count() or 1
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                workers = self.workers()
+                queue = getattr(settings, 'LOGIN_HASH_QUEUE', 32)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-hash')
+                self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, function: Callable, *args, **kwargs):
+        """
+        Runs a function in the pool and waits for its result.
+
+        The function runs in a copy of the caller's context, so context
+        variables such as the request's query recorder and database routing
+        state carry over. Database connections are per thread, so it still
+        uses the pool thread's own connection.
+
+        A task that times out is cancelled, but cancelling only stops tasks
+        that are still queued: a hash that already started runs to the end
+        and keeps its slot until then.
+
+        Raises:
+            PoolBusy: If the pool and its queue are full, or the result takes
+                longer than `settings.LOGIN_HASH_TIMEOUT` seconds.
+        """
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusy("Too many logins in progress.")
+
+        try:
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, _in_worker, function, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is only freed once the task finishes, even if the caller gave up
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=getattr(settings, 'LOGIN_HASH_TIMEOUT', 5))
+        except TimeoutError:
+            future.cancel()
+            raise PoolBusy("Login timed out waiting for the hashing pool.")
+
+
+def _in_worker(function: Callable, *args, **kwargs):
+    # Pool threads outlive requests, so they manage their own connections
+    close_old_connections()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+class LoginThrottle:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._attempts: OrderedDict[tuple[str, str], tuple[int, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(username: str, ip: str) -> tuple[str, str]:
+        return (username or '').casefold(), ip or ''
+
+    def retry_after(self, username: str, ip: str) -> Optional[float]:
+        """
+        Returns how many seconds a throttled username and IP must wait, or
+        None if they may try to log in.
+        """
+        window = getattr(settings, 'LOGIN_FAILURE_WINDOW', 300)
+        key = self._key(username, ip)
+        with self._lock:
+            failures, first_failure = self._attempts.get(key, (0, 0.0))
+            remaining = first_failure + window - time.monotonic()
+            if remaining <= 0:
+                self._attempts.pop(key, None)
+                return None
+            if failures >= getattr(settings, 'LOGIN_MAX_FAILURES', 5):
+                return remaining
+        return None
+
+    def record_failure(self, username: str, ip: str) -> None:
+        window = getattr(settings, 'LOGIN_FAILURE_WINDOW', 300)
+        key = self._key(username, ip)
+        now = time.monotonic()
+        with self._lock:
+            failures, first_failure = self._attempts.pop(key, (0, now))
+            if now - first_failure >= window:
+                failures, first_failure = 0, now
+            self._attempts[key] = (failures + 1, first_failure)
+            while len(self._attempts) > MAX_TRACKED_ATTEMPTS:
+                self._attempts.popitem(last=False)
+
+    def record_success(self, username: str, ip: str) -> None:
+        with self._lock:
+            self._attempts.pop(self._key(username, ip), None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._attempts.clear()
+
+
+hashing_pool = HashingPool()
+login_throttle = LoginThrottle()
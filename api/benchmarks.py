@@ -0,0 +1,258 @@
+"""
+Endpoint benchmarks run through the Django test client.
+
+Each benchmark logs in as a sample of users and requests one endpoint
+repeatedly, recording latency percentiles and query counts. Results can be
+compared with a stored baseline to catch regressions; see the
+`benchmark_endpoints` management command.
+
+`run_concurrent` instead drives a running server over HTTP with many
+concurrent clients, to compare the sync and async versions of an endpoint;
+see the `benchmark_concurrency` management command.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from statistics import mean
+from typing import Callable, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+import http.client
+import json
+import threading
+import time
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .friendships import delete_friend_requests
+from .models import User, FriendRequests
+from .response_cache import response_cache
+
+
+class Benchmark:
+    """
+    One endpoint to benchmark.
+
+    `build` receives the requesting user and returns the method, URL and
+    optional JSON body of a request. `cleanup` undoes any writes made by
+    the request, so that every iteration starts from the same state.
+    """
+
+    def __init__(self, name: str, build: Callable[[User], tuple[str, str, Optional[dict]]],
+                 cleanup: Optional[Callable[[User], None]] = None) -> None:
+        self.name = name
+        self.build = build
+        self.cleanup = cleanup
+
+
+def _get(url_name: str, query: str = '') -> Callable[[User], tuple[str, str, None]]:
+    return lambda user: ('GET', reverse(f'api:{url_name}') + query, None)
+
+
+def _friend_request_target(user: User) -> tuple[str, str, dict]:
+    # Pick someone who is neither a friend nor already asked
+    target = (
+        User.objects.exclude(id=user.id)
+        .exclude(id__in=user.friends_list.values('id'))
+        .exclude(id__in=FriendRequests.objects.filter(sender=user).values('receiver_id'))
+        .order_by('?')
+        .values_list('username', flat=True)
+        .first()
+    )
+    return 'POST', reverse('api:send_friend_request'), {'username': target}
+
+
+def _undo_friend_request(user: User) -> None:
+    latest = FriendRequests.objects.filter(sender=user).order_by('-id')[:1].get()
+    delete_friend_requests(FriendRequests.objects.filter(id=latest.id))
+
+
+BENCHMARKS = [
+    Benchmark('user_similarity', _get('similar_users', '?page=1')),
+    Benchmark('user_similarity_deep_page', _get('similar_users', '?page=20')),
+    Benchmark('user_similarity_cursor', _get('similar_users', '?cursor=')),
+    Benchmark('user_similarity_compact', _get('similar_users', '?page=1&format=compact')),
+    Benchmark('get_friends_list', _get('friends_list')),
+    Benchmark('get_friends_list_compact', _get('friends_list', '?format=compact')),
+    Benchmark('get_received_friend_requests', _get('get_received_friend_requests')),
+    Benchmark('get_received_friend_requests_compact', _get('get_received_friend_requests', '?format=compact')),
+    Benchmark('get_profile_data', _get('get_profile_data')),
+    Benchmark('hobbies_api', _get('hobbies_api')),
+    Benchmark('people_you_may_know', _get('people_you_may_know')),
+    Benchmark('send_friend_request', _friend_request_target, _undo_friend_request),
+]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[position]
+
+
+@contextmanager
+def capture_queries() -> Iterator[list]:
+    """
+    Captures the queries run on every database alias, such as the replica.
+
+    Yields:
+        list: One `CaptureQueriesContext` per connection; the captured
+        queries can be counted once the block exits.
+    """
+    contexts = []
+    seen = set()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            # Test mirrors may share one connection between aliases
+            if id(connection) not in seen:
+                seen.add(id(connection))
+                contexts.append(stack.enter_context(CaptureQueriesContext(connection)))
+        yield contexts
+
+
+def run_benchmark(benchmark: Benchmark, users: Iterable[User], iterations: int) -> dict:
+    """
+    Runs one benchmark for each user and summarises every request made.
+
+    Returns:
+        dict: Latency percentiles in milliseconds, query counts and the
+        mean response size in bytes.
+    """
+    latencies, query_counts, sizes = [], [], []
+
+    for user in users:
+        client = Client()
+        client.force_login(user)
+
+        # Warm up caches and lazily built indexes before measuring
+        method, url, body = benchmark.build(user)
+        _request(client, method, url, body)
+        if benchmark.cleanup:
+            benchmark.cleanup(user)
+
+        for _ in range(iterations):
+            method, url, body = benchmark.build(user)
+            # Measure the views themselves rather than cached responses
+            response_cache.clear()
+            with capture_queries() as captured:
+                started = time.perf_counter()
+                response = _request(client, method, url, body)
+                latencies.append((time.perf_counter() - started) * 1000)
+            query_counts.append(sum(len(queries) for queries in captured))
+            sizes.append(len(response.content))
+
+            if response.status_code >= 500:
+                raise RuntimeError(f"{benchmark.name} returned {response.status_code}.")
+            if benchmark.cleanup:
+                benchmark.cleanup(user)
+
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p90_ms': round(percentile(latencies, 0.90), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(mean(latencies), 3),
+        'queries_p50': percentile(query_counts, 0.50),
+        'queries_max': max(query_counts),
+        'bytes_mean': round(mean(sizes)),
+    }
+
+
+def _request(client: Client, method: str, url: str, body: Optional[dict]):
+    if method == 'GET':
+        return client.get(url)
+    return client.generic(method, url, json.dumps(body), content_type='application/json')
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compares results with a baseline.
+
+    A benchmark regresses when its p90 latency grows by more than
+    `tolerance` (a fraction) or when it issues more queries than before.
+
+    Returns:
+        list[str]: A description of every regression found.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['p90_ms'] > previous['p90_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p90 {result['p90_ms']:.2f}ms exceeds baseline {previous['p90_ms']:.2f}ms "
+                f"by more than {tolerance:.0%}"
+            )
+        if result['queries_max'] > previous['queries_max']:
+            regressions.append(
+                f"{name}: {result['queries_max']} queries exceeds baseline {previous['queries_max']}"
+            )
+    return regressions
+
+
+# (name, sync URL name, async URL name, query string) of each endpoint pair
+CONCURRENCY_PAIRS = [
+    ('get_profile_data', 'get_profile_data', 'async_get_profile_data', ''),
+    ('get_friends_list', 'friends_list', 'async_friends_list', ''),
+    ('get_received_friend_requests', 'get_received_friend_requests', 'async_get_received_friend_requests', ''),
+    ('user_similarity', 'similar_users', 'async_similar_users', '?page=1'),
+    ('hobbies_api', 'hobbies_api', 'async_hobbies_api', ''),
+]
+
+
+def run_concurrent(base_url: str, path: str, cookies: list[str], clients: int, duration: float) -> dict:
+    """
+    Requests one path from a running server with `clients` concurrent clients.
+
+    Each client keeps its own connection open and sends requests back to
+    back for `duration` seconds, using the session cookies in turn.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and error count.
+    """
+    target = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients)
+
+    def client(number: int) -> None:
+        nonlocal errors
+        cookie = cookies[number % len(cookies)]
+        connection = connection_class(target.hostname, target.port, timeout=30)
+        local_latencies, local_errors = [], 0
+
+        start_barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers={'Cookie': cookie})
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = connection_class(target.hostname, target.port, timeout=30)
+                continue
+            local_latencies.append((time.perf_counter() - started) * 1000)
+        connection.close()
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, range(clients)))
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+    }
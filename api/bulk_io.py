@@ -0,0 +1,369 @@
+"""
+Streaming bulk import and export of users with their hobbies and friends.
+
+Each record is one user, with the hobby names and friend usernames it links
+to. Records are read and written in fixed-size chunks, so the file is never
+held in memory as a whole; an import does keep the IDs of the hobbies it has
+seen and the friend links waiting for users later in the file:
+
+- JSONL: one JSON object per line, with `hobbies` and `friends` as lists.
+- CSV: a header row of `FIELDS`, with `hobbies` and `friends` joined by `|`.
+  A `|` or `\\` inside a name is escaped with a backslash (see `join_list`).
+
+The password is imported as is when it is already a hash produced by one of
+`settings.PASSWORD_HASHERS`, hashed when it is plain text, and made unusable
+when it is empty. Export always writes the stored hash.
+
+Imports write with `bulk_create`, so no signals are sent; the in-memory
+indexes of running workers catch up when their TTLs expire.
+"""
+from collections import Counter
+from datetime import date
+from itertools import islice
+from typing import IO, Iterable, Iterator, NamedTuple, Optional, Union
+import csv
+import json
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .catalog import clean_hobby_name, hobbies_by_key, hobby_key
+from .friendships import adjust_counters
+from .models import User
+
+FIELDS = ('username', 'email', 'first_name', 'last_name', 'date_of_birth', 'password', 'hobbies', 'friends')
+LIST_FIELDS = ('hobbies', 'friends')
+LIST_SEPARATOR = '|'
+
+# Invalid records reported in detail by an import; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+def format_from_path(path: str) -> Optional[str]:
+    """
+    Returns 'csv' or 'jsonl' from a file name, or None if it has neither
+    extension.
+    """
+    for fmt in ('csv', 'jsonl'):
+        if path.endswith(f'.{fmt}'):
+            return fmt
+    return None
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class InvalidRecord(NamedTuple):
+    """
+    A record that could not be read, such as a JSONL line that is not a
+    JSON object.
+    """
+    error: str
+
+
+def join_list(items: Iterable[str]) -> str:
+    """
+    Joins the items of a CSV list field with `LIST_SEPARATOR`, escaping
+    separators and backslashes within items with a backslash.
+    """
+    return LIST_SEPARATOR.join(
+        item.replace('\\', '\\\\').replace(LIST_SEPARATOR, '\\' + LIST_SEPARATOR) for item in items
+    )
+
+
+def split_list(value: str) -> list[str]:
+    """
+    Splits a CSV list field written by `join_list`, skipping empty items.
+
+    A backslash that does not escape a separator or a backslash is kept, so
+    hand-written lists need no escaping unless a name contains `|`.
+    """
+    items, current = [], []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            following = next(chars, '')
+            current.append(following if following in (LIST_SEPARATOR, '\\') else char + following)
+        elif char == LIST_SEPARATOR:
+            items.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append(''.join(current))
+    return [item for item in items if item]
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Union[dict, InvalidRecord]]:
+    """
+    Reads user records from a CSV or JSONL stream, one at a time.
+
+    JSONL lines that are not JSON objects are yielded as `InvalidRecord`s,
+    so that the import can report them and carry on.
+    """
+    if fmt == 'jsonl':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidRecord(f"line {number}: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield InvalidRecord(f"line {number}: not a JSON object")
+                continue
+            yield record
+    elif fmt == 'csv':
+        for row in csv.DictReader(stream):
+            for field in LIST_FIELDS:
+                row[field] = split_list(row.get(field) or '')
+            yield row
+    else:
+        raise ValueError(f"Unknown format {fmt!r}.")
+
+
+def write_records(stream: IO[str], fmt: str, records: Iterable[dict]) -> int:
+    """
+    Writes user records to a CSV or JSONL stream.
+
+    Returns:
+        int: The number of records written.
+    """
+    written = 0
+    if fmt == 'jsonl':
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            written += 1
+    elif fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({
+                **record,
+                **{field: join_list(record[field]) for field in LIST_FIELDS},
+            })
+            written += 1
+    else:
+        raise ValueError(f"Unknown format {fmt!r}.")
+    return written
+
+
+def export_records(chunk_size: int = 2000) -> Iterator[dict]:
+    """
+    Streams every user as a record, reading one chunk of users at a time.
+
+    Friendships are written from both sides, so each user's record lists
+    all of their friends.
+    """
+    users = User.objects.order_by('id').values_list(
+        'id', 'username', 'email', 'first_name', 'last_name', 'date_of_birth', 'password'
+    )
+    for chunk in chunked(users.iterator(chunk_size=chunk_size), chunk_size):
+        user_ids = [row[0] for row in chunk]
+
+        hobbies: dict[int, list[str]] = {}
+        hobby_rows = (
+            User.hobbies.through.objects.filter(user_id__in=user_ids)
+            .order_by('user_id', 'hobby_id').values_list('user_id', 'hobby__name')
+        )
+        for user_id, name in hobby_rows:
+            hobbies.setdefault(user_id, []).append(name)
+
+        friends: dict[int, list[str]] = {}
+        friend_rows = (
+            User.friends_list.through.objects.filter(from_user_id__in=user_ids)
+            .order_by('from_user_id', 'to_user_id').values_list('from_user_id', 'to_user__username')
+        )
+        for user_id, username in friend_rows:
+            friends.setdefault(user_id, []).append(username)
+
+        for user_id, username, email, first_name, last_name, dob, password in chunk:
+            yield {
+                'username': username,
+                'email': email,
+                'first_name': first_name,
+                'last_name': last_name,
+                'date_of_birth': dob.isoformat() if dob else '',
+                'password': password,
+                'hobbies': hobbies.get(user_id, []),
+                'friends': friends.get(user_id, []),
+            }
+
+
+def password_hash(password: Optional[str]) -> str:
+    """
+    Returns a stored password hash, hashing the password only if it is not
+    a hash already.
+    """
+    if not password:
+        return make_password(None)
+    try:
+        identify_hasher(password)
+        return password
+    except ValueError:
+        return make_password(password)
+
+
+class UserImporter:
+    """
+    Imports user records chunk by chunk.
+
+    Users whose username already exists are skipped. Friends are linked
+    when both users exist; a friend who only appears later in the file is
+    linked when their record arrives. Between chunks, the importer keeps
+    those pending links and the IDs of the hobbies it has resolved, which
+    grow with the number of distinct names in the file.
+    """
+
+    def __init__(self) -> None:
+        self.created = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.errors: list[str] = []
+        self.hobby_links = 0
+        self.friendships = 0
+        self.unresolved_hobbies = 0
+        self._hobby_ids: dict[str, int] = {}
+        self._pending_friends: dict[str, set[int]] = {}
+
+    def import_chunk(self, records: list[dict]) -> None:
+        with transaction.atomic():
+            users, links = self._create_users(records)
+            if not users:
+                return
+            self._link_hobbies(users, links)
+            self._link_friends(users, links)
+
+    @property
+    def unresolved_friends(self) -> int:
+        return sum(len(user_ids) for user_ids in self._pending_friends.values())
+
+    def _report(self, error: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+    def _create_users(self, records: list[Union[dict, InvalidRecord]]) -> tuple[dict[str, int], dict[str, dict]]:
+        new_users, links = [], {}
+        for record in records:
+            if isinstance(record, InvalidRecord):
+                self.invalid += 1
+                self._report(record.error)
+                continue
+            try:
+                user = self._build_user(record)
+            except (ValidationError, ValueError) as e:
+                self.invalid += 1
+                username = record.get('username')
+                self._report(f"{username if isinstance(username, str) and username else '?'}: {e}")
+                continue
+            if user.username in links:
+                self.skipped += 1
+                continue
+            new_users.append(user)
+            links[user.username] = record
+
+        existing = set(User.objects.filter(username__in=list(links)).values_list('username', flat=True))
+        new_users = [user for user in new_users if user.username not in existing]
+
+        # Conflicts, such as a taken email, are skipped rather than aborting the chunk
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        created = dict(
+            User.objects.filter(username__in=[user.username for user in new_users]).values_list('username', 'id')
+        )
+
+        self.created += len(created)
+        self.skipped += len(links) - len(created)
+        return created, {username: links[username] for username in created}
+
+    @staticmethod
+    def _build_user(record: dict) -> User:
+        def text(field: str) -> str:
+            value = record.get(field) or ''
+            if not isinstance(value, str):
+                raise ValidationError(f"{field} must be a string.")
+            return value
+
+        for field in LIST_FIELDS:
+            items = record.get(field) or []
+            if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                raise ValidationError(f"{field} must be a list of strings.")
+        for name in record.get('hobbies') or ():
+            clean_hobby_name(name)
+
+        username = text('username').strip()
+        if not username:
+            raise ValidationError("username is required.")
+        email = text('email').strip()
+        validate_email(email)
+        dob = text('date_of_birth') or None
+
+        return User(
+            username=username,
+            email=email,
+            first_name=text('first_name'),
+            last_name=text('last_name'),
+            date_of_birth=date.fromisoformat(dob) if dob else None,
+            password=password_hash(text('password')),
+        )
+
+    def _link_hobbies(self, users: dict[str, int], records: dict[str, dict]) -> None:
+        missing: dict[str, str] = {}
+        for record in records.values():
+            for name in record.get('hobbies') or ():
+                key = hobby_key(name)
+                if key not in self._hobby_ids:
+                    # New hobbies keep the first spelling in the file
+                    missing.setdefault(key, name)
+        if missing:
+            for key, (hobby_id, _, _) in hobbies_by_key(missing.values()).items():
+                self._hobby_ids[key] = hobby_id
+
+        Through = User.hobbies.through
+        links = set()
+        for username, record in records.items():
+            for name in record.get('hobbies') or ():
+                hobby_id = self._hobby_ids.get(hobby_key(name))
+                if hobby_id is None:
+                    # Such as a hobby deleted while the import ran
+                    self.unresolved_hobbies += 1
+                    self._report(f"{username}: hobby {name!r} could not be created")
+                    continue
+                links.add((users[username], hobby_id))
+        Through.objects.bulk_create(
+            [Through(user_id=user_id, hobby_id=hobby_id) for user_id, hobby_id in links],
+            ignore_conflicts=True,
+        )
+        self.hobby_links += len(links)
+
+    def _link_friends(self, users: dict[str, int], records: dict[str, dict]) -> None:
+        wanted = {name for record in records.values() for name in record.get('friends') or ()}
+        known = dict(User.objects.filter(username__in=list(wanted)).values_list('username', 'id'))
+
+        pairs = set()
+        for username, record in records.items():
+            user_id = users[username]
+            for friend in record.get('friends') or ():
+                if friend in known:
+                    pairs.add(tuple(sorted((user_id, known[friend]))))
+                else:
+                    self._pending_friends.setdefault(friend, set()).add(user_id)
+
+            # Links from earlier records that were waiting for this user
+            for other_id in self._pending_friends.pop(username, ()):
+                pairs.add(tuple(sorted((user_id, other_id))))
+
+        pairs = {(a, b) for a, b in pairs if a != b}
+        Through = User.friends_list.through
+        Through.objects.bulk_create(
+            [Through(from_user_id=a, to_user_id=b) for a, b in pairs]
+            + [Through(from_user_id=b, to_user_id=a) for a, b in pairs],
+            ignore_conflicts=True,
+        )
+        # Every pair has a user created by this import, so none existed before
+        adjust_counters('friend_count', Counter(user_id for pair in pairs for user_id in pair))
+        self.friendships += len(pairs)
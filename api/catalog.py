@@ -0,0 +1,181 @@
+from typing import Iterable, Iterator, NamedTuple, Optional
+import hashlib
+import json
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Hobby, hobby_key
+from .routers import primary_reads
+from .search import search_index
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    An immutable copy of the hobby table, ready to serve.
+
+    `version` is derived from the content, so every worker holding the
+    same catalog reports the same version and ETag.
+    """
+    version: str
+    hobbies: tuple[tuple[int, str], ...]
+    names: dict[int, str]
+    body: bytes
+    etag: str
+
+
+class HobbyCatalog:
+    """
+    A versioned in-process cache of the hobby catalog.
+
+    The snapshot is rebuilt after a hobby is saved or deleted (see
+    `api.signals`) and at least every `settings.HOBBY_CATALOG_TTL`
+    seconds, which bounds staleness for changes made by other processes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._built_at = 0.0
+
+    def snapshot(self) -> CatalogSnapshot:
+        """
+        Returns the current snapshot, rebuilding it if it is missing or expired.
+        """
+        ttl = getattr(settings, 'HOBBY_CATALOG_TTL', 60)
+        snapshot = self._snapshot
+        if snapshot is None or (ttl is not None and time.monotonic() - self._built_at >= ttl):
+            with self._lock:
+                snapshot = self._snapshot = self._build()
+                self._built_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    @staticmethod
+    @primary_reads()
+    def _build() -> CatalogSnapshot:
+        hobbies = tuple(Hobby.objects.order_by('id').values_list('id', 'name'))
+        body = json.dumps(
+            [{"id": hobby_id, "name": name} for hobby_id, name in hobbies], separators=(',', ':')
+        ).encode()
+        version = hashlib.sha1(body).hexdigest()[:16]
+        return CatalogSnapshot(
+            version=version,
+            hobbies=hobbies,
+            names=dict(hobbies),
+            body=body,
+            etag=f'"{version}"',
+        )
+
+
+hobby_catalog = HobbyCatalog()
+
+
+def clean_hobby_name(name: str) -> str:
+    """
+    Collapses the whitespace of a hobby name and checks that it can be stored.
+
+    Raises:
+        ValidationError: If the name is empty or too long.
+    """
+    max_length = Hobby._meta.get_field('name').max_length
+    if not isinstance(name, str) or not name.strip():
+        raise ValidationError("Hobby names cannot be empty.")
+    name = ' '.join(name.split())
+    if len(name) > max_length:
+        raise ValidationError(f"Hobby names cannot be longer than {max_length} characters.")
+    return name
+
+
+def hobbies_by_key(names: Iterable[str]) -> dict[str, tuple[int, str, bool]]:
+    """
+    Finds or creates hobbies by name, ignoring case and extra whitespace.
+
+    Missing hobbies are created with a single bulk insert; names that differ
+    only in case resolve to one hobby, keeping the existing spelling.
+
+    Returns:
+        dict[str, tuple[int, str, bool]]: Maps the `hobby_key` of each
+        distinct name, in the order given, to the hobby's ID, name and
+        whether it was created.
+
+    Raises:
+        ValidationError: If a name is empty or too long.
+    """
+    wanted: dict[str, str] = {}
+    for name in names:
+        name = clean_hobby_name(name)
+        wanted.setdefault(hobby_key(name), name)
+
+    def existing() -> dict[str, tuple[int, str]]:
+        rows = Hobby.objects.filter(key__in=list(wanted)).values_list('key', 'id', 'name')
+        return {key: (hobby_id, name) for key, hobby_id, name in rows}
+
+    with transaction.atomic():
+        found = existing()
+        missing = [Hobby(name=name, key=key) for key, name in wanted.items() if key not in found]
+        created = set()
+        if missing:
+            # Conflicts with hobbies created concurrently are skipped and read back below
+            Hobby.objects.bulk_create(missing, ignore_conflicts=True)
+            created = set(wanted) - set(found)
+            found = existing()
+
+            # bulk_create sends no signals, so update the caches here
+            new_hobbies = [found[key] for key in created if key in found]
+
+            def refresh_caches() -> None:
+                hobby_catalog.invalidate()
+                for hobby_id, name in new_hobbies:
+                    search_index.update('hobbies', hobby_id, name)
+
+            transaction.on_commit(refresh_caches)
+
+    return {key: (*found[key], key in created) for key in wanted if key in found}
+
+
+def get_or_create_hobbies(names: Iterable[str]) -> list[tuple[int, str, bool]]:
+    """
+    Finds or creates hobbies by name, as `hobbies_by_key` does.
+
+    Returns:
+        list[tuple[int, str, bool]]: The ID, name and whether it was created,
+        for each distinct name in the order given.
+
+    Raises:
+        ValidationError: If a name is empty or too long.
+    """
+    return list(hobbies_by_key(names).values())
+
+
+class CatalogChoiceIterator(forms.models.ModelChoiceIterator):
+    """
+    Yields hobby choices from the catalog snapshot instead of querying.
+    """
+
+    def __iter__(self) -> Iterator[tuple[int, str]]:
+        yield from hobby_catalog.snapshot().hobbies
+
+    def __len__(self) -> int:
+        return len(hobby_catalog.snapshot().hobbies)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class CatalogHobbiesField(forms.ModelMultipleChoiceField):
+    """
+    A hobbies field whose choice list is served from the catalog snapshot.
+
+    Submitted values are still validated against the database.
+    """
+    iterator = CatalogChoiceIterator
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(queryset=Hobby.objects.all(), **kwargs)
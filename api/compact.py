@@ -0,0 +1,96 @@
+"""
+A compact, dictionary-encoded format for the user list endpoints.
+
+Clients opt in with `?format=compact` or by accepting `COMPACT_MEDIA_TYPE`.
+Instead of a list of cards, the list is sent as one array per card field,
+and each user's hobbies are sent as hobby IDs:
+
+    {
+        "users": {"username": ["ann", "bob"], "hobbies": [[3, 7], [7]], ...},
+        "hobby_names": {"3": "Chess", "7": "Hiking"},
+        "catalog_version": "3f2a9c0d1e4b5a6c"
+    }
+
+`hobby_names` only covers the hobbies in the response. A client that has
+cached the hobby catalog (`/api/hobbies/`) can pass its version as
+`?catalog_version=`; when it is current, `hobby_names` is left out and
+the IDs are resolved from the cached catalog.
+
+Bodies are encoded with `orjson` when it is installed.
+"""
+from typing import Optional, Sequence
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .catalog import hobby_catalog
+from .models import Hobby
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPACT_MEDIA_TYPE = 'application/vnd.hobbies.compact+json'
+
+
+def wants_compact(request: HttpRequest) -> bool:
+    """
+    Returns whether the client asked for the compact format.
+    """
+    if request.GET.get('format') == 'compact':
+        return True
+    accepted = request.headers.get('Accept', '')
+    return any(part.split(';')[0].strip() == COMPACT_MEDIA_TYPE for part in accepted.split(','))
+
+
+def dumps(data: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    # Encodes dates and decimals like orjson and JsonResponse do
+    return json.dumps(data, separators=(',', ':'), cls=DjangoJSONEncoder).encode()
+
+
+def columns(cards: list[dict], fields: Sequence[str]) -> dict[str, list]:
+    """
+    Turns a list of cards into one list per card field. Every field is
+    listed, even when there are no cards.
+    """
+    return {field: [card[field] for card in cards] for field in fields}
+
+
+def compact_response(request: HttpRequest, key: str, cards: list[dict], fields: Sequence[str],
+                     extra: Optional[dict] = None) -> HttpResponse:
+    """
+    Serves cards in the compact format.
+
+    Args:
+        request (HttpRequest): The request, which may carry the client's
+            `catalog_version`.
+        key (str): The response key the cards are listed under.
+        cards (list[dict]): Cards built with `with_hobby_ids=True`.
+        fields (Sequence[str]): The card fields, see
+            `api.serializers.card_fields`.
+        extra (Optional[dict]): Other top-level fields, such as pagination.
+
+    Returns:
+        HttpResponse: The encoded response.
+    """
+    catalog = hobby_catalog.snapshot()
+    card_columns = columns(cards, fields)
+    data = {key: card_columns, **(extra or {}), 'catalog_version': catalog.version}
+
+    hobby_ids = set().union(*card_columns.get('hobbies', ()))
+    missing = hobby_ids.difference(catalog.names)
+    if request.GET.get('catalog_version') != catalog.version or missing:
+        # Hobbies added since the catalog was built are looked up directly
+        names = dict(Hobby.objects.filter(id__in=missing).values_list('id', 'name')) if missing else {}
+        data['hobby_names'] = {
+            str(hobby_id): catalog.names.get(hobby_id) or names.get(hobby_id) for hobby_id in sorted(hobby_ids)
+        }
+
+    response = HttpResponse(dumps(data), content_type=COMPACT_MEDIA_TYPE)
+    patch_vary_headers(response, ['Accept'])
+    return response
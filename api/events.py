@@ -0,0 +1,180 @@
+"""
+Per-user event notifications, pushed to browsers over Server-Sent Events.
+
+Views call `notify()`, which publishes once the surrounding transaction
+commits. Listeners (see `api.async_views.events`) receive events through the
+backend selected by `settings.EVENTS_BACKEND`:
+
+- 'local' (default): an in-process asyncio pub/sub. Events only reach
+  clients connected to the same worker process.
+- 'spool': a directory shared by the workers on one host
+  (`settings.EVENTS_SPOOL_DIR`), with one append-only file per user.
+  Listeners poll the size of their file every `settings.EVENTS_POLL_INTERVAL`
+  seconds. It stands in for a broker when several workers serve the app.
+
+Neither backend touches the database while a client is idle.
+"""
+from typing import AsyncIterator, Optional
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Events buffered per listener; the oldest are dropped beyond this
+MAX_QUEUED_EVENTS = 100
+
+
+class LocalBackend:
+    """
+    Delivers events to listeners in this process through asyncio queues.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._listeners: dict[int, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def publish(self, user_id: int, event: dict) -> None:
+        with self._lock:
+            listeners = list(self._listeners.get(user_id, ()))
+        for listener in listeners:
+            loop, queue = listener
+            # Publishers run in sync threads, so hand the event to the listener's loop
+            try:
+                loop.call_soon_threadsafe(_put_latest, queue, event)
+            except RuntimeError:
+                # The loop was closed without the listener unsubscribing
+                self._discard(user_id, listener)
+
+    async def listen(self, user_id: int, timeout: float) -> AsyncIterator[Optional[dict]]:
+        """
+        Yields each event published for a user, or None after `timeout`
+        seconds without one.
+        """
+        listener = (asyncio.get_running_loop(), asyncio.Queue(MAX_QUEUED_EVENTS))
+        with self._lock:
+            self._listeners.setdefault(user_id, set()).add(listener)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(listener[1].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._discard(user_id, listener)
+
+    def _discard(self, user_id: int, listener: tuple[asyncio.AbstractEventLoop, asyncio.Queue]) -> None:
+        with self._lock:
+            listeners = self._listeners.get(user_id, set())
+            listeners.discard(listener)
+            if not listeners:
+                self._listeners.pop(user_id, None)
+
+
+def _put_latest(queue: asyncio.Queue, event: dict) -> None:
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class SpoolBackend:
+    """
+    Shares events between processes through one append-only file per user.
+    """
+
+    def __init__(self) -> None:
+        self.directory = getattr(settings, 'EVENTS_SPOOL_DIR', None) or os.path.join(
+            tempfile.gettempdir(), 'hobbies-events'
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.directory, f'{int(user_id)}.jsonl')
+
+    def publish(self, user_id: int, event: dict) -> None:
+        path = self._path(user_id)
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+
+        # Start over once the file is large; listeners notice it shrink
+        max_bytes = getattr(settings, 'EVENTS_SPOOL_MAX_BYTES', 1024 * 1024)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+            flags |= os.O_TRUNC
+
+        descriptor = os.open(path, flags, 0o600)
+        try:
+            os.write(descriptor, line)
+        finally:
+            os.close(descriptor)
+
+    async def listen(self, user_id: int, timeout: float) -> AsyncIterator[Optional[dict]]:
+        """
+        Yields each event published for a user after the call, or None after
+        `timeout` seconds without one.
+        """
+        path = self._path(user_id)
+        interval = getattr(settings, 'EVENTS_POLL_INTERVAL', 0.5)
+        offset = _size(path)
+        last_event = time.monotonic()
+
+        while True:
+            await asyncio.sleep(interval)
+            size = _size(path)
+            if size < offset:
+                offset = 0
+            if size > offset:
+                with open(path, 'rb') as spool:
+                    spool.seek(offset)
+                    chunk = spool.read(size - offset)
+                # Leave a partly written last line for the next poll
+                complete = chunk.rfind(b'\n') + 1
+                offset += complete
+                for line in chunk[:complete].splitlines():
+                    if line:
+                        last_event = time.monotonic()
+                        yield json.loads(line)
+            if time.monotonic() - last_event >= timeout:
+                last_event = time.monotonic()
+                yield None
+
+
+def _size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'spool': SpoolBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Returns the backend named by `settings.EVENTS_BACKEND`, which may also
+    be the dotted path of a class with `publish` and `listen` methods.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = getattr(settings, 'EVENTS_BACKEND', 'local')
+            _backend = (BACKENDS[name] if name in BACKENDS else import_string(name))()
+        return _backend
+
+
+def notify(user_id: int, event_type: str, data: dict) -> None:
+    """
+    Publishes an event to a user once the current transaction commits.
+    """
+    event = {'type': event_type, 'data': data}
+    transaction.on_commit(lambda: get_backend().publish(user_id, event))
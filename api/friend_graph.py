@@ -0,0 +1,177 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable, Optional
+import threading
+import time
+
+from django.conf import settings
+
+from .models import User
+from .routers import primary_reads
+
+
+class FriendGraph:
+    """
+    A compact in-memory adjacency structure for the friend graph.
+
+    Friendships are stored CSR-style: `_nodes` holds the sorted IDs of users
+    with friends, and the friends of `_nodes[i]` are the sorted IDs in
+    `_indices[_indptr[i]:_indptr[i + 1]]`. Edits made since the last build
+    are kept in small per-user overlays that are folded back into the
+    arrays once `settings.FRIEND_GRAPH_COMPACT_AFTER` of them accumulate.
+
+    Like the hobby index, it is built lazily from `api_user_friends_list`,
+    kept current by the signal handlers in `api.signals` and rebuilt after
+    `settings.FRIEND_GRAPH_TTL` seconds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._nodes = array('q')
+        self._indptr = array('q', [0])
+        self._indices = array('q')
+        self._added: dict[int, set[int]] = {}
+        self._removed: dict[int, set[int]] = {}
+        self._pending = 0
+        self._built_at: Optional[float] = None
+
+    def _is_fresh(self) -> bool:
+        if self._built_at is None:
+            return False
+        ttl = getattr(settings, 'FRIEND_GRAPH_TTL', 300)
+        return ttl is None or time.monotonic() - self._built_at < ttl
+
+    @primary_reads()
+    def build(self) -> None:
+        """
+        Rebuilds the adjacency arrays from the database in one query.
+        """
+        rows = User.friends_list.through.objects.order_by('from_user_id', 'to_user_id').values_list(
+            'from_user_id', 'to_user_id'
+        )
+        nodes, indptr, indices = array('q'), array('q', [0]), array('q')
+        for from_id, to_id in rows.iterator(chunk_size=10000):
+            if not nodes or nodes[-1] != from_id:
+                if nodes:
+                    indptr.append(len(indices))
+                nodes.append(from_id)
+            indices.append(to_id)
+        if nodes:
+            indptr.append(len(indices))
+
+        with self._lock:
+            self._nodes, self._indptr, self._indices = nodes, indptr, indices
+            self._added, self._removed, self._pending = {}, {}, 0
+            self._built_at = time.monotonic()
+
+    def ensure_built(self) -> None:
+        if not self._is_fresh():
+            self.build()
+
+    def _row(self, user_id: int) -> array:
+        position = bisect_left(self._nodes, user_id)
+        if position < len(self._nodes) and self._nodes[position] == user_id:
+            return self._indices[self._indptr[position]:self._indptr[position + 1]]
+        return array('q')
+
+    def _friends(self, user_id: int) -> set[int]:
+        friends = set(self._row(user_id))
+        friends -= self._removed.get(user_id, set())
+        friends |= self._added.get(user_id, set())
+        return friends
+
+    def friends_of(self, user_id: int) -> set[int]:
+        """
+        Returns the IDs of a user's friends.
+        """
+        self.ensure_built()
+        with self._lock:
+            return self._friends(user_id)
+
+    def mutual_counts(self, user_id: int, other_ids: Iterable[int]) -> dict[int, int]:
+        """
+        Counts the friends a user has in common with each of `other_ids`.
+        """
+        self.ensure_built()
+        with self._lock:
+            friends = self._friends(user_id)
+            return {other_id: len(friends & self._friends(other_id)) for other_id in other_ids}
+
+    def friends_of_friends(self, user_id: int, max_visits: int = 100000) -> Counter:
+        """
+        Runs a two-hop breadth-first search from a user.
+
+        At most `max_visits` edges are followed, so the cost of a call is
+        bounded however well connected the user's friends are.
+
+        Returns:
+            Counter: Maps each user who is not already a friend to the number
+            of mutual friends.
+        """
+        self.ensure_built()
+        counts: Counter = Counter()
+        with self._lock:
+            friends = self._friends(user_id)
+            visits = 0
+            for friend_id in sorted(friends):
+                second_hop = self._friends(friend_id)
+                visits += len(second_hop)
+                counts.update(second_hop)
+                if visits >= max_visits:
+                    break
+        counts.pop(user_id, None)
+        for friend_id in friends:
+            counts.pop(friend_id, None)
+        return counts
+
+    def add_edges(self, pairs: Iterable[tuple[int, int]]) -> None:
+        """
+        Records friendships in both directions.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            for a, b in pairs:
+                for x, y in ((a, b), (b, a)):
+                    self._removed.get(x, set()).discard(y)
+                    self._added.setdefault(x, set()).add(y)
+                    self._pending += 1
+            self._maybe_compact()
+
+    def remove_edges(self, pairs: Iterable[tuple[int, int]]) -> None:
+        """
+        Removes friendships in both directions.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            for a, b in pairs:
+                for x, y in ((a, b), (b, a)):
+                    self._added.get(x, set()).discard(y)
+                    self._removed.setdefault(x, set()).add(y)
+                    self._pending += 1
+            self._maybe_compact()
+
+    def remove_user(self, user_id: int) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            self.remove_edges((user_id, friend_id) for friend_id in self._friends(user_id))
+
+    def _maybe_compact(self) -> None:
+        if self._pending < getattr(settings, 'FRIEND_GRAPH_COMPACT_AFTER', 10000):
+            return
+        user_ids = sorted(set(self._nodes) | set(self._added))
+        nodes, indptr, indices = array('q'), array('q', [0]), array('q')
+        for user_id in user_ids:
+            friends = sorted(self._friends(user_id))
+            if friends:
+                nodes.append(user_id)
+                indices.extend(friends)
+                indptr.append(len(indices))
+        self._nodes, self._indptr, self._indices = nodes, indptr, indices
+        self._added, self._removed, self._pending = {}, {}, 0
+
+
+friend_graph = FriendGraph()
@@ -0,0 +1,246 @@
+"""
+Changes to friendships and friend requests, with the denormalized
+`User.friend_count` and `User.pending_request_count` kept in step.
+
+Every change goes through these helpers, which update the counters with
+`F()` expressions in the same transaction as the rows they count. The
+users involved are locked first, so concurrent changes to the same
+friendship cannot count it twice. `recount_counters` repairs any drift,
+such as after rows were written outside these helpers.
+"""
+from collections import Counter
+from typing import Iterable, Mapping, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.http import QueryDict
+
+from .events import notify
+from .models import User, FriendRequests
+
+FRIEND_SORTS = ('name', 'shared_hobbies')
+
+
+def adjust_counters(field: str, deltas: Mapping[int, int]) -> None:
+    """
+    Adds to a counter column of many users, with one UPDATE per distinct delta.
+    """
+    by_delta: dict[int, list[int]] = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        User.objects.filter(id__in=user_ids).update(**{field: F(field) + delta})
+
+
+def _lock_users(user_ids: Iterable[int]) -> None:
+    # A fixed order keeps concurrent transactions from deadlocking
+    list(User.objects.select_for_update().filter(id__in=set(user_ids)).order_by('id').values_list('id', flat=True))
+
+
+def add_friends(user: User, friend_ids: Iterable[int]) -> set[int]:
+    """
+    Makes users friends of `user`, in both directions, and counts them.
+
+    Returns:
+        set[int]: The IDs that were not friends already.
+    """
+    friend_ids = set(friend_ids) - {user.id}
+    if not friend_ids:
+        return set()
+
+    with transaction.atomic():
+        _lock_users([user.id, *friend_ids])
+        added = friend_ids - set(user.friends_list.filter(id__in=friend_ids).values_list('id', flat=True))
+        if added:
+            user.friends_list.add(*added)
+            adjust_counters('friend_count', {user.id: len(added), **{friend_id: 1 for friend_id in added}})
+    return added
+
+
+def remove_friends(user: User, friend_ids: Iterable[int]) -> set[int]:
+    """
+    Ends friendships of `user`, in both directions, and counts them.
+
+    Returns:
+        set[int]: The IDs that were friends.
+    """
+    friend_ids = set(friend_ids) - {user.id}
+    if not friend_ids:
+        return set()
+
+    with transaction.atomic():
+        _lock_users([user.id, *friend_ids])
+        removed = set(user.friends_list.filter(id__in=friend_ids).values_list('id', flat=True))
+        if removed:
+            user.friends_list.remove(*removed)
+            adjust_counters('friend_count', {user.id: -len(removed), **{friend_id: -1 for friend_id in removed}})
+    return removed
+
+
+def create_friend_request(sender: User, receiver: User) -> FriendRequests:
+    with transaction.atomic():
+        friend_request = FriendRequests.objects.create(sender=sender, receiver=receiver)
+        adjust_counters('pending_request_count', {receiver.id: 1})
+    return friend_request
+
+
+def delete_friend_requests(requests: QuerySet) -> int:
+    """
+    Deletes friend requests and lowers their receivers' pending counts.
+
+    Returns:
+        int: The number of requests deleted.
+    """
+    with transaction.atomic():
+        rows = list(requests.select_for_update().values_list('id', 'receiver_id'))
+        if not rows:
+            return 0
+        FriendRequests.objects.filter(id__in=[request_id for request_id, _ in rows]).delete()
+        receivers = Counter(receiver_id for _, receiver_id in rows)
+        adjust_counters('pending_request_count', {receiver_id: -n for receiver_id, n in receivers.items()})
+    return len(rows)
+
+
+def recount_counters(user_ids: Optional[Iterable[int]] = None, batch_size: int = 2000) -> int:
+    """
+    Recomputes the friend and pending request counters from the rows they
+    count, for some users or all of them.
+
+    Returns:
+        int: The number of users whose counters were wrong.
+    """
+    friends = (
+        User.friends_list.through.objects.filter(from_user_id=OuterRef('pk'))
+        .order_by().values('from_user_id').annotate(n=Count('*')).values('n')
+    )
+    pending = (
+        FriendRequests.objects.filter(receiver_id=OuterRef('pk'))
+        .order_by().values('receiver_id').annotate(n=Count('*')).values('n')
+    )
+    users = User.objects.all() if user_ids is None else User.objects.filter(id__in=list(user_ids))
+    rows = users.order_by('id').annotate(
+        actual_friends=Coalesce(Subquery(friends), 0),
+        actual_pending=Coalesce(Subquery(pending), 0),
+    ).values_list('id', 'friend_count', 'pending_request_count', 'actual_friends', 'actual_pending')
+
+    fixed = [
+        User(id=user_id, friend_count=actual_friends, pending_request_count=actual_pending)
+        for user_id, friend_count, pending_count, actual_friends, actual_pending in rows.iterator(chunk_size=batch_size)
+        if (friend_count, pending_count) != (actual_friends, actual_pending)
+    ]
+    User.objects.bulk_update(fixed, ['friend_count', 'pending_request_count'], batch_size=batch_size)
+    return len(fixed)
+
+
+def resolve_friend_requests(user: User, request_ids: Iterable[int], accept: bool) -> dict[int, str]:
+    """
+    Accepts or declines many incoming friend requests in one transaction.
+
+    A request is treated as mutual when the user has also sent a request to
+    its sender; mutual requests are accepted even when declining, since both
+    users have asked, and the user's own request is removed with it.
+    Friendships are added with one `add_friends` call, whose symmetrical
+    `friends_list.add` writes each direction with one bulk insert, and the
+    requests are removed with one `delete_friend_requests` call, so the
+    number of queries does not depend on how many requests are handled.
+
+    Args:
+        user (User): The receiver of the requests.
+        request_ids (Iterable[int]): The friend request IDs to handle.
+        accept (bool): Whether to accept or decline the requests.
+
+    Returns:
+        dict[int, str]: Maps each requested ID to `accepted`, `declined` or
+        `not_found`.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+
+    with transaction.atomic():
+        pending = dict(
+            FriendRequests.objects.select_for_update()
+            .filter(id__in=request_ids, receiver=user)
+            .values_list('id', 'sender_id')
+        )
+        mutual = set(
+            FriendRequests.objects.filter(sender=user, receiver_id__in=set(pending.values()))
+            .values_list('receiver_id', flat=True)
+        )
+        accepted = {
+            sender_id for sender_id in pending.values()
+            if accept or sender_id in mutual
+        }
+
+        add_friends(user, accepted)
+        delete_friend_requests(FriendRequests.objects.filter(
+            Q(id__in=pending) | Q(sender=user, receiver_id__in=accepted)
+        ))
+
+        if pending:
+            notify(user.id, 'friend_request.resolved', {'ids': sorted(pending)})
+        for sender_id in accepted:
+            notify(sender_id, 'friend_request.accepted', {'username': user.username})
+
+    return {
+        request_id: (
+            'not_found' if request_id not in pending
+            else 'accepted' if pending[request_id] in accepted
+            else 'declined'
+        )
+        for request_id in request_ids
+    }
+
+
+def friends_page(user: User, params: QueryDict) -> tuple[list[tuple[int, int]], dict]:
+    """
+    Resolves one page of a user's friends from request parameters.
+
+    `sort` orders friends by username ('name', the default) or by the
+    number of hobbies they share with the user ('shared_hobbies'), and
+    `page` picks a page of `settings.FRIENDS_PAGE_SIZE` friends (default
+    50). Pages are counted from `user.friend_count`, without counting the
+    friends themselves.
+
+    Returns:
+        tuple[list[tuple[int, int]], dict]: The `(friend_id, shared_count)`
+        rows of the page and the pagination fields of the response.
+
+    Raises:
+        ValidationError: If `sort` is not one of `FRIEND_SORTS`.
+    """
+    sort = params.get('sort', 'name')
+    if sort not in FRIEND_SORTS:
+        raise ValidationError("sort must be 'name' or 'shared_hobbies'.")
+
+    hobby_ids = list(user.hobbies.values_list('id', flat=True))
+    friends = user.friends_list.all()
+    # Without hobbies every friend shares none, which is the name order
+    if sort == 'shared_hobbies' and hobby_ids:
+        friends = friends.annotate(
+            shared=Count('hobbies', filter=Q(hobbies__in=hobby_ids))
+        ).order_by('-shared', 'username', 'id')
+    else:
+        friends = friends.order_by('username', 'id')
+
+    paginator = Paginator(friends.values_list('id', flat=True), getattr(settings, 'FRIENDS_PAGE_SIZE', 50))
+    paginator.count = user.friend_count
+    page_obj = paginator.get_page(params.get('page', 1))
+    friend_ids = list(page_obj)
+
+    # Shared hobbies are only counted for the friends on the page
+    shared_counts = dict(
+        User.hobbies.through.objects.filter(user_id__in=friend_ids, hobby_id__in=hobby_ids)
+        .order_by().values('user_id').annotate(n=Count('*')).values_list('user_id', 'n')
+    )
+    rows = [(friend_id, shared_counts.get(friend_id, 0)) for friend_id in friend_ids]
+    return rows, {
+        'friend_count': user.friend_count,
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+        'page_number': page_obj.number,
+        'total_pages': paginator.num_pages,
+    }
@@ -0,0 +1,224 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date
+from typing import Iterable, Optional
+import threading
+import time
+
+from django.conf import settings
+
+from .models import User
+from .routers import primary_reads
+
+
+class HobbyIndex:
+    """
+    An in-memory inverted index mapping each hobby to the users who have it.
+
+    Every posting list is a sorted array of user IDs, so counting the hobbies
+    a user shares with every other user is a single pass over the posting
+    lists of that user's hobbies, with no per-candidate queries. Alongside
+    it, the number of users with each hobby is kept per date of birth, so age
+    facets can be summed without visiting users at all.
+
+    The index is built lazily from the `api_user_hobbies` table and kept
+    current by the signal handlers in `api.signals`. Because each worker
+    process holds its own copy, it is also rebuilt once it is older than
+    `settings.HOBBY_INDEX_TTL` seconds, which bounds how stale it can get
+    when another process changes the data.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._postings: dict[int, array] = {}
+        self._user_hobbies: dict[int, set[int]] = {}
+        self._birth_dates: dict[int, Optional[date]] = {}
+        self._birth_date_counts: dict[int, Counter] = {}
+        self._built_at: Optional[float] = None
+
+    def _is_fresh(self) -> bool:
+        if self._built_at is None:
+            return False
+        ttl = getattr(settings, 'HOBBY_INDEX_TTL', 300)
+        return ttl is None or time.monotonic() - self._built_at < ttl
+
+    @primary_reads()
+    def build(self) -> None:
+        """
+        Rebuilds the index from the database in two queries.
+        """
+        postings: dict[int, array] = {}
+        user_hobbies: dict[int, set[int]] = {}
+        birth_dates = dict(User.objects.values_list('id', 'date_of_birth'))
+
+        birth_date_counts: dict[int, Counter] = {}
+
+        rows = User.hobbies.through.objects.order_by('hobby_id', 'user_id').values_list('hobby_id', 'user_id')
+        for hobby_id, user_id in rows.iterator(chunk_size=10000):
+            postings.setdefault(hobby_id, array('q')).append(user_id)
+            user_hobbies.setdefault(user_id, set()).add(hobby_id)
+            dob = birth_dates.get(user_id)
+            if dob is not None:
+                birth_date_counts.setdefault(hobby_id, Counter())[dob] += 1
+
+        with self._lock:
+            self._postings = postings
+            self._user_hobbies = user_hobbies
+            self._birth_dates = birth_dates
+            self._birth_date_counts = birth_date_counts
+            self._built_at = time.monotonic()
+
+    def ensure_built(self) -> None:
+        """
+        Builds the index if it has never been built or has expired.
+        """
+        if not self._is_fresh():
+            self.build()
+
+    def invalidate(self) -> None:
+        """
+        Marks the index as stale so that the next read rebuilds it.
+        """
+        with self._lock:
+            self._built_at = None
+
+    def shared_counts(self, hobby_ids: Iterable[int], exclude: Optional[int] = None) -> Counter:
+        """
+        Counts how many of the given hobbies every other user has.
+
+        Args:
+            hobby_ids (Iterable[int]): The hobbies to match against.
+            exclude (Optional[int]): A user ID to leave out of the result.
+
+        Returns:
+            Counter: Maps user ID to the number of shared hobbies. Users
+            sharing no hobbies are absent.
+        """
+        self.ensure_built()
+        counts: Counter = Counter()
+        with self._lock:
+            for hobby_id in hobby_ids:
+                counts.update(self._postings.get(hobby_id, ()))
+        if exclude is not None:
+            counts.pop(exclude, None)
+        return counts
+
+    def birth_date_counts(self, hobby_ids: Iterable[int], exclude: Optional[int] = None) -> Counter:
+        """
+        Sums the per-date-of-birth user counts of the given hobbies.
+
+        A user with several of the hobbies is counted once per hobby, so
+        each date's total is the number of hobby matches of users born that
+        day: zero exactly when nobody born that day shares any. The cost
+        grows with the number of distinct dates, not with the number of
+        users.
+
+        Args:
+            hobby_ids (Iterable[int]): The hobbies to match against.
+            exclude (Optional[int]): A user ID whose own hobbies to leave out.
+
+        Returns:
+            Counter: Maps date of birth to the number of hobby matches.
+        """
+        self.ensure_built()
+        counts: Counter = Counter()
+        with self._lock:
+            hobby_ids = set(hobby_ids)
+            for hobby_id in hobby_ids:
+                counts.update(self._birth_date_counts.get(hobby_id, {}))
+            dob = self._birth_dates.get(exclude)
+            if dob is not None:
+                counts[dob] -= len(hobby_ids & self._user_hobbies.get(exclude, set()))
+        return +counts
+
+    def _count_birth_date(self, hobby_id: int, user_id: int, change: int) -> None:
+        dob = self._birth_dates.get(user_id)
+        if dob is None:
+            return
+        dates = self._birth_date_counts.setdefault(hobby_id, Counter())
+        dates[dob] += change
+        if not dates[dob]:
+            del dates[dob]
+
+    def hobbies_of(self, user_id: int) -> set[int]:
+        """
+        Returns a copy of the indexed hobby IDs of a user.
+        """
+        self.ensure_built()
+        with self._lock:
+            return set(self._user_hobbies.get(user_id, ()))
+
+    def birth_date(self, user_id: int) -> Optional[date]:
+        """
+        Returns the indexed date of birth of a user, if known.
+        """
+        return self._birth_dates.get(user_id)
+
+    def add_hobbies(self, user_id: int, hobby_ids: Iterable[int]) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            owned = self._user_hobbies.setdefault(user_id, set())
+            for hobby_id in hobby_ids:
+                if hobby_id in owned:
+                    continue
+                owned.add(hobby_id)
+                insort(self._postings.setdefault(hobby_id, array('q')), user_id)
+                self._count_birth_date(hobby_id, user_id, 1)
+
+    def remove_hobbies(self, user_id: int, hobby_ids: Iterable[int]) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            owned = self._user_hobbies.get(user_id, set())
+            for hobby_id in list(hobby_ids):
+                if hobby_id not in owned:
+                    continue
+                owned.discard(hobby_id)
+                self._count_birth_date(hobby_id, user_id, -1)
+                posting = self._postings.get(hobby_id)
+                position = bisect_left(posting, user_id)
+                if position < len(posting) and posting[position] == user_id:
+                    del posting[position]
+
+    def clear_user(self, user_id: int) -> None:
+        """
+        Removes every hobby of a user, keeping their other indexed data.
+        """
+        self.remove_hobbies(user_id, self._user_hobbies.get(user_id, ()))
+
+    def clear_hobby(self, hobby_id: int) -> None:
+        """
+        Removes a hobby and its posting list from the index.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            for user_id in self._postings.pop(hobby_id, ()):
+                self._user_hobbies.get(user_id, set()).discard(hobby_id)
+            self._birth_date_counts.pop(hobby_id, None)
+
+    def set_birth_date(self, user_id: int, dob: Optional[date]) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            # Move the user's hobbies to their new date of birth
+            hobby_ids = self._user_hobbies.get(user_id, ())
+            for hobby_id in hobby_ids:
+                self._count_birth_date(hobby_id, user_id, -1)
+            self._birth_dates[user_id] = dob
+            for hobby_id in hobby_ids:
+                self._count_birth_date(hobby_id, user_id, 1)
+
+    def remove_user(self, user_id: int) -> None:
+        """
+        Removes a user and all of their postings from the index.
+        """
+        with self._lock:
+            self.clear_user(user_id)
+            self._user_hobbies.pop(user_id, None)
+            self._birth_dates.pop(user_id, None)
+
+
+hobby_index = HobbyIndex()
@@ -0,0 +1,155 @@
+"""
+A background job queue stored in the `Job` table, with no external broker.
+
+Handlers are registered by name with `@job`, and `enqueue` adds a row in
+the caller's transaction, so a job only becomes visible if the work that
+scheduled it commits. Workers (`manage.py run_worker`) claim due jobs with
+`select_for_update(skip_locked=True)`, so any number of them can poll the
+table without taking the same job.
+
+A failing job is retried with exponential backoff, starting at
+`settings.JOB_RETRY_DELAY` seconds (default 10), until it has been tried
+`max_attempts` times. A job left running longer than
+`settings.JOB_LEASE_SECONDS` (default 600), for example by a worker that
+was killed, is claimed again, or marked as failed if it has no attempts
+left.
+"""
+from datetime import timedelta
+from typing import Callable, Optional
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers: dict[str, Callable[..., None]] = {}
+
+
+def job(name: str) -> Callable:
+    """
+    Registers a function as the handler of a job name. Its payload is passed
+    as keyword arguments.
+    """
+    def register(function: Callable[..., None]) -> Callable[..., None]:
+        _handlers[name] = function
+        return function
+    return register
+
+
+def enqueue(name: str, payload: Optional[dict] = None, key: str = '', delay: float = 0,
+            max_attempts: int = 5) -> Job:
+    """
+    Adds a job to the queue.
+
+    Args:
+        name (str): The registered handler to run.
+        payload (Optional[dict]): Keyword arguments for the handler, as JSON.
+        key (str): When given, a job with the same name and key that is
+            still queued absorbs this one, so repeated fan-out is coalesced.
+        delay (float): Seconds to wait before the job may run.
+        max_attempts (int): How many times to try the job before giving up.
+
+    Returns:
+        Job: The queued job.
+    """
+    if name not in _handlers:
+        raise ValueError(f"No job handler is registered as {name!r}.")
+
+    if key:
+        queued = Job.objects.filter(name=name, key=key, status=Job.QUEUED).first()
+        if queued is not None:
+            return queued
+
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        key=key,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim(worker: str, limit: int = 1) -> list[Job]:
+    """
+    Marks up to `limit` due jobs as running for a worker and returns them.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 600))
+
+    expired = Q(status=Job.RUNNING, locked_at__lt=now - lease)
+
+    with transaction.atomic():
+        Job.objects.filter(expired, attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED,
+            finished_at=now,
+            last_error='The lease of the last attempt expired.',
+        )
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED, run_after__lte=now) | (expired & Q(attempts__lt=F('max_attempts'))))
+            .order_by('run_after', 'id')[:limit]
+        )
+        for claimed in jobs:
+            claimed.status = Job.RUNNING
+            claimed.locked_by = worker
+            claimed.locked_at = now
+            claimed.attempts += 1
+        Job.objects.bulk_update(jobs, ['status', 'locked_by', 'locked_at', 'attempts'])
+    return jobs
+
+
+def run(claimed: Job) -> bool:
+    """
+    Runs a claimed job and records the outcome.
+
+    Returns:
+        bool: Whether the job succeeded.
+    """
+    try:
+        handler = _handlers[claimed.name]
+        with transaction.atomic():
+            handler(**claimed.payload)
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s.", claimed.pk, claimed.name, claimed.attempts)
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts < claimed.max_attempts:
+            delay = getattr(settings, 'JOB_RETRY_DELAY', 10) * 2 ** (claimed.attempts - 1)
+            claimed.status = Job.QUEUED
+            claimed.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            claimed.status = Job.FAILED
+            claimed.finished_at = timezone.now()
+        claimed.save(update_fields=['status', 'run_after', 'last_error', 'finished_at'])
+        return False
+
+    claimed.status = Job.DONE
+    claimed.finished_at = timezone.now()
+    claimed.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+def run_pending(worker: str, limit: int = 10) -> int:
+    """
+    Claims and runs one batch of due jobs.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    jobs = claim(worker, limit)
+    for claimed in jobs:
+        run(claimed)
+    return len(jobs)
+
+
+def prune(older_than: timedelta) -> int:
+    """
+    Deletes jobs that succeeded more than `older_than` ago.
+    """
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,60 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from api.benchmarks import CONCURRENCY_PAIRS, run_concurrent
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the throughput of the sync and async versions of the read-heavy "
+        "endpoints on a running server, under many concurrent clients."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help="Base URL of the running server, which must share this database."
+        )
+        parser.add_argument('--clients', type=int, default=100, help="Concurrent clients.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run each endpoint.")
+        parser.add_argument('--users', type=int, default=20, help="Users to sample as requesters.")
+        parser.add_argument('--only', nargs='+', help="Run only the named endpoints.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(hobbies__isnull=False).distinct().order_by('?')[:options['users']])
+        if not users:
+            raise CommandError("No users with hobbies to benchmark with; run seed_synthetic first.")
+
+        # Sessions are stored in the shared database, so the server accepts them
+        cookies = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for user in users:
+                client = Client()
+                client.force_login(user)
+                session = client.cookies[settings.SESSION_COOKIE_NAME].value
+                cookies.append(f'{settings.SESSION_COOKIE_NAME}={session}')
+
+        results = {}
+        for name, sync_name, async_name, query in CONCURRENCY_PAIRS:
+            if options['only'] and name not in options['only']:
+                continue
+            for mode, url_name in (('sync', sync_name), ('async', async_name)):
+                path = reverse(f'api:{url_name}') + query
+                result = run_concurrent(options['url'], path, cookies, options['clients'], options['duration'])
+                results[f'{name}:{mode}'] = result
+                self.stdout.write(
+                    f"{name:30} {mode:5}  {result['requests_per_second']:8.1f} req/s  "
+                    f"p50 {result['p50_ms'] or 0:8.2f}ms  p99 {result['p99_ms'] or 0:8.2f}ms  "
+                    f"errors {result['errors']}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.test.utils import override_settings
+
+from api.benchmarks import BENCHMARKS, find_regressions, run_benchmark
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the API endpoints through the Django test client against the "
+        "current database, and fails if results regress past a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Measured requests per user.")
+        parser.add_argument('--users', type=int, default=5, help="Users to sample as requesters.")
+        parser.add_argument('--only', nargs='+', help="Run only the named benchmarks.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--baseline', help="Compare with the results stored in this JSON file.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help="Allowed p90 latency growth over the baseline, as a fraction."
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help="Overwrite --baseline with these results instead of comparing."
+        )
+
+    def handle(self, *args, **options):
+        benchmarks = [b for b in BENCHMARKS if not options['only'] or b.name in options['only']]
+        users = list(User.objects.filter(hobbies__isnull=False).distinct().order_by('?')[:options['users']])
+        if not users:
+            raise CommandError("No users with hobbies to benchmark with; run seed_synthetic first.")
+
+        results = {}
+        # The test client sends requests for the "testserver" host
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for benchmark in benchmarks:
+                results[benchmark.name] = result = run_benchmark(benchmark, users, options['iterations'])
+                self.stdout.write(
+                    f"{benchmark.name:32} p50 {result['p50_ms']:8.2f}ms  p90 {result['p90_ms']:8.2f}ms  "
+                    f"p99 {result['p99_ms']:8.2f}ms  queries {result['queries_p50']}/{result['queries_max']}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        if options['baseline'] and options['update_baseline']:
+            with open(options['baseline'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}."))
+
+        elif options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = find_regressions(results, json.load(baseline), options['tolerance'])
+            if regressions:
+                raise CommandError("Benchmarks regressed:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import logging
+import os
+import secrets
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from api.auth_pool import hashing_pool, login_throttle
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures password hashes and logins per second per core with the configured "
+        "password hasher, and how cheaply throttled attempts are rejected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds to run each phase.")
+        parser.add_argument('--clients', type=int, default=32, help="Concurrent clients logging in.")
+
+    def handle(self, *args, **options):
+        duration = options['duration']
+        cores = os.cpu_count() or 1
+        password = secrets.token_urlsafe(12)
+        user = User.objects.create_user(
+            f"login_benchmark_{secrets.token_hex(4)}", f"{secrets.token_hex(8)}@benchmark.invalid", password
+        )
+        self.stdout.write(
+            f"Hasher {get_hasher().algorithm}, {cores} cores, {hashing_pool.workers()} pool workers, "
+            f"{options['clients']} clients."
+        )
+
+        # Shed and rejected logins would otherwise log a warning each
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+
+        try:
+            # The test client sends requests for the "testserver" host
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                encoded = user.password
+                rate = self.repeat(lambda: check_password(password, encoded), duration)
+                self.stdout.write(f"{'password checks, one thread':34} {rate:9.1f}/s  {rate:9.1f}/s per core")
+
+                login_throttle.reset()
+                statuses = self.concurrent_logins(user.username, password, options['clients'], duration)
+                self.report("successful logins", statuses, duration, cores)
+
+                login_throttle.reset()
+                statuses = self.concurrent_logins(user.username, 'wrong-password', options['clients'], duration)
+                self.report("failed logins", statuses, duration, cores)
+        finally:
+            request_logger.setLevel(level)
+            login_throttle.reset()
+            user.delete()
+
+    @staticmethod
+    def repeat(function, duration: float) -> float:
+        count, started = 0, time.perf_counter()
+        while time.perf_counter() - started < duration:
+            function()
+            count += 1
+        return count / (time.perf_counter() - started)
+
+    @staticmethod
+    def concurrent_logins(username: str, password: str, clients: int, duration: float) -> Counter:
+        url = reverse('api:login')
+        deadline = time.perf_counter() + duration
+
+        def client() -> Counter:
+            statuses: Counter = Counter()
+            browser = Client()
+            while time.perf_counter() < deadline:
+                response = browser.post(
+                    url, {'username': username, 'password': password}, content_type='application/json'
+                )
+                statuses[response.status_code] += 1
+                if response.status_code == 503:
+                    # Back off like a real client, rather than spinning on the CPU the pool needs
+                    time.sleep(0.01)
+            return statuses
+
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            return sum(executor.map(lambda _: client(), range(clients)), Counter())
+
+    def report(self, label: str, statuses: Counter, duration: float, cores: int) -> None:
+        # Only 200 and 401 responses checked a password; 429 and 503 were shed
+        verified = (statuses[200] + statuses[401]) / duration
+        breakdown = ', '.join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+        self.stdout.write(f"{label:34} {verified:9.1f}/s  {verified / cores:9.1f}/s per core  ({breakdown})")
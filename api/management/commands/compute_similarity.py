@@ -0,0 +1,73 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import User, UserSimilarity
+from api.similarity_engine import METRICS, load_hobby_matrix, top_k_similar
+
+
+class Command(BaseCommand):
+    help = "Computes the top-K similar users for every user with the NumPy batch engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=METRICS, default='overlap')
+        parser.add_argument('--top-k', type=int, default=50, help="Neighbours to keep per user.")
+        parser.add_argument(
+            '--memory-mb', type=float, default=256,
+            help="Memory ceiling for each blocked matrix product."
+        )
+        parser.add_argument('--output', help="Write the neighbours of every user to this JSONL file.")
+        parser.add_argument(
+            '--store', action='store_true',
+            help="Replace the UserSimilarity table with the results (overlap metric only)."
+        )
+
+    def handle(self, *args, **options):
+        if options['store'] and options['metric'] != 'overlap':
+            raise CommandError("--store keeps shared hobby counts and requires --metric overlap.")
+        if options['top_k'] < 1:
+            raise CommandError("--top-k must be at least 1.")
+
+        started = time.perf_counter()
+        matrix = load_hobby_matrix()
+        loaded = time.perf_counter()
+        result = top_k_similar(matrix, options['top_k'], options['metric'], options['memory_mb'])
+        computed = time.perf_counter()
+
+        self.stdout.write(
+            f"{matrix.shape[0]} users x {matrix.shape[1]} hobbies: "
+            f"loaded in {loaded - started:.2f}s, scored in {computed - loaded:.2f}s."
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                for user_id, neighbours in result.items():
+                    output.write(json.dumps({'user_id': user_id, 'neighbours': neighbours}) + '\n')
+            self.stdout.write(f"Wrote neighbours to {options['output']}.")
+
+        if options['store']:
+            self.stdout.write(f"Stored {self.store(result)} similarity rows.")
+
+    def store(self, result) -> int:
+        now = timezone.now()
+        written = 0
+
+        with transaction.atomic():
+            UserSimilarity.objects.all().delete()
+            batch = []
+            for user_id, neighbours in result.items():
+                batch.extend(
+                    UserSimilarity(user_id=user_id, other_id=other_id, shared_count=int(score), computed_at=now)
+                    for other_id, score in neighbours
+                )
+                if len(batch) >= 5000:
+                    UserSimilarity.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            UserSimilarity.objects.bulk_create(batch)
+            written += len(batch)
+            User.objects.update(similarity_computed_at=now)
+        return written
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_io import export_records, format_from_path, write_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports every user with their hobbies and friendships to a CSV or JSONL "
+        "file that import_data can read back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or - for standard output.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Users read per query.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or format_from_path(options['path'])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+
+        stream = sys.stdout if options['path'] == '-' else open(options['path'], 'w', newline='', encoding='utf-8')
+        try:
+            written = write_records(stream, fmt, export_records(options['chunk_size']))
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        if options['path'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Exported {written} users to {options['path']}."))
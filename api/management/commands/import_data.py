@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_io import UserImporter, chunked, format_from_path, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users with their hobbies and friendships from a CSV or JSONL file, "
+        "in fixed-size chunks with bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or - for standard input.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Records written per transaction.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or format_from_path(options['path'])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        importer = UserImporter()
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        try:
+            for chunk in chunked(read_records(stream, fmt), options['chunk_size']):
+                importer.import_chunk(chunk)
+                self.stdout.write(f"{importer.created} users imported...", ending='\r')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in importer.errors:
+            self.stderr.write(f"Invalid record {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.created} users, {importer.hobby_links} hobby links and "
+            f"{importer.friendships} friendships; skipped {importer.skipped} existing or conflicting "
+            f"users, {importer.invalid} invalid records, {importer.unresolved_hobbies} hobbies that could "
+            f"not be created and {importer.unresolved_friends} links to unknown friends."
+        ))
+
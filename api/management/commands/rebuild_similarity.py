@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import enqueue
+from api.similarity import rebuild_similarity_table, similarity_top_k
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the precomputed top-K similar users table in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=None,
+            help="Neighbours to keep per user (defaults to settings.SIMILARITY_TOP_K)."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Users to recompute per bulk insert."
+        )
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help="Queue the rebuild for run_worker instead of running it here."
+        )
+
+    def handle(self, *args, **options):
+        k = options['top_k'] or similarity_top_k()
+        if options['enqueue']:
+            enqueue('rebuild_similarity_table', {'k': k, 'batch_size': options['batch_size']}, key='all')
+            self.stdout.write(self.style.SUCCESS("Queued a rebuild of the similarity table."))
+            return
+
+        written = rebuild_similarity_table(k, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Stored {written} similarity rows (top {k} per user)."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.friendships import recount_counters
+
+
+class Command(BaseCommand):
+    help = "Recomputes every user's friend and pending friend request counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help="Users to read and update per batch."
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Corrected the counters of {fixed} users."))
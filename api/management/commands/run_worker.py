@@ -0,0 +1,52 @@
+from datetime import timedelta
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.jobs import prune, run_pending
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help="Jobs claimed at a time.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument('--keep-days', type=float, default=7, help="Days to keep finished jobs.")
+        parser.add_argument('--once', action='store_true', help="Run the due jobs, then exit.")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        keep = timedelta(days=options['keep_days'])
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        # Finish the current batch before exiting
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Worker {worker} started.")
+        last_prune = 0.0
+        while not stopping:
+            close_old_connections()
+            ran = run_pending(worker, options['batch_size'])
+            if ran:
+                self.stdout.write(f"Ran {ran} jobs.")
+
+            if time.monotonic() - last_prune > 3600:
+                prune(keep)
+                last_prune = time.monotonic()
+
+            if options['once'] and not ran:
+                break
+            if not ran:
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(f"Worker {worker} stopped.")
@@ -0,0 +1,133 @@
+from datetime import date, timedelta
+import random
+import secrets
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.friendships import recount_counters
+from api.models import User, Hobby, FriendRequests, hobby_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic users, hobbies, hobby assignments, friendships and "
+        "friend requests in bulk, with skewed (Zipf-like) popularity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--hobbies', type=int, default=200)
+        parser.add_argument('--hobbies-per-user', type=float, default=8, help="Average hobbies per user.")
+        parser.add_argument('--friends-per-user', type=float, default=10, help="Average friends per user.")
+        parser.add_argument('--requests-per-user', type=float, default=2, help="Average pending requests per user.")
+        parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent for hobby and user popularity.")
+        parser.add_argument('--password', default='synthetic', help="Password set on every generated user.")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = f"synthetic_{secrets.token_hex(3)}"
+
+        with transaction.atomic():
+            hobby_ids = self.create_hobbies(prefix, options['hobbies'], batch_size)
+            user_ids = self.create_users(prefix, options['users'], options['password'], rng, batch_size)
+
+            hobby_weights = self.zipf_weights(len(hobby_ids), options['skew'])
+            user_weights = self.zipf_weights(len(user_ids), options['skew'])
+            rng.shuffle(user_weights)
+
+            assignments = self.assign_hobbies(user_ids, hobby_ids, hobby_weights, options['hobbies_per_user'], rng, batch_size)
+            friendships = self.create_friendships(user_ids, user_weights, options['friends_per_user'], rng, batch_size)
+            requests = self.create_requests(
+                user_ids, user_weights, friendships, options['requests_per_user'], rng, batch_size
+            )
+            recount_counters(user_ids, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(user_ids)} users, {len(hobby_ids)} hobbies, {assignments} hobby assignments, "
+            f"{len(friendships)} friendships and {requests} friend requests (prefix {prefix})."
+        ))
+
+    @staticmethod
+    def zipf_weights(count: int, skew: float) -> list[float]:
+        return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+    @staticmethod
+    def create_hobbies(prefix: str, count: int, batch_size: int) -> list[int]:
+        hobbies = Hobby.objects.bulk_create(
+            [Hobby(name=name, key=hobby_key(name)) for name in (f"{prefix}_hobby_{i}" for i in range(count))],
+            batch_size=batch_size
+        )
+        return [hobby.id for hobby in hobbies]
+
+    @staticmethod
+    def create_users(prefix: str, count: int, password: str, rng: random.Random, batch_size: int) -> list[int]:
+        # Hash once; every synthetic user shares the same password hash
+        password_hash = make_password(password)
+        oldest = date(1950, 1, 1)
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"{prefix}_{i}",
+                    email=f"{prefix}_{i}@example.com",
+                    first_name="Synthetic",
+                    last_name=f"User {i}",
+                    password=password_hash,
+                    date_of_birth=oldest + timedelta(days=rng.randrange(365 * 58)),
+                )
+                for i in range(count)
+            ],
+            batch_size=batch_size,
+        )
+        return [user.id for user in users]
+
+    @staticmethod
+    def assign_hobbies(user_ids: list[int], hobby_ids: list[int], weights: list[float], average: float,
+                       rng: random.Random, batch_size: int) -> int:
+        UserHobby = User.hobbies.through
+        rows = []
+        for user_id in user_ids:
+            wanted = min(len(hobby_ids), max(0, round(rng.expovariate(1 / average)))) if average else 0
+            chosen = set(rng.choices(hobby_ids, weights=weights, k=wanted))
+            rows.extend(UserHobby(user_id=user_id, hobby_id=hobby_id) for hobby_id in chosen)
+        UserHobby.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
+
+    @staticmethod
+    def create_friendships(user_ids: list[int], weights: list[float], average: float,
+                           rng: random.Random, batch_size: int) -> set[tuple[int, int]]:
+        # Popular users are picked more often, giving a heavy-tailed degree distribution
+        pairs = set()
+        wanted = int(len(user_ids) * average / 2)
+        for _ in range(wanted):
+            a, b = rng.choices(user_ids, weights=weights, k=2)
+            if a != b:
+                pairs.add((min(a, b), max(a, b)))
+
+        Friendship = User.friends_list.through
+        Friendship.objects.bulk_create(
+            [Friendship(from_user_id=a, to_user_id=b) for a, b in pairs]
+            + [Friendship(from_user_id=b, to_user_id=a) for a, b in pairs],
+            batch_size=batch_size,
+        )
+        return pairs
+
+    @staticmethod
+    def create_requests(user_ids: list[int], weights: list[float], friendships: set[tuple[int, int]],
+                        average: float, rng: random.Random, batch_size: int) -> int:
+        pairs = set()
+        for _ in range(int(len(user_ids) * average)):
+            sender = rng.choice(user_ids)
+            receiver = rng.choices(user_ids, weights=weights, k=1)[0]
+            if sender != receiver and (min(sender, receiver), max(sender, receiver)) not in friendships:
+                pairs.add((sender, receiver))
+
+        FriendRequests.objects.bulk_create(
+            [FriendRequests(sender_id=sender, receiver_id=receiver) for sender, receiver in pairs],
+            batch_size=batch_size,
+        )
+        return len(pairs)
@@ -0,0 +1,289 @@
+"""
+Per-view request and SQL metrics, exposed in Prometheus text format.
+
+Enable it by adding `api.metrics.QueryMetricsMiddleware` to `MIDDLEWARE`
+(after the authentication middleware). Every request is then recorded
+against the URL name it resolved to in `api/urls.py`, with its latency,
+SQL query count and SQL time. Any query shape repeated at least
+`settings.METRICS_N_PLUS_ONE_THRESHOLD` times (default 5) within one
+request is counted as a suspected N+1 pattern.
+
+The middleware works under WSGI and ASGI. Queries are attributed to the
+request through a context variable, so those that async views run in
+`sync_to_async` threads are counted too. Streaming responses are recorded
+once their content has been sent, including the queries made while
+streaming, so their latency is that of the whole stream.
+
+The middleware keeps plain counters in process memory and only adds a query
+execution wrapper to each connection, so it is cheap enough to leave on in
+production. Each worker process reports its own numbers.
+"""
+from collections import Counter
+from typing import AsyncIterator, Callable, Iterator, Optional
+import contextvars
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Shapes kept per view, so a view issuing endless distinct queries cannot grow memory
+MAX_SHAPES_PER_VIEW = 20
+
+_IN_LIST = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))*\)')
+
+
+def query_shape(sql: str) -> str:
+    """
+    Normalizes a query so that variable-length IN lists compare equal.
+    """
+    return _IN_LIST.sub('(...)', ' '.join(sql.split()))
+
+
+class Histogram:
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class ViewMetrics:
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.n_plus_one_requests = 0
+        self.n_plus_one_shapes: Counter = Counter()
+
+
+class QueryRecorder:
+    """
+    An `execute_wrapper` that counts and times the queries of one request.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def __call__(self, execute: Callable, sql: str, params, many: bool, context: dict):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated_shapes(self, threshold: int) -> Counter:
+        """
+        Returns the query shapes run at least `threshold` times.
+        """
+        shapes: Counter = Counter()
+        for sql, times in self.statements.items():
+            shapes[query_shape(sql)] += times
+        return Counter({shape: times for shape, times in shapes.items() if times >= threshold})
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._views: dict[str, ViewMetrics] = {}
+
+    def record(self, view: str, seconds: float, recorder: QueryRecorder) -> None:
+        threshold = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 5)
+        repeated = recorder.repeated_shapes(threshold) if recorder.count >= threshold else Counter()
+
+        with self._lock:
+            metrics = self._views.setdefault(view, ViewMetrics())
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(recorder.count)
+            metrics.sql_seconds += recorder.seconds
+            if repeated:
+                metrics.n_plus_one_requests += 1
+                for shape in repeated:
+                    if shape in metrics.n_plus_one_shapes or len(metrics.n_plus_one_shapes) < MAX_SHAPES_PER_VIEW:
+                        metrics.n_plus_one_shapes[shape] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views = {}
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            lines += _histogram_lines(
+                'hobbies_request_latency_seconds', 'Request latency by view.',
+                [(view, metrics.latency) for view, metrics in views],
+            )
+            lines += _histogram_lines(
+                'hobbies_request_sql_queries', 'SQL queries per request by view.',
+                [(view, metrics.queries) for view, metrics in views],
+            )
+
+            lines.append('# HELP hobbies_request_sql_seconds_total Time spent in SQL by view.')
+            lines.append('# TYPE hobbies_request_sql_seconds_total counter')
+            for view, metrics in views:
+                lines.append(f'hobbies_request_sql_seconds_total{{view="{view}"}} {metrics.sql_seconds:.6f}')
+
+            lines.append('# HELP hobbies_n_plus_one_requests_total Requests repeating a query shape.')
+            lines.append('# TYPE hobbies_n_plus_one_requests_total counter')
+            for view, metrics in views:
+                lines.append(f'hobbies_n_plus_one_requests_total{{view="{view}"}} {metrics.n_plus_one_requests}')
+
+            lines.append('# HELP hobbies_n_plus_one_shape_total Requests in which a query shape was repeated.')
+            lines.append('# TYPE hobbies_n_plus_one_shape_total counter')
+            for view, metrics in views:
+                for shape, times in metrics.n_plus_one_shapes.most_common():
+                    lines.append(
+                        f'hobbies_n_plus_one_shape_total{{view="{view}",query="{_escape(shape)}"}} {times}'
+                    )
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name: str, help_text: str, histograms: list) -> list[str]:
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for view, histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+# The recorder of the request being served, which `sync_to_async` threads inherit
+_recorder: contextvars.ContextVar[Optional[QueryRecorder]] = contextvars.ContextVar('query_recorder', default=None)
+
+
+def _record_query(execute: Callable, sql: str, params, many: bool, context: dict):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install(connection, **kwargs) -> None:
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class QueryMetricsMiddleware:
+    """
+    Records latency and SQL metrics for every request against its URL name.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        # Connections are per thread, so each one gets the wrapper when it connects
+        connection_created.connect(_install)
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    def finish(self, request: HttpRequest, response: HttpResponse, recorder: QueryRecorder,
+               started: float) -> HttpResponse:
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match is not None and match.url_name else 'unresolved'
+
+        if not response.streaming:
+            registry.record(view, time.perf_counter() - started, recorder)
+        elif response.is_async:
+            response.streaming_content = _recorded_async(response.streaming_content, view, recorder, started)
+        else:
+            response.streaming_content = _recorded(response.streaming_content, view, recorder, started)
+        return response
+
+
+def _recorded(content: Iterator, view: str, recorder: QueryRecorder, started: float) -> Iterator:
+    """
+    Streams content with its queries attributed to the request, and records
+    the request once the stream ends or is closed.
+    """
+    try:
+        while True:
+            # Only set while the stream runs, since the consumer may switch contexts between chunks
+            token = _recorder.set(recorder)
+            try:
+                chunk = next(content)
+            except StopIteration:
+                return
+            finally:
+                _recorder.reset(token)
+            yield chunk
+    finally:
+        registry.record(view, time.perf_counter() - started, recorder)
+
+
+async def _recorded_async(content: AsyncIterator, view: str, recorder: QueryRecorder,
+                          started: float) -> AsyncIterator:
+    try:
+        while True:
+            token = _recorder.set(recorder)
+            try:
+                chunk = await anext(content)
+            except StopAsyncIteration:
+                return
+            finally:
+                _recorder.reset(token)
+            yield chunk
+    finally:
+        registry.record(view, time.perf_counter() - started, recorder)
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shared_count', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_users', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-shared_count', 'other'], name='user_similarity_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'other'), name='unique_user_similarity')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def key_legacy_counts(apps, schema_editor):
+    """
+    Moves the legacy global counters onto the '/' page. Before this
+    migration every row counted the whole site, so they are summed into the
+    oldest row and the rest are deleted.
+    """
+    PageView = apps.get_model('api', 'PageView')
+    legacy = PageView.objects.filter(page__isnull=True)
+    first = legacy.order_by('id').first()
+    if first is None:
+        return
+    total = legacy.aggregate(total=Sum('count'))['total']
+    legacy.exclude(id=first.id).delete()
+    PageView.objects.filter(id=first.id).update(page='/', count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_usersimilarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageview',
+            name='page',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(key_legacy_counts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pageview',
+            name='page',
+            field=models.CharField(default='/', max_length=255, unique=True),
+        ),
+    ]
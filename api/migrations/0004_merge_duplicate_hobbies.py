@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Merges hobbies whose names only differ in case into the oldest one,
+    along with their users, so the case-insensitive constraint can be added.
+    """
+    Hobby = apps.get_model('api', 'Hobby')
+    Membership = apps.get_model('api', 'User')._meta.get_field('hobbies').remote_field.through
+
+    kept = {}
+    for hobby in Hobby.objects.order_by('id').iterator(chunk_size=2000):
+        name = hobby.name.lower()
+        if name not in kept:
+            kept[name] = hobby.id
+            continue
+        holders = Membership.objects.filter(hobby_id=kept[name]).values('user_id')
+        Membership.objects.filter(hobby_id=hobby.id).exclude(user_id__in=holders).update(hobby_id=kept[name])
+        Hobby.objects.filter(id=hobby.id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_pageview_page'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
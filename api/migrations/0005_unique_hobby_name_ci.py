@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:44
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_merge_duplicate_hobbies'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='hobby',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='unique_hobby_name_ci'),
+        ),
+    ]
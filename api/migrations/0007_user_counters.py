@@ -0,0 +1,46 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(apps, schema_editor):
+    """
+    Fills in the counters of existing users, as `recount_counters` does.
+    """
+    User = apps.get_model('api', 'User')
+    FriendRequests = apps.get_model('api', 'FriendRequests')
+    Friendship = User._meta.get_field('friends_list').remote_field.through
+
+    friends = (
+        Friendship.objects.filter(from_user_id=OuterRef('pk'))
+        .order_by().values('from_user_id').annotate(n=Count('*')).values('n')
+    )
+    pending = (
+        FriendRequests.objects.filter(receiver_id=OuterRef('pk'))
+        .order_by().values('receiver_id').annotate(n=Count('*')).values('n')
+    )
+    User.objects.update(
+        friend_count=Coalesce(Subquery(friends), 0),
+        pending_request_count=Coalesce(Subquery(pending), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='friend_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='pending_request_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def hobby_key(name):
+    # A copy of `api.models.hobby_key` as of this migration
+    return unicodedata.normalize('NFKC', ' '.join(name.split())).casefold()
+
+
+def fill_keys(apps, schema_editor):
+    """
+    Keys every hobby, merging hobbies whose names only differ in case or
+    spacing into the oldest one, along with their users.
+    """
+    Hobby = apps.get_model('api', 'Hobby')
+    Membership = apps.get_model('api', 'User')._meta.get_field('hobbies').remote_field.through
+
+    kept = {}
+    keyed = []
+    for hobby in Hobby.objects.order_by('id').iterator(chunk_size=2000):
+        key = hobby_key(hobby.name)
+        if key not in kept:
+            kept[key] = hobby.id
+            hobby.key = key
+            keyed.append(hobby)
+            continue
+        holders = Membership.objects.filter(hobby_id=kept[key]).values('user_id')
+        Membership.objects.filter(hobby_id=hobby.id).exclude(user_id__in=holders).update(hobby_id=kept[key])
+        Hobby.objects.filter(id=hobby.id).delete()
+    Hobby.objects.bulk_update(keyed, ['key'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='hobby',
+            name='unique_hobby_name_ci',
+        ),
+        migrations.AddField(
+            model_name='hobby',
+            name='key',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+    ]
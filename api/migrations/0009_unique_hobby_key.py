@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0004, so the rows it merges are committed before the table is altered
+
+    dependencies = [
+        ('api', '0008_hobby_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hobby',
+            name='key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_unique_hobby_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='response_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
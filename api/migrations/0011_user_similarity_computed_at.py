@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_user_response_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='similarity_computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
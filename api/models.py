@@ -1,16 +1,41 @@
+import unicodedata
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 
 class PageView(models.Model):
+    """
+    The view count of one page. Counts are buffered in memory and written
+    in batches by `api.pageviews`, so requests never write this table.
+    """
+    page = models.CharField(max_length=255, unique=True, default='/')
     count = models.IntegerField(default=0)
 
     def __str__(self):
-        return f"Page view count: {self.count}"
+        return f"Page view count of {self.page}: {self.count}"
+
+
+def hobby_key(name: str) -> str:
+    """
+    Returns the key hobby names are deduplicated by: the name with its
+    whitespace collapsed, Unicode-normalized and case-folded.
+
+    Folding is done here rather than with SQL `LOWER`, which only folds
+    ASCII on some databases, so lookups and inserts always agree.
+    """
+    return unicodedata.normalize('NFKC', ' '.join(name.split())).casefold()
 
 
 class Hobby(models.Model):
     name = models.CharField(max_length=100)
+    # Makes hobby names unique regardless of case, see `hobby_key`
+    key = models.CharField(max_length=255, unique=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.key = hobby_key(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -26,6 +51,29 @@ class User(AbstractUser):
     hobbies = models.ManyToManyField(Hobby, blank=True)
     friends_list = models.ManyToManyField('self', blank=True)
 
+    # Denormalized counters, kept in step by `api.friendships`
+    friend_count = models.IntegerField(default=0)
+    pending_request_count = models.IntegerField(default=0)
+    # Raised whenever the user's cached responses go stale, see `api.response_cache`
+    response_version = models.PositiveIntegerField(default=0)
+    # When the user's `UserSimilarity` rows were last computed, even if there were none
+    similarity_computed_at = models.DateTimeField(null=True, blank=True)
+
+    # Columns only changed with UPDATE expressions, which `save` must not overwrite
+    UPDATED_IN_PLACE = ('friend_count', 'pending_request_count', 'response_version', 'similarity_computed_at')
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the user, leaving out the `UPDATED_IN_PLACE` columns when
+        updating, so a stale copy of the row cannot undo their updates.
+        """
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATED_IN_PLACE
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.username
 
@@ -40,3 +88,67 @@ class FriendRequests(models.Model):
 
     def __str__(self):
         return f"{self.sender} sent a friend request to {self.receiver}"
+
+
+class UserSimilarity(models.Model):
+    """
+    A precomputed neighbour of a user, keeping only each user's top-K
+    most similar users by shared hobby count.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='similar_users'
+    )
+    other = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+    shared_count = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'other'], name='unique_user_similarity'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-shared_count', 'other'], name='user_similarity_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} shares {self.shared_count} hobbies with {self.other}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py run_worker` (see `api.jobs`).
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+            models.Index(fields=['name', 'key', 'status'], name='job_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
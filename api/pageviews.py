@@ -0,0 +1,138 @@
+"""
+A write-buffered page view counter.
+
+Increments are aggregated in process memory, per page, and written by a
+background thread every `settings.PAGE_VIEW_FLUSH_INTERVAL` seconds
+(default 5) with one `F('count') + n` update per page. Pending counts are
+also flushed when the worker exits normally, so at most one interval of
+views is lost if a worker is killed. Requests never wait on the database.
+"""
+from collections import Counter
+from typing import Iterable, Optional
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import PageView
+
+logger = logging.getLogger(__name__)
+
+# Longest page key kept, matching PageView.page
+MAX_PAGE_LENGTH = 255
+
+# Distinct pages buffered between flushes; views of further pages are dropped
+MAX_PENDING_PAGES = 10000
+
+
+class PageViewCounter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def increment(self, page: str, amount: int = 1) -> None:
+        """
+        Counts views of a page. Only touches memory.
+        """
+        page = page[:MAX_PAGE_LENGTH]
+        with self._lock:
+            if page in self._pending or len(self._pending) < MAX_PENDING_PAGES:
+                self._pending[page] += amount
+            if self._flusher is None:
+                self._start()
+
+    def pending(self) -> Counter:
+        with self._lock:
+            return Counter(self._pending)
+
+    def counts(self, pages: Optional[Iterable[str]] = None) -> dict[str, int]:
+        """
+        Returns view counts including views not flushed yet.
+
+        Args:
+            pages (Optional[Iterable[str]]): The pages to count, or all
+                pages when omitted.
+
+        Returns:
+            dict[str, int]: Maps each page to its view count.
+        """
+        persisted = PageView.objects.all()
+        pending = self.pending()
+        if pages is not None:
+            pages = list(pages)
+            persisted = persisted.filter(page__in=pages)
+            pending = Counter({page: pending[page] for page in pages if page in pending})
+
+        counts = Counter(dict(persisted.values_list('page', 'count')))
+        counts.update(pending)
+        if pages is not None:
+            return {page: counts[page] for page in pages}
+        return dict(counts)
+
+    def flush(self) -> int:
+        """
+        Writes the pending counts to the database.
+
+        If the write fails, the counts are put back and retried by the
+        next flush.
+
+        Returns:
+            int: The number of views written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        try:
+            with transaction.atomic():
+                # A fixed order keeps concurrent flushes from deadlocking
+                for page in sorted(pending):
+                    _add_views(page, pending[page])
+        except Exception:
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        return sum(pending.values())
+
+    def _start(self) -> None:
+        self._flusher = threading.Thread(target=self._run, name='page-view-flusher', daemon=True)
+        self._flusher.start()
+        atexit.register(self.stop)
+
+    def _run(self) -> None:
+        interval = getattr(settings, 'PAGE_VIEW_FLUSH_INTERVAL', 5)
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush page views.")
+
+    def stop(self) -> None:
+        """
+        Stops the background flusher and writes whatever is still pending.
+        """
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush page views on shutdown.")
+
+
+def _add_views(page: str, amount: int) -> None:
+    if PageView.objects.filter(page=page).update(count=F('count') + amount):
+        return
+    try:
+        with transaction.atomic():
+            PageView.objects.create(page=page, count=amount)
+    except IntegrityError:
+        # Another process created the row first
+        PageView.objects.filter(page=page).update(count=F('count') + amount)
+
+
+page_views = PageViewCounter()
@@ -0,0 +1,198 @@
+"""
+A per-user cache of encoded responses for the profile and friend endpoints.
+
+Views decorated with `@cache_per_user(view)` keep their GET responses in
+process memory, keyed by user, view and query string, and evicted after
+`settings.RESPONSE_CACHE_TTL` seconds (default 60) or once more than
+`settings.RESPONSE_CACHE_MAX_ENTRIES` (default 10000) are held, least
+recently used first. A repeated request is answered from the stored bytes,
+and a request whose `If-None-Match` matches the stored ETag gets a 304,
+without running the view's queries.
+
+Each entry is stored with the `User.response_version` it was built for,
+which is read from the user row that authentication loads anyway. The
+signal handlers in `api.signals` raise the version of every user whose
+responses show changed data, in the database, so every worker process
+stops serving its entries for that user on the next request:
+
+- the user's own row or hobbies, friendships or received requests;
+- a friend's row or hobbies;
+- the row or hobbies of someone who sent the user a request.
+
+Responses are built from the primary database on a miss, so an entry
+stored under a new version never holds data a replica has not caught up
+with yet.
+"""
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Iterable, NamedTuple, Optional, Union
+import hashlib
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.models import F, Q, QuerySet
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+from .compact import wants_compact
+from .models import User, FriendRequests
+from .routers import primary_reads
+
+VIEWS = ('profile', 'friends', 'friend_requests')
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    content_type: str
+    etag: str
+    version: int
+    stored_at: float
+
+
+class ResponseCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[int, str, str], CachedResponse] = OrderedDict()
+
+    def get(self, key: tuple[int, str, str], version: int) -> Optional[CachedResponse]:
+        """
+        Returns the entry for a key if it was built for `version` and has
+        not expired.
+        """
+        ttl = getattr(settings, 'RESPONSE_CACHE_TTL', 60)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version or (ttl is not None and time.monotonic() - entry.stored_at >= ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: tuple[int, str, str], version: int, response: HttpResponse) -> CachedResponse:
+        """
+        Caches a response built for `version` of the user's responses.
+
+        Returns:
+            CachedResponse: The entry, with its ETag.
+        """
+        user_id = key[0]
+        body = response.content
+        etag = '"%s"' % hashlib.blake2b(b'%d:%s' % (user_id, body), digest_size=12).hexdigest()
+        entry = CachedResponse(body, response['Content-Type'], etag, version, time.monotonic())
+        max_entries = getattr(settings, 'RESPONSE_CACHE_MAX_ENTRIES', 10000)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_responses(user_ids: Union[Iterable[int], QuerySet]) -> None:
+    """
+    Raises the response version of users, so that no worker serves their
+    cached responses again.
+
+    Args:
+        user_ids (Union[Iterable[int], QuerySet]): User IDs, or a queryset
+            of them, such as `User.objects.values('id')`.
+    """
+    if not isinstance(user_ids, QuerySet):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+    User.objects.filter(id__in=user_ids).update(response_version=F('response_version') + 1)
+
+
+def invalidate_responses_showing(user_ids: Union[Iterable[int], QuerySet]) -> None:
+    """
+    Invalidates the cached responses that show these users: their own
+    profiles, their friends' friend lists and the request lists of those
+    they asked, with one UPDATE.
+    """
+    if not isinstance(user_ids, QuerySet):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+    friend_ids = User.friends_list.through.objects.filter(from_user_id__in=user_ids).values('to_user_id')
+    receiver_ids = FriendRequests.objects.filter(sender_id__in=user_ids).values('receiver_id')
+    User.objects.filter(
+        Q(id__in=user_ids) | Q(id__in=friend_ids) | Q(id__in=receiver_ids)
+    ).update(response_version=F('response_version') + 1)
+
+
+def _cache_key(request: HttpRequest, user_id: int, view: str) -> tuple[int, str, str]:
+    variant = ('compact:' if wants_compact(request) else '') + request.META.get('QUERY_STRING', '')
+    return user_id, view, variant
+
+
+def _from_cache(request: HttpRequest, entry: CachedResponse) -> HttpResponse:
+    if entry.etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry.body, content_type=entry.content_type)
+    response['ETag'] = entry.etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def _stored(request: HttpRequest, key: tuple[int, str, str], version: int, response: HttpResponse) -> HttpResponse:
+    if response.status_code != 200 or response.streaming:
+        return response
+    entry = response_cache.store(key, version, response)
+    return _from_cache(request, entry)
+
+
+def cache_per_user(view_name: str) -> Callable:
+    """
+    Caches the GET responses of a view for each logged-in user.
+
+    Works on sync and async views; apply it inside `login_required`.
+
+    Args:
+        view_name (str): One of `VIEWS`, naming the view in cache keys.
+    """
+    def decorator(view: Callable) -> Callable:
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+                if request.method != 'GET':
+                    return await view(request, *args, **kwargs)
+                user = await request.auser()
+                key = _cache_key(request, user.pk, view_name)
+                entry = response_cache.get(key, user.response_version)
+                if entry is not None:
+                    return _from_cache(request, entry)
+                with primary_reads():
+                    response = await view(request, *args, **kwargs)
+                return _stored(request, key, user.response_version, response)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            user = request.user
+            key = _cache_key(request, user.pk, view_name)
+            entry = response_cache.get(key, user.response_version)
+            if entry is not None:
+                return _from_cache(request, entry)
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            return _stored(request, key, user.response_version, response)
+        return wrapper
+    return decorator
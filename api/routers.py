@@ -0,0 +1,213 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+To enable it, add a replica to `DATABASES` (see `database_settings`), then:
+
+    DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+    MIDDLEWARE += ['api.routers.ReplicaPinMiddleware']
+
+Writes always go to the primary ('default'). Reads go to the replica
+(`settings.DATABASE_REPLICA_ALIAS`, default 'replica') only inside views
+marked with `@replica_reads`, and only for GET and HEAD requests.
+
+A request that writes pins its client to the primary for
+`settings.DATABASE_REPLICA_PIN_SECONDS` seconds (default 5) with a
+cookie, so replication lag cannot hide the client's own changes. Reads later
+in the same request also stay on the primary. Sessions are always read from
+the primary, so a fresh login is never lost to lag.
+
+The in-memory caches and indexes are always built from the primary (see
+`primary_reads`), so replication lag does not outlive a request.
+"""
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator, Optional
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest, HttpResponse
+
+PIN_COOKIE = 'db_pin'
+
+
+class RoutingState:
+    """
+    How the database reads of one request are routed.
+    """
+
+    def __init__(self, pinned: bool = False) -> None:
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+
+
+# A mutable state per request, so writes made in `sync_to_async` threads are seen by the request
+_state: contextvars.ContextVar[Optional[RoutingState]] = contextvars.ContextVar('db_routing', default=None)
+
+
+def replica_alias() -> Optional[str]:
+    """
+    Returns the replica's database alias, or None if none is configured.
+    """
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to the replica when the current request allows it, and
+    every write to the primary.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        state = _state.get()
+        if state is None or not state.replica_reads or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label == 'sessions':
+            return DEFAULT_DB_ALIAS
+        return replica_alias() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Both aliases hold the same data
+        return True
+
+
+def replica_reads(view: Callable) -> Callable:
+    """
+    Lets the safe (GET and HEAD) requests of a view read from the replica.
+
+    Works on sync and async views.
+    """
+    def allowed(request: HttpRequest) -> Optional[RoutingState]:
+        state = _state.get()
+        if state is not None and request.method in ('GET', 'HEAD'):
+            return state
+        return None
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            state = allowed(request)
+            if state is None:
+                return await view(request, *args, **kwargs)
+            state.replica_reads = True
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                state.replica_reads = False
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        state = allowed(request)
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = False
+    return wrapper
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """
+    Sends the reads inside the block, or decorated function, to the primary.
+
+    Used to build the in-memory caches, which outlive the request and would
+    otherwise keep any replication lag until they expire.
+    """
+    state = _state.get()
+    if state is None or not state.replica_reads:
+        yield
+        return
+    state.replica_reads = False
+    try:
+        yield
+    finally:
+        state.replica_reads = True
+
+
+class ReplicaPinMiddleware:
+    """
+    Tracks the routing state of each request, and pins clients that have
+    just written to the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(response, state)
+
+    @staticmethod
+    def pin(response: HttpResponse, state: RoutingState) -> HttpResponse:
+        if state.wrote and replica_alias() is not None:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def database_settings(primary: dict, replica: Optional[dict] = None, max_age: Optional[int] = 60) -> dict:
+    """
+    Builds a `DATABASES` setting with persistent, health-checked connections.
+
+    Each connection is kept open for `max_age` seconds (None keeps it until
+    it fails) and checked before it is reused after a request, so a
+    connection dropped by the server is replaced rather than failing a
+    request. Under PostgreSQL, put PgBouncer in transaction mode in front
+    of each database to pool connections across worker processes.
+
+    Args:
+        primary (dict): The primary database, as in `DATABASES['default']`.
+        replica (Optional[dict]): A read replica of the primary. Tests use
+            the primary in its place.
+        max_age (Optional[int]): `CONN_MAX_AGE` for both databases.
+
+    Returns:
+        dict: The `DATABASES` setting.
+    """
+    connection = {'CONN_MAX_AGE': max_age, 'CONN_HEALTH_CHECKS': True}
+    databases = {DEFAULT_DB_ALIAS: {**connection, **primary}}
+    if replica is not None:
+        databases['replica'] = {
+            **connection,
+            **replica,
+            'TEST': {'MIRROR': DEFAULT_DB_ALIAS, **replica.get('TEST', {})},
+        }
+    return databases
@@ -0,0 +1,202 @@
+"""
+In-process search over hobby names and usernames.
+
+Names are normalized (accents stripped, case folded, whitespace collapsed)
+and indexed twice: in a sorted list for prefix lookups by bisection, and
+by word trigrams for fuzzy matching. Results are ranked exact match first,
+then prefix matches, then matches on a later word, then by trigram
+similarity, with shorter names first on ties.
+
+Like the hobby index, each worker holds its own copy, built lazily from the
+database, kept current by the signal handlers in `api.signals` and rebuilt
+after `settings.SEARCH_INDEX_TTL` seconds.
+"""
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Iterable, Optional
+import heapq
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+
+from .models import Hobby, User
+from .routers import primary_reads
+
+# Minimum trigram similarity of a fuzzy match, as in PostgreSQL's pg_trgm
+SIMILARITY_THRESHOLD = 0.3
+
+# Prefix matches examined per query, bounding the cost of one-letter queries
+PREFIX_SCAN_LIMIT = 250
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes a name for matching: strips accents, folds case and
+    collapses whitespace.
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Returns the trigrams of each word of a normalized name, padded so that
+    word starts and ends form their own trigrams.
+    """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """
+    Prefix and trigram indexes over one set of names.
+    """
+
+    def __init__(self, names: Iterable[tuple[int, str]] = ()) -> None:
+        self._names: dict[int, str] = {}
+        self._keys: dict[int, str] = {}
+        self._sorted: list[tuple[str, int]] = []
+        self._trigrams: dict[str, set[int]] = {}
+        self._gram_counts: dict[int, int] = {}
+
+        for item_id, name in names:
+            key = normalize(name)
+            self._names[item_id] = name
+            self._keys[item_id] = key
+            self._sorted.append((key, item_id))
+            self._index_trigrams(item_id, key)
+        self._sorted.sort()
+
+    def _index_trigrams(self, item_id: int, key: str) -> None:
+        grams = trigrams(key)
+        self._gram_counts[item_id] = len(grams)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(item_id)
+
+    def add(self, item_id: int, name: str) -> None:
+        if self._names.get(item_id) == name:
+            return
+        if item_id in self._keys:
+            self.remove(item_id)
+        key = normalize(name)
+        self._names[item_id] = name
+        self._keys[item_id] = key
+        insort(self._sorted, (key, item_id))
+        self._index_trigrams(item_id, key)
+
+    def remove(self, item_id: int) -> None:
+        key = self._keys.pop(item_id, None)
+        if key is None:
+            return
+        del self._names[item_id]
+        del self._gram_counts[item_id]
+        position = bisect_left(self._sorted, (key, item_id))
+        del self._sorted[position]
+        for gram in trigrams(key):
+            postings = self._trigrams.get(gram)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self._trigrams[gram]
+
+    def search(self, query: str, limit: int) -> list[tuple[int, str]]:
+        """
+        Returns the `(id, name)` pairs of the best `limit` matches.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        scores: dict[int, tuple] = {}
+
+        # Prefix matches, found by bisecting the sorted names
+        position = bisect_left(self._sorted, (query,))
+        for key, item_id in self._sorted[position:position + PREFIX_SCAN_LIMIT]:
+            if not key.startswith(query):
+                break
+            scores[item_id] = (2 if key == query else 1, 1.0, -len(key), -item_id)
+
+        # Fuzzy matches, by the share of trigrams in common. They rank below
+        # every prefix match, so are only needed when those run short.
+        query_grams = trigrams(query)
+        if len(query) >= 3 and len(scores) < limit:
+            common: Counter = Counter()
+            for gram in query_grams:
+                common.update(self._trigrams.get(gram, ()))
+            for item_id, shared in common.items():
+                if item_id in scores:
+                    continue
+                key = self._keys[item_id]
+                similarity = shared / (len(query_grams) + self._gram_counts[item_id] - shared)
+                word_prefix = any(word.startswith(query) for word in key.split())
+                if word_prefix or similarity >= SIMILARITY_THRESHOLD:
+                    scores[item_id] = (0.5 if word_prefix else 0, similarity, -len(key), -item_id)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(item_id, self._names[item_id]) for item_id, _ in best]
+
+
+class SearchIndex:
+    """
+    The search indexes of hobby names and usernames.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._indexes: dict[str, NameIndex] = {}
+        self._built_at: Optional[float] = None
+
+    def _is_fresh(self) -> bool:
+        if self._built_at is None:
+            return False
+        ttl = getattr(settings, 'SEARCH_INDEX_TTL', 300)
+        return ttl is None or time.monotonic() - self._built_at < ttl
+
+    @primary_reads()
+    def build(self) -> None:
+        indexes = {
+            'hobbies': NameIndex(Hobby.objects.values_list('id', 'name').iterator(chunk_size=10000)),
+            'users': NameIndex(User.objects.values_list('id', 'username').iterator(chunk_size=10000)),
+        }
+        with self._lock:
+            self._indexes = indexes
+            self._built_at = time.monotonic()
+
+    def ensure_built(self) -> None:
+        if not self._is_fresh():
+            self.build()
+
+    def search(self, kind: str, query: str, limit: int = 10) -> list[tuple[int, str]]:
+        """
+        Searches the hobbies or users index.
+
+        Args:
+            kind (str): 'hobbies' or 'users'.
+            query (str): The text to match.
+            limit (int): The maximum number of matches.
+
+        Returns:
+            list[tuple[int, str]]: `(id, name)` pairs, best match first.
+        """
+        self.ensure_built()
+        with self._lock:
+            return self._indexes[kind].search(query, limit)
+
+    def update(self, kind: str, item_id: int, name: str) -> None:
+        with self._lock:
+            if self._built_at is not None:
+                self._indexes[kind].add(item_id, name)
+
+    def remove(self, kind: str, item_id: int) -> None:
+        with self._lock:
+            if self._built_at is not None:
+                self._indexes[kind].remove(item_id)
+
+
+search_index = SearchIndex()
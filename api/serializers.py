@@ -0,0 +1,183 @@
+from datetime import date
+from typing import Iterable, Iterator, Mapping, Optional, Union
+
+from django.db.models import QuerySet
+
+from .models import User
+
+# User columns read to build a card
+CARD_FIELDS = ('id', 'username', 'email', 'date_of_birth')
+
+
+def calculate_age(dob: date) -> int:
+    """
+    Calculates a user's age based on their date of birth.
+
+    Args:
+        dob (date): The user's date of birth.
+
+    Returns:
+        int: The user's age.
+    """
+    today = date.today()
+    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    return age
+
+
+def card_fields(shared_hobbies: bool = False, mutual_friends: bool = False) -> list[str]:
+    """
+    Returns the fields of the cards built by `user_cards`, in order.
+
+    Args:
+        shared_hobbies (bool): Whether the cards count shared hobbies.
+        mutual_friends (bool): Whether the cards count mutual friends.
+    """
+    fields = ['username', 'email', 'age', 'hobbies']
+    if shared_hobbies:
+        fields.append('shared_hobbies')
+    if mutual_friends:
+        fields.append('mutual_friends')
+    return fields
+
+
+def _hobby_rows(user_ids: Iterable[int]) -> QuerySet:
+    return (
+        User.hobbies.through.objects
+        .filter(user_id__in=list(user_ids))
+        .order_by('user_id', 'hobby_id')
+        .values_list('user_id', 'hobby_id', 'hobby__name')
+    )
+
+
+def hobbies_by_user(user_ids: Iterable[int]) -> dict[int, list[tuple[int, str]]]:
+    """
+    Loads the hobbies of many users with a single query.
+
+    Returns:
+        dict[int, list[tuple[int, str]]]: Maps user ID to `(id, name)` pairs.
+    """
+    hobbies: dict[int, list[tuple[int, str]]] = {}
+    for user_id, hobby_id, name in _hobby_rows(user_ids):
+        hobbies.setdefault(user_id, []).append((hobby_id, name))
+    return hobbies
+
+
+async def ahobbies_by_user(user_ids: Iterable[int]) -> dict[int, list[tuple[int, str]]]:
+    """
+    Async version of `hobbies_by_user`.
+    """
+    hobbies: dict[int, list[tuple[int, str]]] = {}
+    async for user_id, hobby_id, name in _hobby_rows(user_ids):
+        hobbies.setdefault(user_id, []).append((hobby_id, name))
+    return hobbies
+
+
+def user_cards(users: Union[QuerySet, Iterable[int]], viewer_hobbies: Optional[set[int]] = None,
+               shared_counts: Optional[Mapping[int, int]] = None,
+               mutual_counts: Optional[Mapping[int, int]] = None,
+               with_hobby_ids: bool = False) -> list[dict]:
+    """
+    Serializes many users into the cards shown by the list endpoints.
+
+    Every card holds the username, email, age and hobby names. The shared
+    hobby count is added when `shared_counts` or `viewer_hobbies` is given,
+    and the mutual friend count when `mutual_counts` is given.
+    Only the needed columns are read, in two queries however many users
+    there are.
+
+    Args:
+        users (Union[QuerySet, Iterable[int]]): A user queryset, whose
+            ordering is kept, or user IDs, whose order is kept.
+        viewer_hobbies (Optional[set[int]]): Hobby IDs of the viewing user,
+            used to count shared hobbies.
+        shared_counts (Optional[Mapping[int, int]]): Precomputed shared hobby
+            counts by user ID, used instead of `viewer_hobbies`.
+        mutual_counts (Optional[Mapping[int, int]]): Mutual friend counts by
+            user ID, added to the cards as `mutual_friends` when given.
+        with_hobby_ids (bool): List hobby IDs instead of names, for the
+            compact format (see `api.compact`).
+
+    Returns:
+        list[dict]: One card per user, in the order of `users`.
+    """
+    if isinstance(users, QuerySet):
+        rows = list(users.values(*CARD_FIELDS))
+    else:
+        user_ids = list(users)
+        found = User.objects.filter(id__in=user_ids).values(*CARD_FIELDS)
+        by_id = {row['id']: row for row in found}
+        rows = [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+    hobbies = hobbies_by_user(row['id'] for row in rows)
+    return _cards_from_rows(rows, hobbies, viewer_hobbies, shared_counts, mutual_counts, with_hobby_ids)
+
+
+async def auser_cards(users: Union[QuerySet, Iterable[int]], viewer_hobbies: Optional[set[int]] = None,
+                      shared_counts: Optional[Mapping[int, int]] = None,
+                      mutual_counts: Optional[Mapping[int, int]] = None,
+                      with_hobby_ids: bool = False) -> list[dict]:
+    """
+    Async version of `user_cards`, reading through the async ORM.
+    """
+    if isinstance(users, QuerySet):
+        rows = [row async for row in users.values(*CARD_FIELDS)]
+    else:
+        user_ids = list(users)
+        by_id = {row['id']: row async for row in User.objects.filter(id__in=user_ids).values(*CARD_FIELDS)}
+        rows = [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+    hobbies = await ahobbies_by_user(row['id'] for row in rows)
+    return _cards_from_rows(rows, hobbies, viewer_hobbies, shared_counts, mutual_counts, with_hobby_ids)
+
+
+def iter_user_cards(users: QuerySet, chunk_size: int = 1000) -> Iterator[tuple[int, dict]]:
+    """
+    Streams the cards of a user queryset without holding it all in memory.
+
+    Users are read with a server-side chunked iterator and their hobbies
+    are loaded one chunk at a time.
+
+    Yields:
+        tuple[int, dict]: The user ID and card of each user, in queryset order.
+    """
+    rows = users.values(*CARD_FIELDS).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _chunk_cards(chunk)
+            chunk = []
+    if chunk:
+        yield from _chunk_cards(chunk)
+
+
+def _chunk_cards(rows: list[dict]) -> Iterator[tuple[int, dict]]:
+    cards = _cards_from_rows(rows, hobbies_by_user(row['id'] for row in rows))
+    return zip((row['id'] for row in rows), cards)
+
+
+def _cards_from_rows(rows: list[dict], hobbies: Mapping[int, list[tuple[int, str]]],
+                     viewer_hobbies: Optional[set[int]] = None,
+                     shared_counts: Optional[Mapping[int, int]] = None,
+                     mutual_counts: Optional[Mapping[int, int]] = None,
+                     with_hobby_ids: bool = False) -> list[dict]:
+    cards = []
+    for row in rows:
+        user_hobbies = hobbies.get(row['id'], [])
+        card = {
+            'username': row['username'],
+            'email': row['email'],
+            'age': calculate_age(row['date_of_birth']) if row['date_of_birth'] else None,
+            'hobbies': (
+                [hobby_id for hobby_id, _ in user_hobbies] if with_hobby_ids
+                else [name for _, name in user_hobbies]
+            ),
+        }
+        if shared_counts is not None:
+            card['shared_hobbies'] = shared_counts.get(row['id'], 0)
+        elif viewer_hobbies is not None:
+            card['shared_hobbies'] = sum(1 for hobby_id, _ in user_hobbies if hobby_id in viewer_hobbies)
+        if mutual_counts is not None:
+            card['mutual_friends'] = mutual_counts.get(row['id'], 0)
+        cards.append(card)
+    return cards
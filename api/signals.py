@@ -0,0 +1,178 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .catalog import hobby_catalog
+from .friend_graph import friend_graph
+from .hobby_index import hobby_index
+from .models import User, Hobby, FriendRequests
+from .response_cache import invalidate_responses, invalidate_responses_showing
+from .search import search_index
+
+# User columns shown by the cached profile and card responses
+DISPLAYED_USER_FIELDS = {'username', 'email', 'first_name', 'last_name', 'date_of_birth'}
+
+
+@receiver(m2m_changed, sender=User.hobbies.through)
+def sync_hobby_index_on_hobbies_change(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    """
+    Mirrors changes to `User.hobbies` into the hobby index once they commit.
+    """
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            pairs = [(user_id, [instance.pk]) for user_id in pk_set]
+        else:
+            pairs = [(instance.pk, list(pk_set))]
+        update = hobby_index.add_hobbies if action == 'post_add' else hobby_index.remove_hobbies
+
+        def apply() -> None:
+            for user_id, hobby_ids in pairs:
+                update(user_id, hobby_ids)
+
+        transaction.on_commit(apply)
+
+    elif action == 'post_clear':
+        pk = instance.pk
+        if reverse:
+            transaction.on_commit(lambda: hobby_index.clear_hobby(pk))
+        else:
+            transaction.on_commit(lambda: hobby_index.clear_user(pk))
+
+
+@receiver(post_save, sender=User)
+def sync_hobby_index_on_user_save(sender, instance: User, **kwargs) -> None:
+    """
+    Keeps the indexed date of birth in step with the user row.
+    """
+    dob = instance.date_of_birth
+    if isinstance(dob, str):
+        dob = date.fromisoformat(dob)
+    pk = instance.pk
+    transaction.on_commit(lambda: hobby_index.set_birth_date(pk, dob))
+
+
+@receiver(post_delete, sender=User)
+def sync_hobby_index_on_user_delete(sender, instance: User, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: hobby_index.remove_user(pk))
+    transaction.on_commit(lambda: friend_graph.remove_user(pk))
+
+
+@receiver(m2m_changed, sender=User.friends_list.through)
+def sync_friend_graph_on_friends_change(sender, instance, action, pk_set, **kwargs) -> None:
+    """
+    Mirrors changes to the symmetrical `User.friends_list` into the friend
+    graph once they commit.
+    """
+    pk = instance.pk
+    if action == 'post_add':
+        pairs = [(pk, friend_id) for friend_id in pk_set]
+        transaction.on_commit(lambda: friend_graph.add_edges(pairs))
+    elif action == 'post_remove':
+        pairs = [(pk, friend_id) for friend_id in pk_set]
+        transaction.on_commit(lambda: friend_graph.remove_edges(pairs))
+    elif action == 'post_clear':
+        transaction.on_commit(lambda: friend_graph.remove_user(pk))
+
+
+@receiver(post_delete, sender=Hobby)
+def sync_hobby_index_on_hobby_delete(sender, instance: Hobby, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: hobby_index.clear_hobby(pk))
+
+
+@receiver(post_save, sender=Hobby)
+@receiver(post_delete, sender=Hobby)
+def invalidate_hobby_catalog(sender, instance: Hobby, **kwargs) -> None:
+    transaction.on_commit(hobby_catalog.invalidate)
+
+
+@receiver(post_save, sender=Hobby)
+def sync_search_index_on_hobby_save(sender, instance: Hobby, **kwargs) -> None:
+    pk, name = instance.pk, instance.name
+    transaction.on_commit(lambda: search_index.update('hobbies', pk, name))
+
+
+@receiver(post_delete, sender=Hobby)
+def sync_search_index_on_hobby_delete(sender, instance: Hobby, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: search_index.remove('hobbies', pk))
+
+
+@receiver(post_save, sender=User)
+def sync_search_index_on_user_save(sender, instance: User, **kwargs) -> None:
+    pk, username = instance.pk, instance.username
+    transaction.on_commit(lambda: search_index.update('users', pk, username))
+
+
+@receiver(post_delete, sender=User)
+def sync_search_index_on_user_delete(sender, instance: User, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: search_index.remove('users', pk))
+
+
+@receiver(post_save, sender=User)
+def invalidate_responses_on_user_save(sender, instance: User, created: bool, update_fields=None, **kwargs) -> None:
+    if created or (update_fields is not None and not DISPLAYED_USER_FIELDS.intersection(update_fields)):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_responses_showing([pk]))
+
+
+@receiver(m2m_changed, sender=User.hobbies.through)
+def invalidate_responses_on_hobbies_change(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    if action in ('post_add', 'post_remove'):
+        user_ids = list(pk_set) if reverse else [instance.pk]
+        transaction.on_commit(lambda: invalidate_responses_showing(user_ids))
+    elif action == 'pre_clear' and reverse:
+        # The holders of the hobby are gone once it is cleared, so find them first
+        user_ids = list(instance.user_set.values_list('id', flat=True))
+        transaction.on_commit(lambda: invalidate_responses_showing(user_ids))
+    elif action == 'post_clear' and not reverse:
+        pk = instance.pk
+        transaction.on_commit(lambda: invalidate_responses_showing([pk]))
+
+
+@receiver(m2m_changed, sender=User.friends_list.through)
+def invalidate_responses_on_friends_change(sender, instance, action, pk_set, **kwargs) -> None:
+    if action in ('post_add', 'post_remove'):
+        user_ids = [instance.pk, *pk_set]
+        transaction.on_commit(lambda: invalidate_responses(user_ids))
+    elif action == 'pre_clear':
+        user_ids = [instance.pk, *instance.friends_list.values_list('id', flat=True)]
+        transaction.on_commit(lambda: invalidate_responses(user_ids))
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_responses_on_user_delete(sender, instance: User, **kwargs) -> None:
+    # Friendships and requests are deleted along with the user, so find who they show up for first
+    pk = instance.pk
+    user_ids = [
+        *User.friends_list.through.objects.filter(from_user_id=pk).values_list('to_user_id', flat=True),
+        *FriendRequests.objects.filter(sender_id=pk).values_list('receiver_id', flat=True),
+    ]
+    transaction.on_commit(lambda: invalidate_responses(user_ids))
+
+
+@receiver(post_save, sender=FriendRequests)
+@receiver(post_delete, sender=FriendRequests)
+def invalidate_responses_on_friend_request_change(sender, instance: FriendRequests, **kwargs) -> None:
+    # The receiver's profile shows their pending request count
+    receiver_id = instance.receiver_id
+    transaction.on_commit(lambda: invalidate_responses([receiver_id]))
+
+
+@receiver(pre_delete, sender=Hobby)
+def invalidate_responses_on_hobby_delete(sender, instance: Hobby, **kwargs) -> None:
+    user_ids = list(instance.user_set.values_list('id', flat=True))
+    transaction.on_commit(lambda: invalidate_responses_showing(user_ids))
+
+
+@receiver(post_save, sender=Hobby)
+def invalidate_responses_on_hobby_rename(sender, instance: Hobby, created: bool, **kwargs) -> None:
+    # Responses list the hobby by name
+    if not created:
+        pk = instance.pk
+        transaction.on_commit(lambda: invalidate_responses_showing(User.objects.filter(hobbies=pk).values('id')))
@@ -0,0 +1,513 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from collections import Counter
+from itertools import accumulate
+from typing import Iterable, Optional
+import base64
+import heapq
+import json
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q, QuerySet
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.http import QueryDict
+from django.utils import timezone
+
+from .hobby_index import HobbyIndex, hobby_index
+from .jobs import enqueue
+from .models import User, UserSimilarity
+from .routers import primary_reads
+
+
+def years_ago(today: date, years: int) -> date:
+    """
+    Returns the same calendar day `years` years before `today`.
+
+    February 29th falls back to February 28th in non-leap years, which
+    matches how `calculate_age` treats leap-day birthdays.
+    """
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+
+def birth_date_range(age_min: int, age_max: int, today: Optional[date] = None) -> tuple[date, date]:
+    """
+    Converts an inclusive age range into a date of birth range.
+
+    Args:
+        age_min (int): The minimum age, inclusive.
+        age_max (int): The maximum age, inclusive.
+        today (Optional[date]): The reference date. Defaults to today.
+
+    Returns:
+        tuple[date, date]: The earliest and latest dates of birth, both
+        inclusive, of users whose age is within the range.
+    """
+    today = today or date.today()
+    earliest = years_ago(today, age_max + 1) + timedelta(days=1)
+    latest = years_ago(today, age_min)
+    return earliest, latest
+
+
+def similar_users_queryset(user_id: int, hobby_ids: Iterable[int], age_min: Optional[int] = None,
+                           age_max: Optional[int] = None) -> QuerySet:
+    """
+    Builds a query ranking users by the number of hobbies they share.
+
+    The filtering, counting and ordering all happen in the database, so
+    slicing the result issues a single LIMIT/OFFSET query.
+
+    Returns:
+        QuerySet: `(user_id, shared_count)` tuples ordered by shared count
+        (descending) and then user ID.
+    """
+    hobby_ids = list(hobby_ids)
+    users = User.objects.filter(hobbies__in=hobby_ids).exclude(id=user_id)
+
+    if age_min is not None and age_max is not None:
+        users = users.filter(date_of_birth__range=birth_date_range(age_min, age_max))
+
+    return (
+        users
+        .annotate(shared_count=Count('hobbies', filter=Q(hobbies__in=hobby_ids)))
+        .order_by('-shared_count', 'id')
+        .values_list('id', 'shared_count')
+    )
+
+
+def similar_users_from_index(user_id: int, hobby_ids: Iterable[int], age_min: Optional[int] = None,
+                             age_max: Optional[int] = None) -> list[tuple[int, int]]:
+    """
+    Ranks users by the number of hobbies they share using the hobby index.
+
+    Returns:
+        list[tuple[int, int]]: `(user_id, shared_count)` tuples in the same
+        order as `similar_users_queryset`.
+    """
+    shared_counts = hobby_index.shared_counts(hobby_ids, exclude=user_id)
+
+    if age_min is not None and age_max is not None:
+        earliest, latest = birth_date_range(age_min, age_max)
+        shared_counts = {
+            other_id: count for other_id, count in shared_counts.items()
+            if (dob := hobby_index.birth_date(other_id)) is not None and earliest <= dob <= latest
+        }
+
+    return sorted(shared_counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+# Default age buckets of the similar users facets, as inclusive (min, max) ages
+AGE_BUCKETS = ((0, 17), (18, 24), (25, 34), (35, 44), (45, 54), (55, 64), (65, 120))
+
+
+def similar_user_facets(user_id: int, hobby_ids: Iterable[int], age_min: Optional[int] = None,
+                        age_max: Optional[int] = None) -> dict:
+    """
+    Summarizes the similar users of a user, for filter UIs.
+
+    Age buckets are summed from the hobby index's per-date-of-birth counts
+    without visiting any user, so their `hobby_matches` count hobby
+    matches rather than users: a user sharing two hobbies counts twice. It
+    is zero exactly when nobody of those ages shares a hobby, and bucket
+    edges follow birthdays exactly.
+
+    The shared hobby distribution counts distinct users exactly. Distinct
+    users cannot be derived from per-hobby counts, so it is tallied from
+    the posting lists of the user's hobbies, without ranking them, within
+    the age range if one is given.
+
+    Returns:
+        dict: `age_buckets` as `{'age_min', 'age_max', 'hobby_matches'}`
+        entries and `shared_hobbies` as `{'shared_hobbies', 'users'}`
+        entries, most shared first.
+    """
+    hobby_ids = set(hobby_ids)
+
+    # Prefix sums over the sorted dates of birth answer each bucket with two bisections
+    date_counts = sorted(hobby_index.birth_date_counts(hobby_ids, exclude=user_id).items())
+    dates = [dob for dob, _ in date_counts]
+    totals = [0, *accumulate(count for _, count in date_counts)]
+
+    age_buckets = []
+    for bucket_min, bucket_max in getattr(settings, 'SIMILAR_USERS_AGE_BUCKETS', AGE_BUCKETS):
+        earliest, latest = birth_date_range(bucket_min, bucket_max)
+        age_buckets.append({
+            'age_min': bucket_min,
+            'age_max': bucket_max,
+            'hobby_matches': totals[bisect_right(dates, latest)] - totals[bisect_left(dates, earliest)],
+        })
+
+    shared_counts = hobby_index.shared_counts(hobby_ids, exclude=user_id)
+    if age_min is not None and age_max is not None:
+        earliest, latest = birth_date_range(age_min, age_max)
+        distribution = Counter(
+            count for other_id, count in shared_counts.items()
+            if (dob := hobby_index.birth_date(other_id)) is not None and earliest <= dob <= latest
+        )
+    else:
+        distribution = Counter(shared_counts.values())
+    shared_hobbies = [
+        {'shared_hobbies': shared, 'users': users}
+        for shared, users in sorted(distribution.items(), reverse=True)
+    ]
+
+    return {'age_buckets': age_buckets, 'shared_hobbies': shared_hobbies}
+
+
+def materialized_similar_users(user_id: int, age_min: Optional[int] = None,
+                               age_max: Optional[int] = None) -> QuerySet:
+    """
+    Reads a user's precomputed neighbours from the `UserSimilarity` table.
+
+    Only the stored top-K neighbours are considered, so an age filter
+    narrows that list rather than searching every user.
+
+    Returns:
+        QuerySet: `(user_id, shared_count)` tuples in ranking order.
+    """
+    rows = UserSimilarity.objects.filter(user_id=user_id)
+
+    if age_min is not None and age_max is not None:
+        rows = rows.filter(other__date_of_birth__range=birth_date_range(age_min, age_max))
+
+    return rows.order_by('-shared_count', 'other_id').values_list('other_id', 'shared_count')
+
+
+def similarity_backend() -> str:
+    """
+    Returns the configured similar users backend.
+
+    `"index"` (the default) ranks in memory with the hobby index, `"sql"`
+    pushes filtering, ranking and pagination into the database and
+    `"materialized"` serves the precomputed `UserSimilarity` table.
+    """
+    return getattr(settings, 'SIMILAR_USERS_BACKEND', 'index')
+
+
+def similar_users(user_id: int, hobby_ids: Iterable[int], age_min: Optional[int] = None,
+                  age_max: Optional[int] = None):
+    """
+    Ranks similar users with the backend named by `settings.SIMILAR_USERS_BACKEND`.
+
+    Every backend returns a sliceable sequence of `(user_id, shared_count)`
+    tuples.
+    """
+    backend = similarity_backend()
+    if backend == 'materialized':
+        return materialized_similar_users(user_id, age_min, age_max)
+    if backend == 'sql':
+        return similar_users_queryset(user_id, hobby_ids, age_min, age_max)
+    return similar_users_from_index(user_id, hobby_ids, age_min, age_max)
+
+
+def encode_cursor(shared_count: int, user_id: int) -> str:
+    """
+    Encodes a position in the similar users ranking as an opaque cursor.
+    """
+    raw = json.dumps([shared_count, user_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[int, int]]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Returns:
+        Optional[tuple[int, int]]: The `(shared_count, user_id)` position, or
+        None for an empty cursor, which starts from the beginning.
+
+    Raises:
+        ValidationError: If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        shared_count, user_id = json.loads(raw)
+        return int(shared_count), int(user_id)
+    except (ValueError, TypeError):
+        raise ValidationError('Invalid cursor.')
+
+
+def similar_users_after(user_id: int, hobby_ids: Iterable[int], position: Optional[tuple[int, int]],
+                        limit: int, age_min: Optional[int] = None,
+                        age_max: Optional[int] = None) -> list[tuple[int, int]]:
+    """
+    Returns up to `limit` ranked users strictly after a cursor position.
+
+    The SQL backend seeks with a keyset condition on `(shared_count, id)`
+    and the index backend selects the next users with a bounded heap, so a
+    deep page costs the same as the first one and no total count is needed.
+    """
+    backend = similarity_backend()
+    if backend == 'materialized':
+        ranked = materialized_similar_users(user_id, age_min, age_max)
+        if position is not None:
+            shared_count, last_id = position
+            ranked = ranked.filter(
+                Q(shared_count__lt=shared_count) | Q(shared_count=shared_count, other_id__gt=last_id)
+            )
+        return list(ranked[:limit])
+
+    if backend == 'sql':
+        ranked = similar_users_queryset(user_id, hobby_ids, age_min, age_max)
+        if position is not None:
+            shared_count, last_id = position
+            ranked = ranked.filter(
+                Q(shared_count__lt=shared_count) | Q(shared_count=shared_count, id__gt=last_id)
+            )
+        return list(ranked[:limit])
+
+    shared_counts = hobby_index.shared_counts(hobby_ids, exclude=user_id)
+    candidates = ((-count, other_id) for other_id, count in shared_counts.items())
+
+    if age_min is not None and age_max is not None:
+        earliest, latest = birth_date_range(age_min, age_max)
+        candidates = (
+            key for key in candidates
+            if (dob := hobby_index.birth_date(key[1])) is not None and earliest <= dob <= latest
+        )
+
+    if position is not None:
+        start = (-position[0], position[1])
+        candidates = (key for key in candidates if key > start)
+
+    return [(other_id, -negated) for negated, other_id in heapq.nsmallest(limit, candidates)]
+
+
+def top_k_neighbours(user_id: int, k: int, index: HobbyIndex = hobby_index) -> list[tuple[int, int]]:
+    """
+    Returns the `k` users sharing the most hobbies with a user, from the
+    hobby index.
+    """
+    shared_counts = index.shared_counts(index.hobbies_of(user_id), exclude=user_id)
+    best = heapq.nsmallest(k, ((-count, other_id) for other_id, count in shared_counts.items()))
+    return [(other_id, -negated) for negated, other_id in best]
+
+
+def similarity_top_k() -> int:
+    return getattr(settings, 'SIMILARITY_TOP_K', 50)
+
+
+def recompute_similarity_rows(user_ids: Iterable[int], k: Optional[int] = None,
+                              index: HobbyIndex = hobby_index) -> int:
+    """
+    Replaces the stored neighbours of the given users with fresh top-K lists
+    from `index`.
+
+    Returns:
+        int: The number of rows written.
+    """
+    k = k or similarity_top_k()
+    user_ids = list(user_ids)
+    now = timezone.now()
+    rows = [
+        UserSimilarity(user_id=user_id, other_id=other_id, shared_count=count, computed_at=now)
+        for user_id in user_ids
+        for other_id, count in top_k_neighbours(user_id, k, index)
+    ]
+
+    with transaction.atomic():
+        UserSimilarity.objects.filter(user_id__in=user_ids).delete()
+        UserSimilarity.objects.bulk_create(rows, batch_size=1000)
+        User.objects.filter(id__in=user_ids).update(similarity_computed_at=now)
+    return len(rows)
+
+
+def rebuild_similarity_table(k: Optional[int] = None, batch_size: int = 500,
+                             index: Optional[HobbyIndex] = None) -> int:
+    """
+    Rebuilds the whole `UserSimilarity` table from a fresh hobby index.
+
+    Users are processed in batches so that memory stays bounded by
+    `batch_size` users' neighbour lists.
+
+    Args:
+        k (Optional[int]): Neighbours to keep per user, by default
+            `settings.SIMILARITY_TOP_K`.
+        batch_size (int): Users recomputed per batch.
+        index (Optional[HobbyIndex]): An index the caller has just built from
+            the database. When omitted, the shared index is rebuilt first.
+
+    Returns:
+        int: The number of rows written.
+    """
+    if index is None:
+        hobby_index.build()
+        index = hobby_index
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    written = 0
+
+    with transaction.atomic():
+        UserSimilarity.objects.all().delete()
+        for start in range(0, len(user_ids), batch_size):
+            written += recompute_similarity_rows(user_ids[start:start + batch_size], k, index)
+    return written
+
+
+def refresh_user_similarity(user_id: int) -> None:
+    """
+    Incrementally updates the `UserSimilarity` table after a user's hobbies
+    change.
+
+    Only the affected rows are touched. The user's own neighbours are
+    recomputed, and so are the neighbours of users whose top-K list gains
+    or loses a place because of the change (including ties with their
+    lowest-ranked neighbour). Rows where the user simply moved up in
+    someone's list are updated in place.
+    """
+    k = similarity_top_k()
+    new_counts = hobby_index.shared_counts(hobby_index.hobbies_of(user_id), exclude=user_id)
+
+    # Users that currently list this user among their neighbours
+    listed_by = {
+        row.user_id: row
+        for row in UserSimilarity.objects.filter(other_id=user_id)
+    }
+
+    to_recompute = {user_id}
+    to_update = []
+    for owner_id, row in listed_by.items():
+        count = new_counts.get(owner_id, 0)
+        if count < row.shared_count:
+            to_recompute.add(owner_id)
+        elif count > row.shared_count:
+            row.shared_count = count
+            to_update.append(row)
+
+    # Users that do not list this user yet but might now
+    candidates = [owner_id for owner_id in new_counts if owner_id not in listed_by]
+    stats = {}
+    for start in range(0, len(candidates), 1000):
+        stats.update(
+            (row['user_id'], row)
+            for row in UserSimilarity.objects.filter(user_id__in=candidates[start:start + 1000])
+            .values('user_id').annotate(size=Count('id'), lowest=Min('shared_count'))
+        )
+    for owner_id in candidates:
+        row = stats.get(owner_id)
+        if row is None or row['size'] < k or new_counts[owner_id] >= row['lowest']:
+            to_recompute.add(owner_id)
+
+    with transaction.atomic():
+        UserSimilarity.objects.bulk_update(to_update, ['shared_count'])
+        recompute_similarity_rows(to_recompute, k)
+
+
+def ensure_similarity_fresh(user_id: int, max_staleness: Optional[float] = None) -> Optional[datetime]:
+    """
+    Returns when a user's precomputed neighbours were computed.
+
+    Rows that were never computed are computed in the request, since there
+    is nothing to serve yet. That happens once per user and is bounded by
+    one user's top-K from the in-memory hobby index, written with a delete
+    and a bulk insert. Freshness is recorded on the user, so a user without
+    any neighbours is not recomputed on every read.
+
+    Rows older than `max_staleness` seconds are served as they are, with
+    their `computed_at`, while a `refresh_user_similarity` job recomputes
+    them. Repeated reads share the queued job, and a read that may be served
+    from the replica never waits on the table.
+    """
+    freshness = User.objects.filter(id=user_id).values_list('similarity_computed_at', flat=True)
+    computed_at = freshness.first()
+
+    if computed_at is None:
+        recompute_similarity_rows([user_id])
+        # Read back as stored, so later reads of the same rows report the same time
+        return freshness.first()
+    if max_staleness is not None and timezone.now() - computed_at > timedelta(seconds=max_staleness):
+        # The queued job is looked up on the primary, so a lagging replica does not hide it
+        with primary_reads():
+            enqueue('refresh_user_similarity', {'user_id': user_id}, key=str(user_id))
+    return computed_at
+
+
+def parse_age_range(params: QueryDict) -> tuple[Optional[int], Optional[int]]:
+    """
+    Reads the optional `age_min` and `age_max` filters, which only apply
+    when both are given.
+
+    Raises:
+        ValidationError: If either is not a whole number.
+    """
+    age_min = params.get('age_min', None)
+    age_max = params.get('age_max', None)
+    if age_min is None or age_max is None:
+        return None, None
+    try:
+        return int(age_min), int(age_max)
+    except ValueError:
+        raise ValidationError('age_min and age_max must be whole numbers.')
+
+
+def parse_max_staleness(value: Optional[str]) -> Optional[float]:
+    """
+    Reads a `max_staleness` in seconds.
+
+    Raises:
+        ValidationError: If it is not a non-negative number.
+    """
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError('max_staleness must be a number of seconds.')
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValidationError('max_staleness must be a number of seconds.')
+    return seconds
+
+
+def similar_users_page(user_id: int, hobby_ids: Iterable[int], params: QueryDict) -> tuple[list[tuple[int, int]], dict]:
+    """
+    Resolves one page of the similar users listing from request parameters.
+
+    Handles the age filters, the `max_staleness` refresh of precomputed
+    results, and both page-number and cursor pagination (see
+    `api.views.user_similarity`).
+
+    Returns:
+        tuple[list[tuple[int, int]], dict]: The `(user_id, shared_count)` rows
+        of the page and the pagination fields of the response.
+
+    Raises:
+        ValidationError: If the cursor, age range or `max_staleness` is
+        malformed.
+    """
+    hobby_ids = set(hobby_ids)
+    age_min, age_max = parse_age_range(params)
+
+    # Precomputed results are computed first if missing, and refreshed in the background if too stale
+    meta = {}
+    if similarity_backend() == 'materialized':
+        max_staleness = params.get('max_staleness', getattr(settings, 'SIMILARITY_MAX_STALENESS', None))
+        meta['computed_at'] = ensure_similarity_fresh(user_id, parse_max_staleness(max_staleness))
+
+    # Cursor mode seeks straight to the next page instead of counting pages
+    if 'cursor' in params:
+        position = decode_cursor(params['cursor'])
+        rows = similar_users_after(user_id, hobby_ids, position, 11, age_min, age_max)
+        has_next = len(rows) > 10
+        rows = rows[:10]
+        meta.update({
+            'has_next': has_next,
+            'next_cursor': encode_cursor(rows[-1][1], rows[-1][0]) if has_next else None,
+        })
+        return rows, meta
+
+    # Rank users by the number of shared hobbies (descending) and paginate
+    paginator = Paginator(similar_users(user_id, hobby_ids, age_min, age_max), 10)  # 10 users per page
+    page_obj = paginator.get_page(params.get('page', 1))
+    meta.update({
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+        'page_number': page_obj.number,
+        'total_pages': paginator.num_pages,
+    })
+    return list(page_obj), meta
@@ -0,0 +1,223 @@
+"""
+Batch engine computing hobby similarity for every pair of users at once.
+
+The `api_user_hobbies` table is loaded into a sparse user x hobby matrix in
+CSR form. Pairwise overlaps are then computed as blocked dense matrix
+products, so that memory use stays under a fixed ceiling however many
+users there are, while each user's best K neighbours are merged in as
+every block is produced.
+
+Neighbours are ordered by score, best first, then by user ID, lowest
+first. Jaccard and cosine scores are computed in float64 from the exact
+integer counts, each with a single rounded division, so pairs whose scores
+are mathematically equal get bit-identical scores and fall back to the ID
+order instead of rounding noise.
+
+Example:
+    >>> from api.similarity_engine import load_hobby_matrix, top_k_similar
+    >>> result = top_k_similar(load_hobby_matrix(), k=20, metric='jaccard')
+    >>> result.neighbours_of(user_id)
+    [(other_id, score), ...]
+"""
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+from .models import User
+
+METRICS = ('overlap', 'jaccard', 'cosine')
+
+
+@dataclass
+class HobbyMatrix:
+    """
+    A sparse user x hobby incidence matrix in CSR form.
+
+    Row `i` belongs to `user_ids[i]` and its hobbies are the column indices
+    `indices[indptr[i]:indptr[i + 1]]`.
+    """
+    user_ids: np.ndarray
+    hobby_ids: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.user_ids), len(self.hobby_ids)
+
+    @property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def dense_rows(self, start: int, stop: int) -> np.ndarray:
+        """
+        Expands rows `start:stop` into a dense float32 block.
+        """
+        block = np.zeros((stop - start, len(self.hobby_ids)), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        block[rows, self.indices[lo:hi]] = 1.0
+        return block
+
+
+@dataclass
+class TopKResult:
+    """
+    The best `k` neighbours of every user.
+
+    `neighbours[i]` holds user IDs (-1 for empty slots) and `scores[i]` the
+    matching scores, both ordered best first, for the user `user_ids[i]`.
+    """
+    user_ids: np.ndarray
+    neighbours: np.ndarray
+    scores: np.ndarray
+    metric: str
+
+    def neighbours_of(self, user_id: int) -> list[tuple[int, float]]:
+        position = np.searchsorted(self.user_ids, user_id)
+        if position >= len(self.user_ids) or self.user_ids[position] != user_id:
+            return []
+        return list(self._row(position))
+
+    def items(self) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+        for position, user_id in enumerate(self.user_ids):
+            yield int(user_id), list(self._row(position))
+
+    def _row(self, position: int) -> Iterator[tuple[int, float]]:
+        for other_id, score in zip(self.neighbours[position], self.scores[position]):
+            if other_id < 0:
+                break
+            yield int(other_id), float(score)
+
+
+def load_hobby_matrix() -> HobbyMatrix:
+    """
+    Loads every user's hobbies into a `HobbyMatrix` with two queries.
+
+    Users without hobbies are kept as empty rows.
+    """
+    user_ids = np.fromiter(User.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    pairs = np.array(
+        list(User.hobbies.through.objects.values_list('user_id', 'hobby_id').iterator(chunk_size=50000)),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    hobby_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+    rows = np.searchsorted(user_ids, pairs[:, 0])
+
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(user_ids)), out=indptr[1:])
+
+    return HobbyMatrix(
+        user_ids=user_ids,
+        hobby_ids=hobby_ids,
+        indptr=indptr,
+        indices=columns[order].astype(np.int32),
+    )
+
+
+def block_size_for(n_users: int, n_hobbies: int, k: int, memory_limit_mb: float) -> int:
+    """
+    Picks the largest block of users whose working set fits the memory limit.
+
+    A step holds two dense float32 blocks of `block x n_hobbies`, a few
+    float64 `block x block` score temporaries and the `block x (k + block)`
+    candidate arrays used when merging the top-K.
+    """
+    limit = memory_limit_mb * 1024 * 1024
+    block = max(1, min(n_users, 8192))
+    while block > 1:
+        working_set = (
+            2 * block * n_hobbies * 4
+            + 4 * block * block * 8
+            + block * (k + block) * (8 + 8)
+        )
+        if working_set <= limit:
+            break
+        block //= 2
+    return block
+
+
+# Each candidate is ranked by a single int64 key holding the float32 score
+# bits (which order like the scores for non-negative values) above the
+# inverted column, so selection is exact and ties go to the lower user ID.
+_KEY_COLUMN_BASE = np.int64(2 ** 31 - 1)
+_EMPTY = np.int64(-1)
+
+
+def _rank_keys(block_scores: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    score_bits = block_scores.view(np.int32).astype(np.int64)
+    return (score_bits << 32) | (_KEY_COLUMN_BASE - columns)[None, :]
+
+
+def _scores(overlap: np.ndarray, row_degrees: np.ndarray, col_degrees: np.ndarray, metric: str) -> np.ndarray:
+    if metric == 'overlap':
+        return overlap
+    # Counts are exact integers, so each ratio below is one correctly rounded division
+    overlap = overlap.astype(np.float64)
+    row_degrees, col_degrees = row_degrees.astype(np.float64), col_degrees.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'jaccard':
+            return overlap / (row_degrees[:, None] + col_degrees[None, :] - overlap)
+        # The square root of overlap^2 / (a * b) rather than overlap / sqrt(a * b), which rounds twice
+        return np.sqrt(overlap * overlap / (row_degrees[:, None] * col_degrees[None, :]))
+
+
+def top_k_similar(matrix: HobbyMatrix, k: int = 50, metric: str = 'overlap',
+                  memory_limit_mb: float = 256) -> TopKResult:
+    """
+    Computes the `k` most similar users for every user.
+
+    Args:
+        matrix (HobbyMatrix): The user x hobby matrix to score.
+        k (int): Neighbours to keep per user.
+        metric (str): One of `overlap` (shared hobby count), `jaccard` or
+            `cosine`.
+        memory_limit_mb (float): Ceiling for the working set of a block step.
+
+    Returns:
+        TopKResult: The neighbours and scores of every user, by score and
+        then user ID. Pairs sharing no hobbies are never returned.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {', '.join(METRICS)}.")
+
+    n_users, n_hobbies = matrix.shape
+    degrees = matrix.degrees.astype(np.float32)
+    block = block_size_for(n_users, n_hobbies, k, memory_limit_mb)
+
+    neighbours = np.full((n_users, k), -1, dtype=np.int64)
+    scores = np.zeros((n_users, k), dtype=np.float32)
+
+    for row_start in range(0, n_users, block):
+        row_stop = min(row_start + block, n_users)
+        rows = matrix.dense_rows(row_start, row_stop)
+        best = np.full((row_stop - row_start, k), _EMPTY, dtype=np.int64)
+
+        for col_start in range(0, n_users, block):
+            col_stop = min(col_start + block, n_users)
+            overlap = rows @ matrix.dense_rows(col_start, col_stop).T
+            block_scores = _scores(
+                overlap, degrees[row_start:row_stop], degrees[col_start:col_stop], metric
+            ).astype(np.float32, copy=False)
+            keys = _rank_keys(block_scores, np.arange(col_start, col_stop))
+
+            # Drop pairs with nothing in common and each user's pairing with itself
+            keys[overlap == 0] = _EMPTY
+            first, last = max(row_start, col_start), min(row_stop, col_stop)
+            if first < last:
+                diagonal = np.arange(first, last)
+                keys[diagonal - row_start, diagonal - col_start] = _EMPTY
+
+            candidates = np.concatenate([best, keys], axis=1)
+            best = np.take_along_axis(candidates, np.argpartition(-candidates, k - 1, axis=1)[:, :k], axis=1)
+
+        best = -np.sort(-best, axis=1)
+        found = best != _EMPTY
+        columns = _KEY_COLUMN_BASE - (best & 0xFFFFFFFF)
+        neighbours[row_start:row_stop] = np.where(found, matrix.user_ids[np.where(found, columns, 0)], -1)
+        scores[row_start:row_stop] = np.where(found, (best >> 32).astype(np.int32).view(np.float32), 0)
+
+    return TopKResult(user_ids=matrix.user_ids, neighbours=neighbours, scores=scores, metric=metric)
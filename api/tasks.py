@@ -0,0 +1,49 @@
+"""
+Background job handlers, run by `manage.py run_worker` (see `api.jobs`).
+"""
+from typing import Optional
+
+from .friendships import adjust_counters, delete_friend_requests
+from .hobby_index import hobby_index
+from .jobs import job
+from .models import User, FriendRequests
+from .similarity import rebuild_similarity_table, refresh_user_similarity
+
+
+@job('delete_user')
+def delete_user(user_id: int) -> None:
+    """
+    Deletes a user after their pending friend requests, so that nothing is
+    left pointing at the user while the rest of their graph is removed.
+    Their friends' and receivers' counters are lowered to match.
+    """
+    delete_friend_requests(FriendRequests.objects.filter(sender_id=user_id))
+    FriendRequests.objects.filter(receiver_id=user_id).delete()
+
+    friend_ids = User.friends_list.through.objects.filter(from_user_id=user_id).values_list('to_user_id', flat=True)
+    adjust_counters('friend_count', {friend_id: -1 for friend_id in friend_ids})
+    User.objects.filter(id=user_id).delete()
+
+
+@job('refresh_user_similarity')
+def refresh_similarity(user_id: int) -> None:
+    """
+    Updates the precomputed similarity rows affected by a change of one
+    user's hobbies.
+
+    The worker's index misses every change made by other processes, so it
+    is rebuilt from the database first. Queued refreshes of the same user
+    are coalesced, which keeps the rebuilds to one per change.
+    """
+    hobby_index.build()
+    refresh_user_similarity(user_id)
+
+
+@job('rebuild_similarity_table')
+def rebuild_similarity(k: Optional[int] = None, batch_size: int = 500) -> None:
+    """
+    Rebuilds the whole precomputed similarity table from the worker's index,
+    rebuilt once from the database.
+    """
+    hobby_index.build()
+    rebuild_similarity_table(k, batch_size, index=hobby_index)
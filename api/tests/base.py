@@ -0,0 +1,39 @@
+from datetime import date
+from typing import Iterable, Optional
+
+from django.test import TestCase, override_settings
+
+from api.models import Hobby, User
+from api.response_cache import response_cache
+
+
+# A TTL of 0 rebuilds the in-process indexes on every read, so each test only sees its own rows.
+# A test mirror cannot see the rows of the test's open transaction, so views read from the primary.
+@override_settings(
+    HOBBY_INDEX_TTL=0, FRIEND_GRAPH_TTL=0, SEARCH_INDEX_TTL=0, HOBBY_CATALOG_TTL=0, DATABASE_REPLICA_ALIAS=None,
+)
+class APITestCase(TestCase):
+    """
+    A test case for the API, with helpers to create users and hobbies.
+    """
+
+    def setUp(self) -> None:
+        response_cache.clear()
+
+    @staticmethod
+    def make_hobbies(*names: str) -> list[Hobby]:
+        return [Hobby.objects.create(name=name) for name in names]
+
+    @staticmethod
+    def make_user(username: str, hobbies: Iterable[Hobby] = (), date_of_birth: Optional[date] = None) -> User:
+        user = User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password',
+            date_of_birth=date_of_birth,
+        )
+        user.hobbies.set(hobbies)
+        return user
+
+    def login(self, user: User) -> None:
+        self.client.force_login(user)
@@ -0,0 +1,44 @@
+from unittest import skipUnless
+
+from django.test import override_settings
+
+from api.benchmarks import BENCHMARKS, capture_queries, run_benchmark
+from api.models import User
+from api.routers import replica_alias
+
+from .base import APITestCase
+
+REPLICA = replica_alias()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class RunBenchmarkTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        chess, = self.make_hobbies('Chess')
+        self.users = [self.make_user('ann', [chess]), self.make_user('bob', [chess])]
+
+    def benchmark(self, name: str) -> dict:
+        [benchmark] = [benchmark for benchmark in BENCHMARKS if benchmark.name == name]
+        return run_benchmark(benchmark, self.users, iterations=2)
+
+    def test_cached_views_are_measured_without_the_cache(self) -> None:
+        # A cache hit would only load the session and the user
+        for name in ('get_profile_data', 'get_friends_list', 'get_received_friend_requests'):
+            with self.subTest(name=name):
+                self.assertGreater(self.benchmark(name)['queries_p50'], 2)
+
+
+class CaptureQueriesTests(APITestCase):
+    databases = '__all__'
+
+    def test_counts_queries_on_the_default_database(self) -> None:
+        with capture_queries() as captured:
+            User.objects.count()
+        self.assertEqual(sum(len(queries) for queries in captured), 1)
+
+    @skipUnless(REPLICA, "No replica is configured.")
+    def test_counts_queries_on_the_replica(self) -> None:
+        with capture_queries() as captured:
+            User.objects.using(REPLICA).count()
+        self.assertEqual(sum(len(queries) for queries in captured), 1)
@@ -0,0 +1,109 @@
+from unittest import mock
+import json
+import re
+
+from django.test import override_settings
+from django.urls import reverse
+
+from api.catalog import hobby_catalog
+from api.friendships import create_friend_request
+
+from .base import APITestCase
+
+SPA_TEMPLATE = '<script id="bootstrap-data" type="application/json">{{ bootstrap_json }}</script>'
+BOOTSTRAP_SCRIPT = re.compile(r'<script id="bootstrap-data" type="application/json">(.*?)</script>', re.S)
+
+
+# The built SPA page is not part of the repository, so a minimal one is served from memory
+@override_settings(
+    HOBBY_CATALOG_TTL=3600,
+    TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {
+            'loaders': [('django.template.loaders.locmem.Loader', {'api/spa/index.html': SPA_TEMPLATE})],
+        },
+    }],
+)
+class BootstrapTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        hobby_catalog.invalidate()
+        self.addCleanup(hobby_catalog.invalidate)
+        self.hobbies = self.make_hobbies('Chess', 'Hiking', 'Origami')
+        self.me = self.make_user('me', self.hobbies[:2])
+        # Built up front, so only the request's own queries are counted
+        self.catalog_version = hobby_catalog.snapshot().version
+
+    def get(self):
+        return self.client.get(reverse('api:bootstrap'))
+
+    def test_anonymous_payload(self) -> None:
+        with self.assertNumQueries(0):
+            data = self.get().json()
+
+        self.assertEqual(data['authenticated'], False)
+        self.assertIsNone(data['profile'])
+        self.assertEqual(data['pending_request_count'], 0)
+        self.assertEqual(data['hobby_catalog_version'], self.catalog_version)
+        self.assertTrue(data['csrfToken'])
+
+    def test_authenticated_payload(self) -> None:
+        create_friend_request(self.make_user('ann'), self.me)
+        self.login(self.me)
+
+        data = self.get().json()
+
+        self.assertEqual(data['authenticated'], True)
+        self.assertEqual(data['pending_request_count'], 1)
+        self.assertEqual(data['hobby_catalog_version'], self.catalog_version)
+        self.assertEqual(data['profile']['username'], 'me')
+        self.assertEqual(data['profile']['pending_request_count'], 1)
+        self.assertEqual(data['profile']['hobbies'], [[hobby.id, hobby.name] for hobby in self.hobbies[:2]])
+
+    def test_query_count_does_not_grow(self) -> None:
+        self.login(self.me)
+        # The session, the user and their hobbies
+        with self.assertNumQueries(3):
+            self.get()
+
+        self.me.hobbies.set(self.hobbies)
+        for number in range(5):
+            create_friend_request(self.make_user(f'sender{number}'), self.me)
+        with self.assertNumQueries(3):
+            self.get()
+
+    def test_page_embeds_the_payload(self) -> None:
+        self.login(self.me)
+
+        with mock.patch('api.views.page_views') as page_views, self.assertNumQueries(3):
+            response = self.client.get(reverse('api:main_spa'))
+
+        page_views.increment.assert_called_once_with('/')
+        [embedded] = BOOTSTRAP_SCRIPT.findall(response.content.decode())
+        data = json.loads(embedded)
+        self.assertEqual(data['authenticated'], True)
+        self.assertEqual(data['profile']['username'], 'me')
+
+    def test_page_escapes_markup_in_the_payload(self) -> None:
+        user = self.make_user('</script><!--<script>')
+        user.first_name = 'Tom & <b>Jerry</b>'
+        user.save()
+        self.login(user)
+
+        with mock.patch('api.views.page_views'):
+            content = self.client.get(reverse('api:main_spa')).content.decode()
+
+        self.assertEqual(content.count('</script>'), 1)
+        self.assertNotIn('<!--', content)
+        [embedded] = BOOTSTRAP_SCRIPT.findall(content)
+        self.assertNotIn('<', embedded)
+        profile = json.loads(embedded)['profile']
+        self.assertEqual(profile['username'], '</script><!--<script>')
+        self.assertEqual(profile['first_name'], 'Tom & <b>Jerry</b>')
+
+    def test_page_requires_login(self) -> None:
+        with mock.patch('api.views.page_views') as page_views:
+            response = self.client.get(reverse('api:main_spa'))
+
+        self.assertEqual(response.status_code, 302)
+        page_views.increment.assert_not_called()
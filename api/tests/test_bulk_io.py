@@ -0,0 +1,96 @@
+import io
+import json
+
+from api.bulk_io import UserImporter, chunked, export_records, read_records, split_list, join_list, write_records
+from api.friendships import add_friends, recount_counters
+from api.models import Hobby, User
+
+from .base import APITestCase
+
+
+def run_import(text: str, fmt: str, chunk_size: int = 2) -> UserImporter:
+    importer = UserImporter()
+    for chunk in chunked(read_records(io.StringIO(text), fmt), chunk_size):
+        importer.import_chunk(chunk)
+    return importer
+
+
+def jsonl(*records) -> str:
+    return ''.join((record if isinstance(record, str) else json.dumps(record)) + '\n' for record in records)
+
+
+class ListFieldTests(APITestCase):
+    def test_join_and_split_round_trip_separators_and_backslashes(self) -> None:
+        items = ['Chess', 'Polo|Water', 'back\\slash', 'end\\']
+        self.assertEqual(split_list(join_list(items)), items)
+
+    def test_unescaped_backslashes_are_kept(self) -> None:
+        self.assertEqual(split_list('C:\\games|Chess||'), ['C:\\games', 'Chess'])
+
+
+class ImportTests(APITestCase):
+    def test_non_ascii_hobbies_are_linked(self) -> None:
+        importer = run_import(jsonl(
+            {'username': 'ann', 'email': 'ann@example.com', 'hobbies': ['Éclair', 'Chess']},
+            {'username': 'bob', 'email': 'bob@example.com', 'hobbies': ['éCLAIR']},
+        ), 'jsonl')
+
+        self.assertEqual((importer.created, importer.invalid, importer.unresolved_hobbies), (2, 0, 0))
+        self.assertEqual(Hobby.objects.count(), 2)
+        eclair = Hobby.objects.get(name='Éclair')
+        self.assertEqual(set(eclair.user_set.values_list('username', flat=True)), {'ann', 'bob'})
+
+    def test_bad_records_are_reported_and_skipped(self) -> None:
+        importer = run_import(jsonl(
+            '["not", "an", "object"]',
+            '{"username": ',
+            {'username': 'ann', 'email': 'not an email'},
+            {'username': 'bob', 'email': 'bob@example.com', 'hobbies': 'Chess'},
+            {'username': 'cat', 'email': 'cat@example.com', 'hobbies': ['x' * 101]},
+            {'username': 7, 'email': 'dan@example.com'},
+            {'username': 'eve', 'email': 'eve@example.com'},
+        ), 'jsonl')
+
+        self.assertEqual((importer.created, importer.invalid), (1, 6))
+        self.assertEqual(importer.errors[0], 'line 1: not a JSON object')
+        self.assertTrue(importer.errors[1].startswith('line 2: '))
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['eve'])
+
+    def test_friends_later_in_the_file_are_linked_and_counted(self) -> None:
+        importer = run_import(jsonl(
+            {'username': 'ann', 'email': 'ann@example.com', 'friends': ['cat']},
+            {'username': 'bob', 'email': 'bob@example.com', 'friends': ['ann', 'nobody']},
+            {'username': 'cat', 'email': 'cat@example.com'},
+        ), 'jsonl', chunk_size=1)
+
+        self.assertEqual((importer.friendships, importer.unresolved_friends), (2, 1))
+        self.assertEqual(User.objects.get(username='ann').friend_count, 2)
+        self.assertEqual(recount_counters(), 0)
+
+
+class RoundTripTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        polo, eclair = self.make_hobbies('Polo|Water', 'Éclair')
+        ann = self.make_user('ann', [polo, eclair])
+        bob = self.make_user('bob', [eclair])
+        add_friends(ann, [bob.id])
+
+    def export(self, fmt: str) -> str:
+        stream = io.StringIO()
+        write_records(stream, fmt, export_records())
+        return stream.getvalue()
+
+    def test_export_then_import_restores_users_hobbies_and_friends(self) -> None:
+        for fmt in ('csv', 'jsonl'):
+            with self.subTest(fmt=fmt):
+                exported = self.export(fmt)
+                expected = list(export_records())
+                User.objects.all().delete()
+                Hobby.objects.all().delete()
+
+                importer = run_import(exported, fmt)
+
+                self.assertEqual((importer.created, importer.invalid), (2, 0))
+                self.assertEqual(list(export_records()), expected)
+                self.assertEqual(recount_counters(), 0)
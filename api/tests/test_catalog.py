@@ -0,0 +1,71 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.urls import reverse
+
+from api.catalog import get_or_create_hobbies
+from api.models import Hobby
+
+from .base import APITestCase
+
+
+class GetOrCreateHobbiesTests(APITestCase):
+    def test_names_differing_in_case_resolve_to_one_hobby(self) -> None:
+        [(chess_id, name, created)] = get_or_create_hobbies(['Chess'])
+        self.assertEqual((name, created), ('Chess', True))
+
+        self.assertEqual(get_or_create_hobbies(['  chess ', 'CHESS']), [(chess_id, 'Chess', False)])
+        self.assertEqual(Hobby.objects.count(), 1)
+
+    def test_non_ascii_names_are_folded_on_insert_and_lookup(self) -> None:
+        [(eclair_id, _, created)] = get_or_create_hobbies(['Éclair'])
+        self.assertTrue(created)
+
+        self.assertEqual(get_or_create_hobbies(['éCLAIR']), [(eclair_id, 'Éclair', False)])
+        self.assertEqual(Hobby.objects.count(), 1)
+
+    def test_saved_hobbies_share_the_key(self) -> None:
+        hobby = Hobby.objects.create(name='Straße')
+        self.assertEqual(get_or_create_hobbies(['STRASSE']), [(hobby.id, 'Straße', False)])
+
+    def test_empty_names_are_rejected(self) -> None:
+        with self.assertRaises(ValidationError):
+            get_or_create_hobbies([' '])
+
+
+class HobbiesApiTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.login(self.make_user('me'))
+
+    def post(self, data) -> HttpResponse:
+        return self.client.post(reverse('api:hobbies_api'), json.dumps(data), content_type='application/json')
+
+    def test_creates_a_non_ascii_hobby(self) -> None:
+        response = self.post({'name': 'Éclair'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Éclair')
+        self.assertTrue(response.json()['created'])
+
+        response = self.post({'name': 'éclair'})
+        self.assertEqual(response.json()['id'], Hobby.objects.get().id)
+        self.assertFalse(response.json()['created'])
+
+    def test_missing_name_is_a_bad_request(self) -> None:
+        response = self.post({})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'A hobby name or list of names is required.')
+
+    def test_names_must_be_a_list(self) -> None:
+        self.assertEqual(self.post({'names': 'Chess'}).status_code, 400)
+
+    def test_invalid_json_is_a_bad_request(self) -> None:
+        for url_name in ('api:hobbies_api', 'api:async_hobbies_api'):
+            with self.subTest(url_name=url_name):
+                response = self.client.post(reverse(url_name), '{', content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_async_missing_name_is_a_bad_request(self) -> None:
+        response = self.client.post(reverse('api:async_hobbies_api'), '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,110 @@
+from datetime import date
+from unittest import mock, skipIf
+import json
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api import compact
+from api.catalog import hobby_catalog
+from api.compact import COMPACT_MEDIA_TYPE, dumps
+from api.friendships import add_friends
+from api.models import FriendRequests, Hobby
+from api.serializers import card_fields, user_cards
+
+from .base import APITestCase
+
+
+# The catalog is kept for the whole test, so hobbies created during it are missing from the snapshot
+@override_settings(HOBBY_CATALOG_TTL=3600)
+class CompactFormatTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        hobby_catalog.invalidate()
+        self.addCleanup(hobby_catalog.invalidate)
+        self.chess, self.hiking = self.make_hobbies('Chess', 'Hiking')
+        self.me = self.make_user('me', [self.chess])
+        self.ann = self.make_user('ann', [self.chess, self.hiking])
+        add_friends(self.me, [self.ann.id])
+        self.login(self.me)
+
+    def get(self, name: str, query: str = '', **headers):
+        return self.client.get(reverse(name) + query, **headers)
+
+    def test_format_parameter_serves_one_list_per_field(self) -> None:
+        response = self.get('api:friends_list', '?format=compact')
+
+        self.assertEqual(response['Content-Type'], COMPACT_MEDIA_TYPE)
+        self.assertIn('Accept', response['Vary'])
+        data = json.loads(response.content)
+        self.assertEqual(data['friends'], {
+            'username': ['ann'],
+            'email': ['ann@example.com'],
+            'age': [None],
+            'hobbies': [[self.chess.id, self.hiking.id]],
+            'shared_hobbies': [1],
+        })
+        self.assertEqual(data['hobby_names'], {str(self.chess.id): 'Chess', str(self.hiking.id): 'Hiking'})
+        self.assertEqual(data['catalog_version'], hobby_catalog.snapshot().version)
+        self.assertEqual(data['friend_count'], 1)
+
+    def test_accept_header_selects_the_format(self) -> None:
+        FriendRequests.objects.create(sender=self.ann, receiver=self.me)
+
+        plain = self.get('api:get_received_friend_requests')
+        self.assertEqual(plain['Content-Type'], 'application/json')
+        self.assertIn('Accept', plain['Vary'])
+        self.assertEqual(plain.json()['friend_requests'][0]['username'], 'ann')
+
+        response = self.get('api:get_received_friend_requests', HTTP_ACCEPT=f'text/html, {COMPACT_MEDIA_TYPE};q=0.9')
+        self.assertEqual(response['Content-Type'], COMPACT_MEDIA_TYPE)
+        self.assertEqual(json.loads(response.content)['friend_requests']['username'], ['ann'])
+
+    def test_empty_lists_keep_every_field(self) -> None:
+        response = self.get('api:get_received_friend_requests', '?format=compact')
+
+        data = json.loads(response.content)
+        self.assertEqual(data['friend_requests'], {field: [] for field in ['id', *card_fields()]})
+        self.assertEqual(data['hobby_names'], {})
+
+    def test_current_catalog_version_leaves_out_hobby_names(self) -> None:
+        version = json.loads(self.get('api:friends_list', '?format=compact').content)['catalog_version']
+
+        current = json.loads(self.get('api:friends_list', f'?format=compact&catalog_version={version}').content)
+        self.assertNotIn('hobby_names', current)
+        self.assertEqual(current['catalog_version'], version)
+
+        stale = json.loads(self.get('api:friends_list', '?format=compact&catalog_version=stale').content)
+        self.assertIn('hobby_names', stale)
+
+    def test_hobbies_created_after_the_snapshot_are_named(self) -> None:
+        version = hobby_catalog.snapshot().version
+        origami = Hobby.objects.create(name='Origami')
+        self.ann.hobbies.add(origami)
+
+        data = json.loads(self.get('api:friends_list', f'?format=compact&catalog_version={version}').content)
+
+        self.assertEqual(data['catalog_version'], version)
+        self.assertEqual(data['hobby_names'], {
+            str(self.chess.id): 'Chess', str(self.hiking.id): 'Hiking', str(origami.id): 'Origami',
+        })
+
+    def test_card_fields_match_the_cards(self) -> None:
+        [card] = user_cards([self.ann.id], shared_counts={}, mutual_counts={})
+        self.assertEqual(list(card), card_fields(shared_hobbies=True, mutual_friends=True))
+
+        [card] = user_cards([self.ann.id])
+        self.assertEqual(list(card), card_fields())
+
+
+class DumpsTests(SimpleTestCase):
+    data = {'born': date(2000, 1, 2), 'hobbies': [1, 2]}
+    expected = b'{"born":"2000-01-02","hobbies":[1,2]}'
+
+    @skipIf(compact.orjson is None, 'orjson is not installed')
+    def test_orjson(self) -> None:
+        self.assertEqual(dumps(self.data), self.expected)
+
+    def test_json_fallback(self) -> None:
+        with mock.patch.object(compact, 'orjson', None):
+            self.assertEqual(dumps(self.data), self.expected)
@@ -0,0 +1,67 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.friendships import add_friends, create_friend_request
+
+from .base import APITestCase
+
+
+class UserDirectoryTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.chess, = self.make_hobbies('Chess')
+        self.me = self.make_user('me', [self.chess])
+        self.friend = self.make_user('friend', [self.chess])
+        self.requested = self.make_user('requested')
+        self.requester = self.make_user('requester')
+        self.stranger = self.make_user('stranger')
+        add_friends(self.me, [self.friend.id])
+        create_friend_request(self.me, self.requested)
+        create_friend_request(self.requester, self.me)
+        self.login(self.me)
+
+    def get_lines(self) -> list[dict]:
+        response = self.client.get(reverse('api:user_directory'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.endswith('\n'))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_lists_every_other_user_with_friend_flags(self) -> None:
+        lines = self.get_lines()
+
+        self.assertEqual(
+            [(line['username'], line['is_friend'], line['friend_request_sent']) for line in lines],
+            [
+                ('friend', True, False),
+                ('requested', False, True),
+                ('requester', False, False),
+                ('stranger', False, False),
+            ],
+        )
+        self.assertEqual(lines[0], {
+            'username': 'friend', 'email': 'friend@example.com', 'age': None, 'hobbies': ['Chess'],
+            'friend_request_sent': False, 'is_friend': True,
+        })
+
+    def test_query_count_does_not_grow_with_the_users(self) -> None:
+        with CaptureQueriesContext(connection) as few:
+            self.get_lines()
+
+        for number in range(10):
+            self.make_user(f'user{number}', [self.chess])
+        with CaptureQueriesContext(connection) as many:
+            lines = self.get_lines()
+
+        self.assertEqual(len(lines), 14)
+        self.assertEqual(len(many), len(few))
+
+    def test_requires_login(self) -> None:
+        self.client.logout()
+
+        response = self.client.get(reverse('api:user_directory'))
+
+        self.assertEqual(response.status_code, 302)
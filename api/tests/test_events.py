@@ -0,0 +1,88 @@
+from unittest import mock
+import asyncio
+import json
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from api.events import LocalBackend
+from api.models import FriendRequests
+
+from .base import APITestCase
+
+
+class RecordingBackend:
+    """
+    Records published events with whether the friend request still existed.
+    """
+
+    def __init__(self, request_id: int) -> None:
+        self.request_id = request_id
+        self.published = []
+
+    def publish(self, user_id: int, event: dict) -> None:
+        exists = FriendRequests.objects.filter(id=self.request_id).exists()
+        self.published.append((user_id, event['type'], exists))
+
+
+class HandleFriendRequestEventsTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.sender = self.make_user('sender')
+        self.receiver = self.make_user('receiver')
+        self.friend_request = FriendRequests.objects.create(sender=self.sender, receiver=self.receiver)
+        self.backend = RecordingBackend(self.friend_request.id)
+        self.login(self.receiver)
+
+    def handle(self, method: str):
+        with mock.patch('api.events.get_backend', return_value=self.backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                return getattr(self.client, method)(
+                    reverse('api:handle_friend_request'),
+                    json.dumps({'id': self.friend_request.id}),
+                    content_type='application/json',
+                )
+
+    def test_accept_notifies_after_the_request_is_resolved(self) -> None:
+        self.assertEqual(self.handle('put').status_code, 200)
+        self.assertEqual(self.backend.published, [
+            (self.receiver.id, 'friend_request.resolved', False),
+            (self.sender.id, 'friend_request.accepted', False),
+        ])
+
+    def test_decline_notifies_after_the_request_is_deleted(self) -> None:
+        self.assertEqual(self.handle('delete').status_code, 200)
+        self.assertEqual(self.backend.published, [(self.receiver.id, 'friend_request.resolved', False)])
+
+    def test_failed_accept_does_not_notify(self) -> None:
+        with mock.patch('api.views.add_friends', side_effect=RuntimeError('boom')):
+            self.assertEqual(self.handle('put').status_code, 500)
+        self.assertEqual(self.backend.published, [])
+        self.assertTrue(FriendRequests.objects.filter(id=self.friend_request.id).exists())
+
+
+class LocalBackendTests(SimpleTestCase):
+    def test_delivers_events_to_listeners(self) -> None:
+        backend = LocalBackend()
+
+        async def listen() -> dict:
+            events = backend.listen(1, timeout=1)
+            first = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0)
+            backend.publish(1, {'type': 'ping'})
+            try:
+                return await first
+            finally:
+                await events.aclose()
+
+        self.assertEqual(asyncio.run(listen()), {'type': 'ping'})
+        self.assertEqual(backend._listeners, {})
+
+    def test_drops_listeners_of_closed_loops(self) -> None:
+        backend = LocalBackend()
+        loop = asyncio.new_event_loop()
+        backend._listeners[1] = {(loop, asyncio.Queue())}
+        loop.close()
+
+        backend.publish(1, {'type': 'ping'})
+        self.assertEqual(backend._listeners, {})
@@ -0,0 +1,53 @@
+from django.urls import reverse
+
+from api.similarity import AGE_BUCKETS, birth_date_range
+
+from .base import APITestCase
+
+
+class SimilarUserFacetsTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        chess, golf, go = self.make_hobbies('Chess', 'Golf', 'Go')
+        # The youngest 25 year old and the oldest 24 year old, one day apart
+        oldest_24, _ = birth_date_range(24, 24)
+        _, youngest_25 = birth_date_range(25, 25)
+        self.user = self.make_user('me', [chess, golf])
+        self.make_user('both', [chess, golf], date_of_birth=youngest_25)
+        self.make_user('one', [chess], date_of_birth=oldest_24)
+        self.make_user('none', [go], date_of_birth=oldest_24)
+        self.make_user('undated', [golf])
+        self.login(self.user)
+
+    def get(self, query: str = ''):
+        return self.client.get(reverse('api:similar_users_facets') + query)
+
+    def buckets(self, response) -> dict[tuple[int, int], int]:
+        return {(b['age_min'], b['age_max']): b['hobby_matches'] for b in response.json()['age_buckets']}
+
+    def test_age_buckets_count_hobby_matches_by_exact_age(self) -> None:
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        buckets = self.buckets(response)
+        self.assertEqual(list(buckets), list(AGE_BUCKETS))
+        self.assertEqual(buckets[(18, 24)], 1)
+        self.assertEqual(buckets[(25, 34)], 2)
+        self.assertEqual(sum(buckets.values()), 3)
+
+    def test_shared_hobbies_count_distinct_users(self) -> None:
+        self.assertEqual(self.get().json()['shared_hobbies'], [
+            {'shared_hobbies': 2, 'users': 1},
+            {'shared_hobbies': 1, 'users': 2},
+        ])
+
+    def test_shared_hobbies_within_an_age_range(self) -> None:
+        self.assertEqual(self.get('?age_min=18&age_max=24').json()['shared_hobbies'], [
+            {'shared_hobbies': 1, 'users': 1},
+        ])
+
+    def test_invalid_age_range_is_rejected(self) -> None:
+        for query in ('?age_min=x&age_max=30', '?age_min=18&age_max=', '?age_min=1.5&age_max=3'):
+            with self.subTest(query=query):
+                response = self.get(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
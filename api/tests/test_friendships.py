@@ -0,0 +1,177 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.friendships import add_friends, recount_counters, resolve_friend_requests
+from api.models import FriendRequests, User
+from api.tasks import delete_user
+
+from .base import APITestCase
+
+
+class FriendsListTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = self.make_user('me')
+        self.friends = [self.make_user(username) for username in ('cat', 'ann', 'bob')]
+        add_friends(self.user, [friend.id for friend in self.friends])
+        self.user.refresh_from_db()
+        self.login(self.user)
+
+    def usernames(self, url_name: str, query: str) -> list[str]:
+        response = self.client.get(reverse(url_name) + query)
+        self.assertEqual(response.status_code, 200)
+        return [friend['username'] for friend in response.json()['friends']]
+
+    def test_shared_hobbies_sort_without_hobbies_lists_every_friend(self) -> None:
+        for url_name in ('api:friends_list', 'api:async_friends_list'):
+            with self.subTest(url_name=url_name):
+                self.assertEqual(self.usernames(url_name, '?sort=shared_hobbies'), ['ann', 'bob', 'cat'])
+
+    def test_shared_hobbies_sort_orders_by_shared_count(self) -> None:
+        chess, golf = self.make_hobbies('Chess', 'Golf')
+        self.user.hobbies.set([chess, golf])
+        self.friends[0].hobbies.set([chess, golf])
+        self.friends[2].hobbies.set([golf])
+
+        self.assertEqual(self.usernames('api:friends_list', '?sort=shared_hobbies'), ['cat', 'bob', 'ann'])
+
+    def test_unknown_sort_is_rejected(self) -> None:
+        response = self.client.get(reverse('api:friends_list') + '?sort=age')
+        self.assertEqual(response.status_code, 400)
+
+
+class CountersTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.ann = self.make_user('ann')
+        self.bob = self.make_user('bob')
+        self.cat = self.make_user('cat')
+
+    def counters(self, user: User) -> tuple[int, int]:
+        user.refresh_from_db()
+        return user.friend_count, user.pending_request_count
+
+    def send(self, sender: User, receiver: User) -> int:
+        self.login(sender)
+        response = self.client.post(
+            reverse('api:send_friend_request'), json.dumps({'username': receiver.username}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return FriendRequests.objects.get(sender=sender, receiver=receiver).id
+
+    def test_accepting_a_request_moves_it_to_the_friend_counts(self) -> None:
+        request_id = self.send(self.ann, self.bob)
+        self.assertEqual(self.counters(self.bob), (0, 1))
+
+        self.login(self.bob)
+        response = self.client.put(
+            reverse('api:handle_friend_request'), json.dumps({'id': request_id}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counters(self.ann), (1, 0))
+        self.assertEqual(self.counters(self.bob), (1, 0))
+
+    def test_bulk_decline_lowers_the_pending_count(self) -> None:
+        request_ids = [self.send(self.ann, self.cat), self.send(self.bob, self.cat)]
+        self.assertEqual(self.counters(self.cat), (0, 2))
+
+        self.login(self.cat)
+        response = self.client.post(
+            reverse('api:handle_friend_requests_bulk'), json.dumps({'ids': request_ids, 'action': 'decline'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counters(self.cat), (0, 0))
+
+    def test_adding_friends_twice_counts_them_once(self) -> None:
+        add_friends(self.ann, [self.bob.id, self.cat.id])
+        add_friends(self.bob, [self.ann.id])
+        self.assertEqual(self.counters(self.ann), (2, 0))
+        self.assertEqual(self.counters(self.bob), (1, 0))
+
+    def test_deleting_a_user_lowers_their_friends_counts(self) -> None:
+        add_friends(self.ann, [self.bob.id])
+        self.send(self.ann, self.cat)
+        delete_user(self.ann.id)
+
+        self.assertEqual(self.counters(self.bob), (0, 0))
+        self.assertEqual(self.counters(self.cat), (0, 0))
+
+    def test_recount_repairs_drift(self) -> None:
+        add_friends(self.ann, [self.bob.id])
+        User.objects.filter(id=self.ann.id).update(friend_count=5, pending_request_count=2)
+
+        self.assertEqual(recount_counters(), 1)
+        self.assertEqual(self.counters(self.ann), (1, 0))
+        self.assertEqual(recount_counters(), 0)
+
+
+class BulkFriendRequestsTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = self.make_user('me')
+        self.senders = [self.make_user(username) for username in ('ann', 'bob')]
+        self.request_ids = [
+            FriendRequests.objects.create(sender=sender, receiver=self.user).id for sender in self.senders
+        ]
+        # The user has also asked bob, so his request is accepted either way
+        FriendRequests.objects.create(sender=self.user, receiver=self.senders[1])
+        self.login(self.user)
+
+    def post(self, data):
+        return self.client.post(
+            reverse('api:handle_friend_requests_bulk'), json.dumps(data), content_type='application/json',
+        )
+
+    def test_decline_accepts_mutual_requests(self) -> None:
+        response = self.post({'ids': [*self.request_ids, 0], 'action': 'decline'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], {
+            str(self.request_ids[0]): 'declined',
+            str(self.request_ids[1]): 'accepted',
+            '0': 'not_found',
+        })
+        self.assertEqual(list(self.user.friends_list.values_list('username', flat=True)), ['bob'])
+        self.assertFalse(FriendRequests.objects.exists())
+
+    def test_accept_adds_both_directions(self) -> None:
+        response = self.post({'ids': self.request_ids, 'action': 'accept'})
+        self.assertEqual(set(response.json()['results'].values()), {'accepted'})
+
+        self.assertEqual(sorted(self.user.friends_list.values_list('username', flat=True)), ['ann', 'bob'])
+        for sender in self.senders:
+            self.assertEqual(list(sender.friends_list.values_list('username', flat=True)), ['me'])
+        self.assertFalse(FriendRequests.objects.exists())
+
+    def test_query_count_does_not_depend_on_the_request_count(self) -> None:
+        few = [
+            FriendRequests.objects.create(sender=self.make_user(username), receiver=self.user).id
+            for username in ('cid', 'dan')
+        ]
+        many = [
+            FriendRequests.objects.create(sender=self.make_user(f'sender{number}'), receiver=self.user).id
+            for number in range(6)
+        ]
+
+        with CaptureQueriesContext(connection) as two:
+            resolve_friend_requests(self.user, few, accept=True)
+        with CaptureQueriesContext(connection) as six:
+            resolve_friend_requests(self.user, many, accept=True)
+
+        self.assertEqual(len(six), len(two))
+        self.assertEqual(self.user.friends_list.count(), 8)
+
+    def test_invalid_requests_are_rejected(self) -> None:
+        for data in (
+            {'action': 'accept'},
+            {'ids': [], 'action': 'accept'},
+            {'ids': self.request_ids, 'action': 'ignore'},
+            {'ids': ['one'], 'action': 'accept'},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(data).status_code, 400)
+        self.assertEqual(FriendRequests.objects.count(), 3)
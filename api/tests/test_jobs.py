@@ -0,0 +1,125 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api import jobs
+from api.hobby_index import HobbyIndex, hobby_index
+from api.models import Job, User, UserSimilarity
+
+from .base import APITestCase
+
+calls = []
+
+
+@jobs.job('tests.record')
+def record(value: int, fail: bool = False) -> None:
+    calls.append(value)
+    if fail:
+        raise ValueError(value)
+
+
+@override_settings(JOB_RETRY_DELAY=10, JOB_LEASE_SECONDS=60)
+class JobQueueTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        calls.clear()
+
+    def test_unknown_jobs_are_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            jobs.enqueue('tests.missing')
+
+    def test_queued_jobs_with_a_key_are_coalesced(self) -> None:
+        first = jobs.enqueue('tests.record', {'value': 1}, key='a')
+        self.assertEqual(jobs.enqueue('tests.record', {'value': 2}, key='a'), first)
+        self.assertNotEqual(jobs.enqueue('tests.record', {'value': 3}, key='b'), first)
+
+    def test_due_jobs_run_once(self) -> None:
+        jobs.enqueue('tests.record', {'value': 1})
+        jobs.enqueue('tests.record', {'value': 2}, delay=60)
+
+        self.assertEqual(jobs.run_pending('worker'), 1)
+        self.assertEqual(jobs.run_pending('worker'), 0)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 1)
+
+    def test_failing_jobs_back_off_then_fail(self) -> None:
+        queued = jobs.enqueue('tests.record', {'value': 1, 'fail': True}, max_attempts=2)
+
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending('worker'), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.QUEUED, 1))
+        self.assertGreater(queued.run_after, timezone.now() + timedelta(seconds=5))
+        self.assertIn('ValueError', queued.last_error)
+
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        with self.assertLogs('api.jobs', 'ERROR'):
+            jobs.run_pending('worker')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(queued.finished_at)
+
+    def test_expired_leases_are_claimed_again(self) -> None:
+        queued = jobs.enqueue('tests.record', {'value': 1}, max_attempts=2)
+        jobs.claim('lost')
+        self.assertEqual(jobs.claim('other'), [])
+
+        Job.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(seconds=61))
+        [claimed] = jobs.claim('other')
+        self.assertEqual((claimed.locked_by, claimed.attempts), ('other', 2))
+
+    def test_expired_leases_without_attempts_left_fail(self) -> None:
+        queued = jobs.enqueue('tests.record', {'value': 1}, max_attempts=1)
+        jobs.claim('lost')
+        Job.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertEqual(jobs.claim('other'), [])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.FAILED, 1))
+        self.assertIn('lease', queued.last_error)
+
+    def test_prune_deletes_old_finished_jobs(self) -> None:
+        jobs.enqueue('tests.record', {'value': 1})
+        jobs.run_pending('worker')
+        self.assertEqual(jobs.prune(timedelta(days=1)), 0)
+        Job.objects.update(finished_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(jobs.prune(timedelta(days=1)), 1)
+
+
+@override_settings(HOBBY_INDEX_TTL=None)
+class RefreshSimilarityJobTests(APITestCase):
+    def test_uses_changes_made_by_other_processes(self) -> None:
+        chess, = self.make_hobbies('Chess')
+        user = self.make_user('me', [chess])
+        other = self.make_user('other')
+        hobby_index.build()
+
+        # Written without signals, as another process's index update would be
+        User.hobbies.through.objects.create(user_id=other.id, hobby_id=chess.id)
+        jobs.enqueue('refresh_user_similarity', {'user_id': user.id})
+        jobs.run_pending('worker')
+
+        self.assertEqual(
+            list(UserSimilarity.objects.filter(user=user).values_list('other_id', 'shared_count')),
+            [(other.id, 1)],
+        )
+
+
+@override_settings(HOBBY_INDEX_TTL=None)
+class RebuildSimilarityJobTests(APITestCase):
+    def test_builds_the_index_once(self) -> None:
+        chess, = self.make_hobbies('Chess')
+        user = self.make_user('me', [chess])
+        other = self.make_user('other', [chess])
+
+        jobs.enqueue('rebuild_similarity_table', {'k': 5})
+        with mock.patch.object(HobbyIndex, 'build', autospec=True, side_effect=HobbyIndex.build) as build:
+            jobs.run_pending('worker')
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(
+            sorted(UserSimilarity.objects.values_list('user_id', 'other_id', 'shared_count')),
+            [(user.id, other.id, 1), (other.id, user.id, 1)],
+        )
@@ -0,0 +1,68 @@
+import contextvars
+import json
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from api.auth_pool import HashingPool, hashing_pool, login_throttle
+from api.models import User
+
+
+# The pool verifies passwords on its own threads and connections, which cannot see the rows of a
+# TestCase transaction, so these tests commit their rows
+@override_settings(LOGIN_MAX_FAILURES=2, DATABASE_REPLICA_ALIAS=None)
+class LoginTests(TransactionTestCase):
+    def setUp(self) -> None:
+        login_throttle.reset()
+        self.addCleanup(login_throttle.reset)
+        User.objects.create_user(username='alice', email='alice@example.com', password='password')
+
+    def log_in(self, password: str):
+        return self.client.post(
+            reverse('api:login'), json.dumps({'username': 'alice', 'password': password}),
+            content_type='application/json',
+        )
+
+    def test_valid_credentials_log_in(self) -> None:
+        response = self.log_in('password')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'redirect_url': '/profile/'})
+        self.assertIn('_auth_user_id', self.client.session)
+
+    def test_failures_are_throttled(self) -> None:
+        self.assertEqual(self.log_in('wrong').status_code, 401)
+        self.assertEqual(self.log_in('wrong').status_code, 401)
+
+        # Even the right password is rejected until the window has passed
+        response = self.log_in('password')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_success_resets_the_failure_count(self) -> None:
+        self.assertEqual(self.log_in('wrong').status_code, 401)
+        self.assertEqual(self.log_in('password').status_code, 200)
+
+        self.assertEqual(self.log_in('wrong').status_code, 401)
+        self.assertEqual(self.log_in('wrong').status_code, 401)
+
+    def test_busy_pool_sheds_logins(self) -> None:
+        hashing_pool._ensure_started()
+        taken = 0
+        while hashing_pool._slots.acquire(blocking=False):
+            taken += 1
+        self.addCleanup(lambda: [hashing_pool._slots.release() for _ in range(taken)])
+
+        response = self.log_in('password')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+
+class HashingPoolTests(SimpleTestCase):
+    def test_runs_in_the_callers_context(self) -> None:
+        variable = contextvars.ContextVar('variable', default=None)
+        variable.set('request')
+
+        self.assertEqual(HashingPool().run(variable.get), 'request')
@@ -0,0 +1,91 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api.metrics import MetricsRegistry, QueryMetricsMiddleware, QueryRecorder, _install, query_shape, registry
+
+from .base import APITestCase
+
+
+class QueryShapeTests(SimpleTestCase):
+    def test_in_lists_of_any_length_share_a_shape(self) -> None:
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s)'),
+            query_shape('SELECT *  FROM t\nWHERE id IN (%s)'),
+        )
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=2)
+    def test_repeated_shapes_are_counted_per_request(self) -> None:
+        recorder = QueryRecorder()
+        for statement in ('SELECT 1 WHERE id IN (%s)', 'SELECT 1 WHERE id IN (%s, %s)', 'SELECT 2'):
+            recorder(lambda *args: None, statement, (), False, {})
+
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(list(recorder.repeated_shapes(2)), ['SELECT 1 WHERE id IN (...)'])
+
+        metrics = MetricsRegistry()
+        metrics.record('view', 0.01, recorder)
+        self.assertIn('hobbies_n_plus_one_requests_total{view="view"} 1', metrics.render())
+
+
+class QueryMetricsMiddlewareTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        registry.reset()
+        self.user = self.make_user('me')
+        self.make_user('other')
+        self.login(self.user)
+        middleware = [*settings.MIDDLEWARE, 'api.metrics.QueryMetricsMiddleware']
+        self.enterContext(self.settings(MIDDLEWARE=middleware))
+        # The test database connected before the middleware was loaded
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+    def recorded(self, view: str) -> tuple[int, int]:
+        """
+        Returns the requests and queries recorded for a view.
+        """
+        metrics = registry._views.get(view)
+        return (0, 0) if metrics is None else (metrics.queries.count, int(metrics.queries.sum))
+
+    def test_records_sync_views(self) -> None:
+        self.client.get(reverse('api:get_profile_data'))
+        requests, queries = self.recorded('get_profile_data')
+        self.assertEqual(requests, 1)
+        self.assertGreater(queries, 0)
+
+    async def test_records_async_views(self) -> None:
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get(reverse('api:async_friends_list'))
+        requests, queries = self.recorded('async_friends_list')
+        self.assertEqual(requests, 1)
+        self.assertGreater(queries, 0)
+
+    async def test_records_queries_of_other_threads(self) -> None:
+        def query() -> None:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connection.close()
+
+        async def view(request):
+            await sync_to_async(query, thread_sensitive=False)()
+            return HttpResponse()
+
+        await QueryMetricsMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(self.recorded('unresolved'), (1, 1))
+
+    def test_records_streaming_responses_once_sent(self) -> None:
+        response = self.client.get(reverse('api:user_directory'))
+        before = self.recorded('user_directory')
+        b''.join(response.streaming_content)
+        response.close()
+
+        self.assertEqual(before, (0, 0))
+        requests, queries = self.recorded('user_directory')
+        self.assertEqual(requests, 1)
+        self.assertGreater(queries, before[1])
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import override_settings
+from django.urls import reverse
+
+from api.models import PageView
+from api.pageviews import PageViewCounter
+
+from .base import APITestCase
+
+
+@override_settings(PAGE_VIEW_FLUSH_INTERVAL=3600)
+class PageViewCounterTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.counter = PageViewCounter()
+
+    def tearDown(self) -> None:
+        # Nothing is left for the flush at exit, which runs after the test database is gone
+        self.counter._stopped.set()
+        self.counter._pending.clear()
+
+    def test_counts_include_views_not_flushed_yet(self) -> None:
+        PageView.objects.create(page='/', count=5)
+        self.counter.increment('/')
+        self.counter.increment('/about', 2)
+
+        self.assertEqual(PageView.objects.get(page='/').count, 5)
+        self.assertEqual(self.counter.counts(), {'/': 6, '/about': 2})
+        self.assertEqual(self.counter.counts(['/about', '/missing']), {'/about': 2, '/missing': 0})
+
+    def test_flush_adds_pending_views_to_the_rows(self) -> None:
+        PageView.objects.create(page='/', count=5)
+        self.counter.increment('/', 3)
+        self.counter.increment('/about')
+
+        self.assertEqual(self.counter.flush(), 4)
+        self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(dict(PageView.objects.values_list('page', 'count')), {'/': 8, '/about': 1})
+        self.assertEqual(self.counter.pending(), {})
+
+    def test_failed_flush_keeps_the_views(self) -> None:
+        self.counter.increment('/', 3)
+        with mock.patch('api.pageviews._add_views', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.counter.flush()
+        self.counter.increment('/')
+
+        self.assertEqual(self.counter.pending(), {'/': 4})
+
+    def test_counts_are_internal(self) -> None:
+        url = reverse('api:page_view_counts')
+        self.login(self.make_user('visitor'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        staff = self.make_user('staff')
+        staff.is_staff = True
+        staff.save()
+        self.login(staff)
+        response = self.client.get(url + '?page=/nowhere')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'page_views': {'/nowhere': 0}})
@@ -0,0 +1,95 @@
+import json
+
+from django.db.models import F
+from django.urls import reverse
+
+from api.friendships import add_friends, create_friend_request
+from api.models import User
+from api.response_cache import invalidate_responses, response_cache
+
+from .base import APITestCase
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.chess, self.golf = self.make_hobbies('Chess', 'Golf')
+        self.user = self.make_user('me', [self.chess])
+        self.friend = self.make_user('friend', [self.chess])
+        add_friends(self.user, [self.friend.id])
+        self.login(self.user)
+
+    def get(self, url_name: str, **headers):
+        return self.client.get(reverse(url_name), headers=headers)
+
+    def test_repeated_requests_are_served_from_the_cache(self) -> None:
+        first = self.get('api:get_profile_data')
+        # Only the session and the user are loaded
+        with self.assertNumQueries(2):
+            second = self.get('api:get_profile_data')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_matching_etag_gets_not_modified(self) -> None:
+        etag = self.get('api:friends_list')['ETag']
+        response = self.get('api:friends_list', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_profile_update_is_seen_on_the_next_request(self) -> None:
+        self.get('api:get_profile_data')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('api:update_profile_data'),
+                json.dumps({'username': 'me', 'email': 'me@example.com', 'first_name': 'New', 'last_name': 'Name'}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get('api:get_profile_data').json()['first_name'], 'New')
+
+    def test_a_version_raised_by_another_worker_invalidates_the_entry(self) -> None:
+        self.get('api:get_profile_data')
+        # Another worker changes the row; nothing in this process is told
+        User.objects.filter(id=self.user.id).update(first_name='Elsewhere')
+        invalidate_responses([self.user.id])
+        self.assertEqual(self.get('api:get_profile_data').json()['first_name'], 'Elsewhere')
+
+    def test_friend_hobby_change_invalidates_the_friends_list(self) -> None:
+        self.get('api:friends_list')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.friend.hobbies.add(self.golf)
+        [friend] = self.get('api:friends_list').json()['friends']
+        self.assertEqual(sorted(friend['hobbies']), ['Chess', 'Golf'])
+
+    def test_new_friend_request_invalidates_the_receivers_requests(self) -> None:
+        self.assertEqual(self.get('api:get_received_friend_requests').json()['friend_requests'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            create_friend_request(self.make_user('other'), self.user)
+        requests = self.get('api:get_received_friend_requests').json()['friend_requests']
+        self.assertEqual([request['username'] for request in requests], ['other'])
+
+    def test_hobby_rename_invalidates_the_responses_showing_it(self) -> None:
+        self.get('api:friends_list')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chess.name = 'Xiangqi'
+            self.chess.save()
+        [friend] = self.get('api:friends_list').json()['friends']
+        self.assertEqual(friend['hobbies'], ['Xiangqi'])
+
+    def test_saving_a_stale_copy_keeps_the_version_and_counters(self) -> None:
+        stale = User.objects.get(id=self.user.id)
+        User.objects.filter(id=self.user.id).update(response_version=F('response_version') + 1)
+        add_friends(self.user, [self.make_user('new').id])
+
+        stale.first_name = 'Stale'
+        stale.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Stale')
+        self.assertEqual(self.user.friend_count, 2)
+        self.assertEqual(self.user.response_version, stale.response_version + 1)
+
+    def test_clearing_the_cache_drops_every_entry(self) -> None:
+        self.get('api:get_profile_data')
+        response_cache.clear()
+        with self.assertNumQueries(3):
+            self.get('api:get_profile_data')
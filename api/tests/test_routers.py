@@ -0,0 +1,132 @@
+from unittest import skipUnless
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.models import Hobby
+from api.routers import (
+    PIN_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaPinMiddleware,
+    RoutingState,
+    _state,
+    database_settings,
+    primary_reads,
+    replica_alias,
+    replica_reads,
+)
+
+from .base import APITestCase
+
+REPLICA = replica_alias()
+
+
+class RouterTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def route(self, state: RoutingState, model=Hobby) -> str:
+        token = _state.set(state)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            _state.reset(token)
+
+    def replica_state(self, **kwargs) -> RoutingState:
+        state = RoutingState(**kwargs)
+        state.replica_reads = True
+        return state
+
+    @override_settings(DATABASE_REPLICA_ALIAS=DEFAULT_DB_ALIAS)
+    def test_reads_outside_replica_views_use_the_primary(self) -> None:
+        self.assertEqual(self.router.db_for_read(Hobby), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.route(RoutingState()), DEFAULT_DB_ALIAS)
+
+    def test_writes_use_the_primary_and_mark_the_request(self) -> None:
+        state = self.replica_state()
+        token = _state.set(state)
+        try:
+            self.assertEqual(self.router.db_for_write(Hobby), DEFAULT_DB_ALIAS)
+        finally:
+            _state.reset(token)
+        self.assertTrue(state.wrote)
+
+    @skipUnless(REPLICA, "No replica is configured.")
+    def test_replica_views_read_from_the_replica(self) -> None:
+        self.assertEqual(self.route(self.replica_state()), REPLICA)
+
+    @skipUnless(REPLICA, "No replica is configured.")
+    def test_pinned_clients_and_writers_read_from_the_primary(self) -> None:
+        self.assertEqual(self.route(self.replica_state(pinned=True)), DEFAULT_DB_ALIAS)
+        state = self.replica_state()
+        state.wrote = True
+        self.assertEqual(self.route(state), DEFAULT_DB_ALIAS)
+
+    @skipUnless(REPLICA, "No replica is configured.")
+    def test_primary_reads_override_replica_views(self) -> None:
+        state = self.replica_state()
+        token = _state.set(state)
+        try:
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Hobby), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(Hobby), REPLICA)
+        finally:
+            _state.reset(token)
+
+    def test_database_settings(self) -> None:
+        databases = database_settings({'NAME': 'primary'}, {'NAME': 'replica'}, max_age=30)
+        self.assertEqual(databases['default']['CONN_MAX_AGE'], 30)
+        self.assertTrue(databases['replica']['CONN_HEALTH_CHECKS'])
+        self.assertEqual(databases['replica']['TEST'], {'MIRROR': DEFAULT_DB_ALIAS})
+        self.assertNotIn('replica', database_settings({'NAME': 'primary'}))
+
+
+@override_settings(DATABASE_ROUTERS=['api.routers.PrimaryReplicaRouter'])
+class ReplicaPinMiddlewareTests(APITestCase):
+    factory = RequestFactory()
+
+    def call(self, view, method: str = 'get', cookies: dict = None) -> tuple[HttpResponse, list]:
+        states = []
+
+        def get_response(request):
+            states.append((_state.get().pinned, _state.get().replica_reads))
+            return view(request)
+
+        request = getattr(self.factory, method)('/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaPinMiddleware(get_response)(request), states
+
+    def test_replica_reads_only_apply_to_safe_requests(self) -> None:
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append(_state.get().replica_reads)
+            return HttpResponse()
+
+        self.call(view)
+        self.call(view, 'post')
+        self.assertEqual(seen, [True, False])
+        self.assertIsNone(_state.get())
+
+    def test_pin_cookie_is_read(self) -> None:
+        _, states = self.call(lambda request: HttpResponse(), cookies={PIN_COOKIE: '1'})
+        self.assertEqual(states, [(True, False)])
+
+    @override_settings(DATABASE_REPLICA_ALIAS=DEFAULT_DB_ALIAS)
+    def test_writes_pin_the_client(self) -> None:
+        def view(request):
+            Hobby.objects.create(name='Chess')
+            return HttpResponse()
+
+        response, _ = self.call(view, 'post')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_do_not_pin_the_client_without_a_replica(self) -> None:
+        response, _ = self.call(lambda request: HttpResponse(Hobby.objects.create(name='Chess').name), 'post')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICA_ALIAS=DEFAULT_DB_ALIAS)
+    def test_reads_do_not_pin_the_client(self) -> None:
+        response, _ = self.call(lambda request: HttpResponse(str(Hobby.objects.count())))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,35 @@
+from django.urls import reverse
+
+from .base import APITestCase
+
+
+class SearchTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.make_hobbies('Chess', 'Cheese making', 'Golf')
+        self.login(self.make_user('chester'))
+        self.make_user('anna')
+
+    def get(self, query: str):
+        return self.client.get(reverse('api:search') + query)
+
+    def test_matches_prefixes_of_both_kinds(self) -> None:
+        response = self.get('?q=ches')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([hobby['name'] for hobby in response.json()['hobbies']][:1], ['Chess'])
+        self.assertEqual(response.json()['users'], [{'username': 'chester'}])
+
+    def test_type_and_limit_narrow_the_results(self) -> None:
+        response = self.get('?q=che&type=hobbies&limit=1')
+        self.assertEqual(list(response.json()), ['hobbies'])
+        self.assertEqual(len(response.json()['hobbies']), 1)
+
+    def test_invalid_parameters_are_rejected(self) -> None:
+        for query, error in (
+            ('?q=che&type=groups', "type must be 'hobbies' or 'users'."),
+            ('?q=che&limit=many', 'limit must be a number.'),
+        ):
+            with self.subTest(query=query):
+                response = self.get(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': error})
@@ -0,0 +1,71 @@
+from datetime import date
+
+from asgiref.sync import async_to_sync
+
+from api.models import User
+from api.serializers import auser_cards, calculate_age, iter_user_cards, user_cards
+
+from .base import APITestCase
+
+
+class UserCardsTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.chess, self.hiking, self.origami = self.make_hobbies('Chess', 'Hiking', 'Origami')
+        self.users = [
+            self.make_user(f'user{number}', [self.chess, self.hiking, self.origami][:number % 4],
+                           date_of_birth=date(1990, 1, 1))
+            for number in range(8)
+        ]
+
+    def test_query_count_does_not_depend_on_the_user_count(self) -> None:
+        # The users and their hobbies
+        with self.assertNumQueries(2):
+            user_cards([self.users[1].id])
+        with self.assertNumQueries(2):
+            user_cards([user.id for user in self.users])
+        with self.assertNumQueries(2):
+            user_cards(User.objects.order_by('id'))
+
+    def test_async_query_count_does_not_depend_on_the_user_count(self) -> None:
+        with self.assertNumQueries(2):
+            async_to_sync(auser_cards)([self.users[1].id])
+        with self.assertNumQueries(2):
+            async_to_sync(auser_cards)([user.id for user in self.users])
+
+    def test_cards_keep_the_order_of_the_ids(self) -> None:
+        ids = [self.users[3].id, self.users[1].id, -1, self.users[2].id]
+
+        cards = user_cards(ids, viewer_hobbies={self.chess.id})
+
+        self.assertEqual(cards, [
+            {
+                'username': 'user3', 'email': 'user3@example.com', 'age': calculate_age(date(1990, 1, 1)),
+                'hobbies': ['Chess', 'Hiking', 'Origami'], 'shared_hobbies': 1,
+            },
+            {
+                'username': 'user1', 'email': 'user1@example.com', 'age': calculate_age(date(1990, 1, 1)),
+                'hobbies': ['Chess'], 'shared_hobbies': 1,
+            },
+            {
+                'username': 'user2', 'email': 'user2@example.com', 'age': calculate_age(date(1990, 1, 1)),
+                'hobbies': ['Chess', 'Hiking'], 'shared_hobbies': 1,
+            },
+        ])
+
+    def test_counts_and_hobby_ids(self) -> None:
+        [card] = user_cards(
+            [self.users[2].id], shared_counts={self.users[2].id: 5}, mutual_counts={}, with_hobby_ids=True,
+        )
+
+        self.assertEqual(card['hobbies'], [self.chess.id, self.hiking.id])
+        self.assertEqual(card['shared_hobbies'], 5)
+        self.assertEqual(card['mutual_friends'], 0)
+
+    def test_streamed_cards_load_hobbies_per_chunk(self) -> None:
+        # The users, then the hobbies of each chunk of three
+        with self.assertNumQueries(1 + 3):
+            streamed = list(iter_user_cards(User.objects.order_by('id'), chunk_size=3))
+
+        self.assertEqual([user_id for user_id, _ in streamed], [user.id for user in self.users])
+        self.assertEqual([card for _, card in streamed], user_cards(User.objects.order_by('id')))
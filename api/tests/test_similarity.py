@@ -0,0 +1,99 @@
+from datetime import date
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api import jobs
+from api.models import Job, User, UserSimilarity
+
+from .base import APITestCase
+
+
+@override_settings(SIMILAR_USERS_BACKEND='materialized')
+class MaterializedSimilarityTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        chess, golf = self.make_hobbies('Chess', 'Golf')
+        self.user = self.make_user('me', [chess])
+        self.other = self.make_user('other', [chess])
+        self.loner = self.make_user('loner', [golf])
+
+    def get(self, user: User, query: str = '', url_name: str = 'api:similar_users'):
+        self.login(user)
+        return self.client.get(reverse(url_name) + query)
+
+    def test_neighbours_are_computed_on_first_read(self) -> None:
+        response = self.get(self.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([card['username'] for card in response.json()['users']], ['other'])
+        self.assertEqual(UserSimilarity.objects.filter(user=self.user).count(), 1)
+
+    def test_users_without_neighbours_are_not_recomputed_on_every_read(self) -> None:
+        self.assertEqual(self.get(self.loner).json()['users'], [])
+        self.loner.refresh_from_db()
+        self.assertIsNotNone(self.loner.similarity_computed_at)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('api:similar_users')).json()['users'], [])
+        writes = [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+    def test_stale_results_are_served_while_a_refresh_is_queued(self) -> None:
+        first = self.get(self.user).json()['computed_at']
+
+        stale = self.get(self.user, '?max_staleness=0').json()
+        self.assertEqual(stale['computed_at'], first)
+        self.assertEqual([card['username'] for card in stale['users']], ['other'])
+        self.get(self.user, '?max_staleness=0')
+        self.assertEqual(
+            list(Job.objects.values_list('name', 'key')), [('refresh_user_similarity', str(self.user.id))]
+        )
+
+        jobs.run_pending('worker')
+        self.assertGreater(self.get(self.user).json()['computed_at'], first)
+
+    def test_fresh_results_queue_nothing(self) -> None:
+        self.get(self.user)
+        self.get(self.user, '?max_staleness=3600')
+        self.assertFalse(Job.objects.exists())
+
+    def test_malformed_parameters_are_bad_requests(self) -> None:
+        for url_name in ('api:similar_users', 'api:async_similar_users'):
+            for query in ('?max_staleness=abc', '?max_staleness=-1', '?max_staleness=nan', '?age_min=x&age_max=30'):
+                with self.subTest(url_name=url_name, query=query):
+                    self.assertEqual(self.get(self.user, query, url_name).status_code, 400)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        hobbies = self.make_hobbies('Chess', 'Golf', 'Go')
+        self.user = self.make_user('me', hobbies)
+        for number in range(12):
+            self.make_user(f'user{number:02}', hobbies[:1 + number % 3], date_of_birth=date(1990, 1, 1))
+        self.login(self.user)
+
+    def get(self, query: str):
+        return self.client.get(reverse('api:similar_users') + query)
+
+    def test_cursors_walk_the_ranking_once(self) -> None:
+        first = self.get('?cursor=').json()
+        self.assertTrue(first['has_next'])
+        second = self.get('?cursor=' + first['next_cursor']).json()
+        self.assertFalse(second['has_next'])
+        self.assertIsNone(second['next_cursor'])
+
+        ranked = [card['username'] for card in first['users'] + second['users']]
+        self.assertEqual(len(ranked), 12)
+        self.assertEqual(ranked, [card['username'] for card in self.get('').json()['users']] + ranked[10:])
+        shared = [card['shared_hobbies'] for card in first['users'] + second['users']]
+        self.assertEqual(shared, sorted(shared, reverse=True))
+
+    def test_malformed_cursor_is_a_bad_request(self) -> None:
+        for cursor in ('not-a-cursor', '!!!'):
+            with self.subTest(cursor=cursor):
+                response = self.get('?cursor=' + cursor)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
@@ -0,0 +1,119 @@
+from fractions import Fraction
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.similarity_engine import METRICS, HobbyMatrix, block_size_for, load_hobby_matrix, top_k_similar
+
+from .base import APITestCase
+
+
+def matrix_from(hobbies: dict[int, set[int]]) -> HobbyMatrix:
+    """
+    Builds a `HobbyMatrix` from hobby IDs by user ID.
+    """
+    user_ids = np.array(sorted(hobbies), dtype=np.int64)
+    hobby_ids = np.array(sorted(set().union(*hobbies.values())), dtype=np.int64)
+    rows = [np.searchsorted(hobby_ids, sorted(hobbies[user_id])) for user_id in user_ids]
+    indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=indptr[1:])
+    indices = np.concatenate(rows).astype(np.int32) if rows else np.zeros(0, dtype=np.int32)
+    return HobbyMatrix(user_ids=user_ids, hobby_ids=hobby_ids, indptr=indptr, indices=indices)
+
+
+def brute_force(hobbies: dict[int, set[int]], k: int, metric: str) -> dict[int, list[int]]:
+    """
+    Ranks every pair with exact fractions, by score and then user ID.
+    """
+    def score(mine: set[int], theirs: set[int]) -> Fraction:
+        shared = len(mine & theirs)
+        if metric == 'overlap':
+            return Fraction(shared)
+        if metric == 'jaccard':
+            return Fraction(shared, len(mine | theirs))
+        # Ordered like the cosine itself
+        return Fraction(shared * shared, len(mine) * len(theirs))
+
+    ranked = {}
+    for user_id, mine in hobbies.items():
+        others = [other_id for other_id, theirs in hobbies.items() if other_id != user_id and mine & theirs]
+        others.sort(key=lambda other_id: (-score(mine, hobbies[other_id]), other_id))
+        ranked[user_id] = others[:k]
+    return ranked
+
+
+class TopKSimilarTests(SimpleTestCase):
+    def setUp(self) -> None:
+        random = np.random.default_rng(7)
+        user_ids = np.sort(random.choice(1000, size=37, replace=False)) + 1
+        # Few hobbies per user, so many pairs tie
+        self.hobbies = {
+            int(user_id): set(int(hobby) for hobby in random.choice(12, size=random.integers(0, 6), replace=False))
+            for user_id in user_ids
+        }
+        self.matrix = matrix_from(self.hobbies)
+
+    def assertMatchesBruteForce(self, k: int, memory_limit_mb: float = 256) -> None:
+        for metric in METRICS:
+            with self.subTest(metric=metric, k=k, memory_limit_mb=memory_limit_mb):
+                result = top_k_similar(self.matrix, k=k, metric=metric, memory_limit_mb=memory_limit_mb)
+                expected = brute_force(self.hobbies, k, metric)
+                for user_id, neighbours in result.items():
+                    self.assertEqual([other_id for other_id, _ in neighbours], expected[user_id])
+
+    def test_matches_brute_force(self) -> None:
+        self.assertMatchesBruteForce(k=5)
+
+    def test_k_of_at_least_the_user_count_keeps_every_overlapping_user(self) -> None:
+        self.assertMatchesBruteForce(k=len(self.hobbies))
+        self.assertMatchesBruteForce(k=len(self.hobbies) + 10)
+
+    def test_blocks_smaller_than_the_user_count(self) -> None:
+        # Blocks of 9 users, which do not divide the 37 users evenly
+        self.assertEqual(block_size_for(37, 12, 5, 0.01), 9)
+        self.assertMatchesBruteForce(k=5, memory_limit_mb=0.01)
+        self.assertMatchesBruteForce(k=50, memory_limit_mb=0.01)
+
+    def test_scores(self) -> None:
+        hobbies = {1: {1, 2, 3, 4}, 2: {1, 2}, 3: {5}}
+        matrix = matrix_from(hobbies)
+
+        self.assertEqual(top_k_similar(matrix, k=2, metric='overlap').neighbours_of(1), [(2, 2.0)])
+        self.assertEqual(top_k_similar(matrix, k=2, metric='jaccard').neighbours_of(2), [(1, 0.5)])
+        [(other_id, score)] = top_k_similar(matrix, k=2, metric='cosine').neighbours_of(1)
+        self.assertEqual(other_id, 2)
+        self.assertAlmostEqual(score, 2 / 8 ** 0.5, places=6)
+        self.assertEqual(top_k_similar(matrix, k=2).neighbours_of(3), [])
+        self.assertEqual(top_k_similar(matrix, k=2).neighbours_of(4), [])
+
+    def test_equal_cosines_tie_on_user_id(self) -> None:
+        # 1/sqrt(3 * 1), 3/sqrt(3 * 9) and 2/sqrt(3 * 4) are all 1/sqrt(3), computed from different counts
+        hobbies = {
+            1: {1, 2, 3},
+            2: {1},
+            3: {1, 2, 3, 10, 11, 12, 13, 14, 15},
+            4: {1, 2, 20, 21},
+        }
+        result = top_k_similar(matrix_from(hobbies), k=3, metric='cosine')
+
+        neighbours = result.neighbours_of(1)
+        self.assertEqual([other_id for other_id, _ in neighbours], [2, 3, 4])
+        self.assertEqual(len({score for _, score in neighbours}), 1)
+
+    def test_unknown_metric_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            top_k_similar(self.matrix, metric='euclidean')
+
+
+class LoadHobbyMatrixTests(APITestCase):
+    def test_loads_every_user_in_id_order(self) -> None:
+        chess, hiking = self.make_hobbies('Chess', 'Hiking')
+        ann = self.make_user('ann', [hiking, chess])
+        bob = self.make_user('bob')
+        cid = self.make_user('cid', [hiking])
+
+        matrix = load_hobby_matrix()
+
+        self.assertEqual(matrix.user_ids.tolist(), [ann.id, bob.id, cid.id])
+        self.assertEqual(matrix.hobby_ids.tolist(), [chess.id, hiking.id])
+        self.assertEqual(matrix.dense_rows(0, 3).tolist(), [[1, 1], [0, 0], [0, 1]])
@@ -0,0 +1,47 @@
+from django.urls import reverse
+
+from api.friendships import add_friends
+from api.models import FriendRequests
+
+from .base import APITestCase
+
+
+class PeopleYouMayKnowTests(APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        chess, = self.make_hobbies('Chess')
+        self.user = self.make_user('me', [chess])
+        friend = self.make_user('friend')
+        other_friend = self.make_user('other_friend')
+        add_friends(self.user, [friend.id, other_friend.id])
+        add_friends(self.make_user('ann'), [friend.id])
+        add_friends(self.make_user('bob', [chess]), [friend.id])
+        add_friends(self.make_user('cat'), [friend.id, other_friend.id])
+        self.requested = self.make_user('dan')
+        add_friends(self.requested, [friend.id, other_friend.id])
+        FriendRequests.objects.create(sender=self.user, receiver=self.requested)
+        self.login(self.user)
+
+    def get(self, query: str = ''):
+        return self.client.get(reverse('api:people_you_may_know') + query)
+
+    def usernames(self, query: str = '') -> list[str]:
+        response = self.get(query)
+        self.assertEqual(response.status_code, 200)
+        return [card['username'] for card in response.json()['users']]
+
+    def test_ranks_by_mutual_friends_then_shared_hobbies(self) -> None:
+        self.assertEqual(self.usernames(), ['cat', 'bob', 'ann'])
+
+    def test_limit_is_clamped(self) -> None:
+        self.assertEqual(self.usernames('?limit=1'), ['cat'])
+        self.assertEqual(self.usernames('?limit=-5'), ['cat'])
+        self.assertEqual(self.usernames('?limit=0'), ['cat'])
+        self.assertEqual(self.usernames('?limit=1000'), ['cat', 'bob', 'ann'])
+
+    def test_invalid_limit_is_rejected(self) -> None:
+        for query in ('?limit=ten', '?limit=', '?limit=2.5'):
+            with self.subTest(query=query):
+                response = self.get(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'limit must be a number.'})
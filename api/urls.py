@@ -26,22 +26,30 @@ from .views import (main_spa,
                     password_update_page, 
                     hobbies_api, 
                     user_similarity,
+                    similar_user_facets_view,
                     send_friend_request,
                     friend_requests_received,
                     friend_request_accepter_deleter,
                     edit_friends,
                     csrf,
                     is_authenticated,
+                    bootstrap,
                     get_profile_data,
                     update_profile_data,
                     update_password,
                     get_received_friend_requests,
                     handle_friend_request,
+                    handle_friend_requests_bulk,
                     get_friends_list,
-                    delete_user
+                    delete_user,
+                    people_you_may_know,
+                    metrics,
+                    page_view_counts,
+                    search
                 )
 
 from .views import get_user_list_with_friend_flags
+from . import async_views
 
 
 urlpatterns = [
@@ -56,18 +64,34 @@ urlpatterns = [
     path('filtered_users/', user_similarity, name='filtered_users'),
     path('api/send_friend_request/', send_friend_request, name='send_friend_request'),
     path('api/hobbies/', hobbies_api, name='hobbies_api'),
+    path('api/search/', search, name='search'),
     path('friend_requests_received/', friend_requests_received, name='friend_requests_received'),
     path('friend_request_accepter_deleter/', friend_request_accepter_deleter, name='friend_request_accepter_deleter'),
     path('edit_friends/', edit_friends, name='edit_friends'),
     path('csrf/', csrf, name='csrf'),
     path('api/authenticated/', is_authenticated, name='is_authenticated'),
+    path('api/bootstrap/', bootstrap, name='bootstrap'),
     path('api/profile/', get_profile_data, name='get_profile_data'),
     path('api/profile/update/', update_profile_data, name='update_profile_data'),
     path('api/similar-users/', user_similarity, name='similar_users'),
+    path('api/similar-users/facets/', similar_user_facets_view, name='similar_users_facets'),
     path('api/password/update/', update_password, name='update_password'),
-    path('api/similar-users/', get_user_list_with_friend_flags, name='similar_users'),
     path('api/friend_requests/', get_received_friend_requests, name='get_received_friend_requests'),
     path('api/friend_requests/handle/', handle_friend_request, name='handle_friend_request'),
+    path('api/friend_requests/bulk/', handle_friend_requests_bulk, name='handle_friend_requests_bulk'),
     path('api/friends_list/', get_friends_list, name='friends_list'),
-    path('api/delete_user/', delete_user, name='delete_user')
+    path('api/users/', get_user_list_with_friend_flags, name='user_directory'),
+    path('api/people_you_may_know/', people_you_may_know, name='people_you_may_know'),
+    path('api/events/', async_views.events, name='events'),
+    path('api/delete_user/', delete_user, name='delete_user'),
+    path('internal/metrics/', metrics, name='metrics'),
+    path('internal/page_views/', page_view_counts, name='page_view_counts'),
+
+    # Async versions of the read-heavy endpoints, for ASGI deployments
+    path('api/async/profile/', async_views.get_profile_data, name='async_get_profile_data'),
+    path('api/async/friends_list/', async_views.get_friends_list, name='async_friends_list'),
+    path('api/async/friend_requests/', async_views.get_received_friend_requests,
+         name='async_get_received_friend_requests'),
+    path('api/async/similar-users/', async_views.user_similarity, name='async_similar_users'),
+    path('api/async/hobbies/', async_views.hobbies_api, name='async_hobbies_api'),
 ]
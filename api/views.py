@@ -1,20 +1,49 @@
-from datetime import date
-from django.http import HttpResponse, HttpRequest, JsonResponse
+from django.http import HttpResponse, HttpRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import update_session_auth_hash
+import heapq
 import json
-from django.urls import reverse
-from .models import User, Hobby, FriendRequests
+import math
+from django.utils.http import parse_etags
+from django.utils.safestring import mark_safe
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import User, FriendRequests
+from .serializers import card_fields, user_cards, iter_user_cards
+from .catalog import hobby_catalog, get_or_create_hobbies, CatalogHobbiesField, CatalogSnapshot
+from .compact import compact_response, wants_compact
+from .friend_graph import friend_graph
+from .friendships import (
+    add_friends, create_friend_request, delete_friend_requests, friends_page, remove_friends,
+    resolve_friend_requests,
+)
+from .routers import replica_reads
+from .jobs import enqueue
+from .response_cache import cache_per_user
+from .events import notify
+from .auth_pool import PoolBusy, hashing_pool, login_throttle
+from .metrics import registry as metrics_registry
+from .pageviews import page_views
+from .search import search_index
+from .hobby_index import hobby_index
+from .similarity import parse_age_range, similar_users_page, similar_user_facets, similarity_backend
 from django.contrib.auth.forms import PasswordChangeForm
-from django.views.decorators.csrf import csrf_exempt
 from django.middleware.csrf import get_token
 from django.forms.models import model_to_dict
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+
+
+# How many shared hobbies one mutual friend is worth when suggesting friends
+MUTUAL_FRIEND_WEIGHT = 2
+
+# Keeps JSON embedded in a <script> tag from closing it or opening a comment
+JSON_SCRIPT_ESCAPES = {ord('<'): '\\u003C', ord('>'): '\\u003E', ord('&'): '\\u0026'}
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -24,8 +53,7 @@ class CustomUserCreationForm(UserCreationForm):
     date_of_birth = forms.DateField(
         widget=forms.DateInput(attrs={'type': 'date'})
     )
-    hobbies = forms.ModelMultipleChoiceField(
-        queryset=Hobby.objects.all(),
+    hobbies = CatalogHobbiesField(
         widget=forms.CheckboxSelectMultiple,
         required=False
     )
@@ -47,8 +75,7 @@ class ProfileUpdateForm(forms.ModelForm):
         widget=forms.DateInput(attrs={'type': 'date'}),
         required=False
     )
-    hobbies = forms.ModelMultipleChoiceField(
-        queryset=Hobby.objects.all(),
+    hobbies = CatalogHobbiesField(
         widget=forms.CheckboxSelectMultiple,
         required=False
     )
@@ -57,6 +84,19 @@ class ProfileUpdateForm(forms.ModelForm):
         model = User
         fields = ['username', 'email', 'first_name', 'last_name', 'date_of_birth', 'hobbies']
 
+    def save(self, commit: bool = True) -> User:
+        """
+        Saves the profile and, when the similarity table is in use, queues a
+        refresh of the rows affected by a change of hobbies.
+        """
+        old_hobbies = set(self.instance.hobbies.values_list('id', flat=True)) if self.instance.pk else set()
+        user = super().save(commit)
+        new_hobbies = {hobby.id for hobby in self.cleaned_data.get('hobbies', [])}
+
+        if commit and similarity_backend() == 'materialized' and old_hobbies != new_hobbies:
+            enqueue('refresh_user_similarity', {'user_id': user.pk}, key=str(user.pk))
+        return user
+
 
 @login_required(login_url='/login/')
 def update_password(request: HttpRequest) -> JsonResponse:
@@ -84,35 +124,43 @@ def update_password(request: HttpRequest) -> JsonResponse:
 
 
 @login_required(login_url='/login/')
+@replica_reads
+@cache_per_user('friends')
 def get_friends_list(request: HttpRequest) -> JsonResponse:
     """
-    Retrieves the user's friends list.
+    Retrieves one page of the user's friends list.
 
-    Accepts a GET request and returns the list of friends, 
-    including their username, email, and hobbies.
+    Accepts a GET request and returns the page of friends,
+    including their username, email, hobbies and shared hobby count,
+    with the total `friend_count`. `sort` is 'name' or 'shared_hobbies'
+    and `page` selects the page (see `api.friendships.friends_page`).
+    Supports the compact format (see `api.compact`).
     """
     if request.method == 'GET':
         user = request.user
 
-        # Fetch the user's friends
-        friends = user.friends_list.all()
+        # Fetch the page of friends
+        try:
+            rows, pagination = friends_page(user, request.GET)
+        except ValidationError as e:
+            return JsonResponse({'error': e.message}, status=400)
+        friend_ids = [friend_id for friend_id, _ in rows]
+
+        if wants_compact(request):
+            cards = user_cards(friend_ids, shared_counts=dict(rows), with_hobby_ids=True)
+            return compact_response(request, 'friends', cards, card_fields(shared_hobbies=True), pagination)
 
         # Prepare response data
-        response_data = [
-            {
-                'username': friend.username,
-                'email': friend.email,
-                'hobbies': list(friend.hobbies.values_list('name', flat=True)),
-            }
-            for friend in friends
-        ]
+        response_data = user_cards(friend_ids, shared_counts=dict(rows))
 
-        return JsonResponse({'friends': response_data}, status=200)
+        return JsonResponse({'friends': response_data, **pagination}, status=200)
 
     return JsonResponse({'error': 'Invalid request method.'}, status=405)
 
 
 @login_required(login_url='/login/')
+@replica_reads
+@cache_per_user('profile')
 def get_profile_data(request: HttpRequest) -> JsonResponse:
     """
     Retrieves the profile data of the logged-in user.
@@ -123,17 +171,24 @@ def get_profile_data(request: HttpRequest) -> JsonResponse:
     if request.method == 'GET':
         user = request.user
 
-        profile_data = model_to_dict(
-            user,
-            fields=['username', 'email', 'first_name', 'last_name', 'date_of_birth']
-        )
-        profile_data['hobbies'] = list(user.hobbies.values_list('id', 'name'))
-        
-        return JsonResponse(profile_data)
+        return JsonResponse(_profile_data(user))
 
     return JsonResponse({'error': 'Invalid request method.'}, status=405)
 
 
+def _profile_data(user: User) -> dict:
+    """
+    Serializes the profile of a user, with their hobbies as `(id, name)` pairs.
+    """
+    profile_data = model_to_dict(
+        user,
+        fields=['username', 'email', 'first_name', 'last_name', 'date_of_birth', 'friend_count',
+                'pending_request_count']
+    )
+    profile_data['hobbies'] = list(user.hobbies.values_list('id', 'name'))
+    return profile_data
+
+
 @login_required(login_url='/login/')
 def update_profile_data(request: HttpRequest) -> JsonResponse:
     """
@@ -158,29 +213,32 @@ def update_profile_data(request: HttpRequest) -> JsonResponse:
 
 
 @login_required(login_url='/login/')
+@cache_per_user('friend_requests')
 def get_received_friend_requests(request: HttpRequest) -> JsonResponse:
     """
     Retrieves all incoming friend requests for the logged-in user.
 
     Accepts a GET request and returns the details of incoming friend requests.
+    Supports the compact format (see `api.compact`).
     """
     if request.method == 'GET':
         user = request.user
+        compact = wants_compact(request)
 
         # Fetch all incoming friend requests
-        incoming_requests = FriendRequests.objects.filter(receiver=user)
+        incoming_requests = list(
+            FriendRequests.objects.filter(receiver=user).order_by('id').values_list('id', 'sender_id')
+        )
 
         # Prepare response data
+        senders = user_cards([sender_id for _, sender_id in incoming_requests], with_hobby_ids=compact)
         response_data = [
-            {
-                'id': request.id,
-                'username': request.sender.username,
-                'email': request.sender.email,
-                'hobbies': list(request.sender.hobbies.values_list('name', flat=True)),
-            }
-            for request in incoming_requests
+            {'id': request_id, **card}
+            for (request_id, _), card in zip(incoming_requests, senders)
         ]
 
+        if compact:
+            return compact_response(request, 'friend_requests', response_data, ['id', *card_fields()])
         return JsonResponse({'friend_requests': response_data}, status=200)
 
     return JsonResponse({'error': 'Invalid request method.'}, status=405)
@@ -204,17 +262,20 @@ def handle_friend_request(request: HttpRequest) -> JsonResponse:
 
             friend_request = FriendRequests.objects.get(id=friend_request_id, receiver=user)
 
+            with transaction.atomic():
+                if request.method == 'PUT':
+                    # Accept the friend request
+                    add_friends(user, [friend_request.sender_id])
+                delete_friend_requests(FriendRequests.objects.filter(id=friend_request.id))
+
+                # Let the receiver's other tabs drop the request, once it is gone
+                notify(user.id, 'friend_request.resolved', {'ids': [friend_request.id]})
+                if request.method == 'PUT':
+                    notify(friend_request.sender_id, 'friend_request.accepted', {'username': user.username})
+
             if request.method == 'PUT':
-                # Accept the friend request
-                friend_request.sender.friends_list.add(user)
-                user.friends_list.add(friend_request.sender)
-                friend_request.delete()
                 return JsonResponse({'message': 'Friend request accepted.'}, status=200)
-
-            if request.method == 'DELETE':
-                # Decline the friend request
-                friend_request.delete()
-                return JsonResponse({'message': 'Friend request declined.'}, status=200)
+            return JsonResponse({'message': 'Friend request declined.'}, status=200)
 
         except FriendRequests.DoesNotExist:
             return JsonResponse({'error': 'Friend request not found.'}, status=404)
@@ -225,6 +286,73 @@ def handle_friend_request(request: HttpRequest) -> JsonResponse:
     return JsonResponse({'error': 'Invalid request method.'}, status=405)
 
 
+@login_required(login_url='/login/')
+def handle_friend_requests_bulk(request: HttpRequest) -> JsonResponse:
+    """
+    Accepts or declines many friend requests at once.
+
+    Accepts a POST request with a list of friend request `ids` and an
+    `action` of `accept` or `decline`. All requests are handled in one
+    transaction, and requests the user has also sent to the sender are
+    accepted either way. Returns the outcome for each ID.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            request_ids = data.get('ids')
+            action = data.get('action')
+
+            if not isinstance(request_ids, list) or not request_ids:
+                return JsonResponse({'error': 'A list of friend request IDs is required.'}, status=400)
+
+            if action not in ('accept', 'decline'):
+                return JsonResponse({'error': 'Action must be "accept" or "decline".'}, status=400)
+
+            results = resolve_friend_requests(request.user, [int(pk) for pk in request_ids], action == 'accept')
+            return JsonResponse({'results': results}, status=200)
+
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'Friend request IDs must be integers.'}, status=400)
+
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+
+def bootstrap_data(request: HttpRequest) -> dict:
+    """
+    Collects everything the SPA needs at startup.
+
+    Returns the auth state, CSRF token, profile, hobby catalog version and
+    pending friend request count. Beyond the session lookup this costs two
+    queries for a logged-in user and none for an anonymous one.
+    """
+    user = request.user
+    data = {
+        'authenticated': user.is_authenticated,
+        'csrfToken': get_token(request),
+        'profile': None,
+        'hobby_catalog_version': hobby_catalog.snapshot().version,
+        'pending_request_count': 0,
+    }
+    if user.is_authenticated:
+        data['profile'] = _profile_data(user)
+        data['pending_request_count'] = user.pending_request_count
+    return data
+
+
+def bootstrap(request: HttpRequest) -> JsonResponse:
+    """
+    Returns the SPA's startup state in one response, replacing separate
+    calls to the CSRF, auth, profile, hobbies and friend request endpoints.
+    """
+    if request.method == 'GET':
+        return JsonResponse(bootstrap_data(request))
+
+    return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+
 def is_authenticated(request: HttpRequest) -> JsonResponse:
     """
     Checks if the user is authenticated.
@@ -273,19 +401,37 @@ def login_api(request: HttpRequest) -> HttpResponse:
 
     Accepts a POST request with username and password. If authenticated, logs
     the user in and returns a redirect URL. Otherwise, returns an error.
+
+    The password is checked in the bounded hashing pool. Attempts for a
+    username and IP that failed too often are rejected with 429 before any
+    hashing, and 503 is returned when the pool is saturated.
     """
     if request.method == 'POST':
         data = json.loads(request.body)
         username = data.get('username')
         password = data.get('password')
+        ip = request.META.get('REMOTE_ADDR', '')
+
+        retry_after = login_throttle.retry_after(username, ip)
+        if retry_after is not None:
+            response = JsonResponse({'error': 'Too many failed login attempts. Try again later.'}, status=429)
+            response['Retry-After'] = str(math.ceil(retry_after))
+            return response
 
-        user = authenticate(request, username=username, password=password)
+        try:
+            user = hashing_pool.run(authenticate, request, username=username, password=password)
+        except PoolBusy:
+            response = JsonResponse({'error': 'The server is busy. Try again shortly.'}, status=503)
+            response['Retry-After'] = '1'
+            return response
 
         if user is not None:
+            login_throttle.record_success(username, ip)
             login(request, user)
             return JsonResponse({
                 'redirect_url': '/profile/'
             })
+        login_throttle.record_failure(username, ip)
         return JsonResponse({'error': 'Invalid credentials'}, status=401)
 
     return render(request, 'registration/login.html')
@@ -299,78 +445,115 @@ def logout_api(request: HttpRequest) -> HttpResponse:
     return redirect('api:login')
 
 
-def calculate_age(dob: date) -> int:
+@login_required(login_url='/login/')
+@replica_reads
+def user_similarity(request: HttpRequest) -> JsonResponse:
     """
-    Calculates a user's age based on their date of birth.
+    Retrieves a list of users similar to the current user based on shared hobbies.
 
-    Args:
-        dob (date): The user's date of birth.
+    Users can be filtered by age range and paginated. Similarity is determined
+    by the number of shared hobbies.
 
-    Returns:
-        int: The user's age.
+    Passing a `cursor` parameter (empty for the first page) switches from
+    page numbers to keyset pagination, which returns `next_cursor` instead
+    of `total_pages`.
+
+    When served from the precomputed table, the response includes
+    `computed_at`, and `max_staleness` (in seconds) queues a refresh of
+    results older than that, which are served until it has run.
+
+    Supports the compact format (see `api.compact`).
     """
-    today = date.today()
-    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-    return age
+    user = request.user
+    user_hobbies = set(user.hobbies.values_list('id', flat=True))
+
+    try:
+        rows, pagination = similar_users_page(user.id, user_hobbies, request.GET)
+    except ValidationError as e:
+        return JsonResponse({'error': e.message}, status=400)
+
+    if wants_compact(request):
+        cards = _similar_user_cards(user.id, rows, with_hobby_ids=True)
+        return compact_response(
+            request, 'users', cards, card_fields(shared_hobbies=True, mutual_friends=True), pagination
+        )
+    return JsonResponse({'users': _similar_user_cards(user.id, rows), **pagination})
 
 
 @login_required(login_url='/login/')
-def user_similarity(request: HttpRequest) -> JsonResponse:
+def similar_user_facets_view(request: HttpRequest) -> JsonResponse:
     """
-    Retrieves a list of users similar to the current user based on shared hobbies.
+    Returns how many similar users there are per age bucket and per number
+    of shared hobbies, so the filter UI can show counts before querying.
 
-    Users can be filtered by age range and paginated. Similarity is determined
-    by the number of shared hobbies.
+    `age_min` and `age_max` restrict the shared hobby counts to an age range.
     """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
     user = request.user
-    user_hobbies = set(user.hobbies.values_list('id', flat=True))
+    user_hobbies = hobby_index.hobbies_of(user.id)
 
-    # Fetch age filters from request
-    age_min = request.GET.get('age_min', None)
-    age_max = request.GET.get('age_max', None)
+    try:
+        age_min, age_max = parse_age_range(request.GET)
+    except ValidationError as e:
+        return JsonResponse({'error': e.message}, status=400)
 
-    # Fetch all users sharing hobbies with the current user, excluding the user
-    similar_users = User.objects.filter(hobbies__in=user_hobbies).exclude(id=user.id).distinct()
+    return JsonResponse(similar_user_facets(user.id, user_hobbies, age_min, age_max))
 
-    # Apply age filter if provided
-    if age_min is not None and age_max is not None:
-        age_min, age_max = int(age_min), int(age_max)
-        similar_users = [
-            u for u in similar_users
-            if age_min <= calculate_age(u.date_of_birth) <= age_max
-        ]
 
-    # Sort users by the number of shared hobbies (descending)
-    similar_users = sorted(
-        similar_users,
-        key=lambda u: len(set(u.hobbies.values_list('id', flat=True)) & user_hobbies),
-        reverse=True
+def _similar_user_cards(user_id: int, rows, with_hobby_ids: bool = False) -> list[dict]:
+    """
+    Builds the cards for a page of `(user_id, shared_count)` rows, including
+    how many friends each user has in common with the viewer.
+    """
+    user_ids = [other_id for other_id, _ in rows]
+    return user_cards(
+        user_ids,
+        shared_counts=dict(rows),
+        mutual_counts=friend_graph.mutual_counts(user_id, user_ids),
+        with_hobby_ids=with_hobby_ids,
     )
 
-    # Paginate the results
-    paginator = Paginator(similar_users, 10)  # 10 users per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
 
-    # Prepare response data
-    response_data = [
-        {
-            'username': u.username,
-            'email': u.email,
-            'age': calculate_age(u.date_of_birth),
-            'shared_hobbies': len(set(u.hobbies.values_list('id', flat=True)) & user_hobbies),
-            'hobbies': list(u.hobbies.values_list('name', flat=True)),
-        }
-        for u in page_obj
-    ]
+@login_required(login_url='/login/')
+def people_you_may_know(request: HttpRequest) -> JsonResponse:
+    """
+    Suggests friends of friends the user may know.
 
-    return JsonResponse({
-        'users': response_data,
-        'has_next': page_obj.has_next(),
-        'has_previous': page_obj.has_previous(),
-        'page_number': page_obj.number,
-        'total_pages': paginator.num_pages,
-    })
+    Candidates come from a bounded two-hop search of the in-memory friend
+    graph and are ranked by mutual friends combined with shared hobbies.
+    Users who already have a pending request from the user are skipped.
+    `limit` (10 by default, at most 50) caps the number of suggestions.
+    """
+    if request.method == 'GET':
+        user = request.user
+        try:
+            limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be a number.'}, status=400)
+
+        mutual_counts = friend_graph.friends_of_friends(user.id)
+        shared_counts = hobby_index.shared_counts(user.hobbies.values_list('id', flat=True), exclude=user.id)
+        requested = set(FriendRequests.objects.filter(sender=user).values_list('receiver_id', flat=True))
+
+        ranked = heapq.nsmallest(
+            limit,
+            (
+                (-(MUTUAL_FRIEND_WEIGHT * mutual + shared_counts.get(other_id, 0)), other_id)
+                for other_id, mutual in mutual_counts.items()
+                if other_id not in requested
+            ),
+        )
+        suggestions = user_cards(
+            [other_id for _, other_id in ranked],
+            shared_counts=shared_counts,
+            mutual_counts=mutual_counts,
+        )
+
+        return JsonResponse({'users': suggestions}, status=200)
+
+    return JsonResponse({'error': 'Invalid request method.'}, status=405)
 
 
 @login_required(login_url='api:login')
@@ -419,33 +602,110 @@ def password_update_page(request: HttpRequest) -> HttpResponse:
 
 
 @login_required(login_url='/login/')
+@replica_reads
 def hobbies_api(request: HttpRequest) -> JsonResponse:
     """
     Handles the hobbies API.
 
-    GET: Returns a list of all hobbies.
-    POST: Creates a new hobby and returns its data.
+    GET: Returns a list of all hobbies from the cached catalog, or 304 Not
+        Modified if the client's `If-None-Match` matches its ETag.
+    POST: Creates a hobby from `name`, or several from a `names` list, and
+        returns their data. Names matching an existing hobby regardless of
+        case return that hobby instead of creating a duplicate.
     """
     if request.method == 'GET':
         try:
-            hobbies = Hobby.objects.all()
-            hobbies_data = [{"id": hobby.id, "name": hobby.name} for hobby in hobbies]
-            return JsonResponse(hobbies_data, safe=False)
+            return catalog_response(request, hobby_catalog.snapshot())
         except Exception as e:
             return JsonResponse({"error": str(e)})
 
     elif request.method == 'POST':
         try:
-            data = json.loads(request.body)
-            hobby = Hobby.objects.create(name=data['name'])
-            hobby_data = {"id": hobby.id, "name": hobby.name}
-            return JsonResponse(hobby_data)
+            return create_hobbies(json.loads(request.body))
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
         except Exception as e:
             return JsonResponse({"error": str(e)})
     else:
         return JsonResponse({"error": "Invalid request method."}, status=405)
 
 
+def create_hobbies(data: dict) -> JsonResponse:
+    """
+    Creates the hobbies named in a `hobbies_api` POST body, skipping
+    case-insensitive duplicates.
+    """
+    if not isinstance(data, dict) or ('name' not in data and 'names' not in data):
+        return JsonResponse({"error": "A hobby name or list of names is required."}, status=400)
+    if 'names' in data and not isinstance(data['names'], list):
+        return JsonResponse({"error": "names must be a list."}, status=400)
+
+    try:
+        if 'names' in data:
+            hobbies = get_or_create_hobbies(data['names'])
+            return JsonResponse({
+                "hobbies": [
+                    {"id": hobby_id, "name": name, "created": created}
+                    for hobby_id, name, created in hobbies
+                ]
+            })
+
+        [(hobby_id, name, created)] = get_or_create_hobbies([data['name']])
+        return JsonResponse({"id": hobby_id, "name": name, "created": created})
+    except ValidationError as e:
+        return JsonResponse({"error": e.message}, status=400)
+
+
+@login_required(login_url='/login/')
+def search(request: HttpRequest) -> JsonResponse:
+    """
+    Searches hobbies and usernames by prefix, with fuzzy matching for
+    typos.
+
+    Accepts a GET request with the text in `q`, an optional `type`
+    ('hobbies' or 'users', both by default) and `limit` (10 by default, at
+    most 50), and returns the best matches first.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+    query = request.GET.get('q', '')
+    kinds = [request.GET['type']] if 'type' in request.GET else ['hobbies', 'users']
+    if any(kind not in ('hobbies', 'users') for kind in kinds):
+        return JsonResponse({'error': "type must be 'hobbies' or 'users'."}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number.'}, status=400)
+
+    response_data = {}
+    if 'hobbies' in kinds:
+        response_data['hobbies'] = [
+            {'id': hobby_id, 'name': name}
+            for hobby_id, name in search_index.search('hobbies', query, limit)
+        ]
+    if 'users' in kinds:
+        response_data['users'] = [
+            {'username': username}
+            for _, username in search_index.search('users', query, limit)
+        ]
+    return JsonResponse(response_data)
+
+
+def catalog_response(request: HttpRequest, catalog: CatalogSnapshot) -> HttpResponse:
+    """
+    Serves a catalog snapshot, or 304 Not Modified if the client's
+    `If-None-Match` matches its ETag.
+    """
+    if catalog.etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(catalog.body, content_type='application/json')
+    response['ETag'] = catalog.etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @login_required(login_url='/login/')
 def send_friend_request(request: HttpRequest) -> JsonResponse:
     """
@@ -470,7 +730,9 @@ def send_friend_request(request: HttpRequest) -> JsonResponse:
             if FriendRequests.objects.filter(sender=user, receiver=potential_friend).exists():
                 return JsonResponse({"message": "Friend request already sent."}, status=400)
 
-            FriendRequests.objects.create(sender=user, receiver=potential_friend)
+            friend_request = create_friend_request(user, potential_friend)
+            [card] = user_cards([user.id])
+            notify(potential_friend.id, 'friend_request.received', {'id': friend_request.id, **card})
             return JsonResponse({"message": "Friend request sent successfully."}, status=200)
 
         except User.DoesNotExist:
@@ -498,11 +760,11 @@ def friend_requests_received(request: HttpRequest) -> HttpResponse:
     # Calculate shared hobbies count and hobbies list for each sender
     friend_request_info = [
         {
-            'sender': User.objects.get(pk=sender_id),
-            'shared_hobbies_count': len(user_hobbies & set(User.objects.get(pk=sender_id).hobbies.values_list('id', flat=True))),
-            'hobbies': list(User.objects.get(pk=sender_id).hobbies.values_list('name', flat=True)),
+            'sender': card,
+            'shared_hobbies_count': card['shared_hobbies'],
+            'hobbies': card['hobbies'],
         }
-        for sender_id in friend_request_senders
+        for card in user_cards(list(friend_request_senders), viewer_hobbies=user_hobbies)
     ]
 
     return render(request, 'registration/friend_requests_received.html', {'friend_request_info': friend_request_info})
@@ -523,18 +785,18 @@ def friend_request_accepter_deleter(request: HttpRequest) -> HttpResponse:
     try:
         friend_object = User.objects.get(username=friend_name)
         record = FriendRequests.objects.get(sender=friend_object, receiver=user)
-        record.delete()
 
-        # If the request is to accept the friend request
-        if request.method == 'PUT':
-            if friend_object in user.friends_list.all():
-                return HttpResponse("You are already friends with this person!")
-            user.friends_list.add(friend_object)
-            friend_object.friends_list.add(user)
-            return HttpResponse("Friend request accepted!")
+        with transaction.atomic():
+            delete_friend_requests(FriendRequests.objects.filter(id=record.id))
+
+            # If the request is to accept the friend request
+            if request.method == 'PUT':
+                if not add_friends(user, [friend_object.id]):
+                    return HttpResponse("You are already friends with this person!")
+                return HttpResponse("Friend request accepted!")
 
         # If the request is to delete the friend request
-        elif request.method == 'DELETE':
+        if request.method == 'DELETE':
             return HttpResponse("Friend request deleted!")
 
         return HttpResponse("Invalid request method!")
@@ -558,40 +820,51 @@ def edit_friends(request: HttpRequest) -> HttpResponse:
 
         try:
             friend_to_remove = User.objects.get(username=friend_to_remove_username)
-            user.friends_list.remove(friend_to_remove)
-            friend_to_remove.friends_list.remove(user)
+            remove_friends(user, [friend_to_remove.id])
             return HttpResponse("Friend removed!")
         except ObjectDoesNotExist:
             return HttpResponse("Friend not found!", status=404)
 
-    return render(request, 'registration/edit_friends.html', {'friends': user.friends_list.all()})
+    # Show one page of friends at a time, counted from the denormalized counter
+    paginator = Paginator(user.friends_list.order_by('username', 'id'), getattr(settings, 'FRIENDS_PAGE_SIZE', 50))
+    paginator.count = user.friend_count
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    return render(request, 'registration/edit_friends.html', {'friends': page_obj.object_list, 'page_obj': page_obj})
 
 
 @login_required(login_url='/login/')
-def get_user_list_with_friend_flags(request: HttpRequest) -> JsonResponse:
+def get_user_list_with_friend_flags(request: HttpRequest) -> StreamingHttpResponse:
     """
-    Retrieves a list of all users excluding the current user, along with friendship and friend request statuses.
+    Streams a directory of all users excluding the current user, along with friendship and friend request statuses.
 
-    The response includes:
+    The response is newline-delimited JSON with one object per user holding:
         - Username, email, and age.
         - Hobbies.
         - Flags indicating if a friend request has been sent or if the user is already a friend.
     """
     current_user = request.user
-    users = User.objects.exclude(id=current_user.id)
-    response_data = [
-        {
-            'username': user.username,
-            'email': user.email,
-            'age': user.profile.age,  # Assuming age is stored in a related profile model
-            'hobbies': list(user.hobbies.values_list('name', flat=True)),
-            'friend_request_sent': FriendRequests.objects.filter(sender=current_user, receiver=user).exists(),
-            'is_friend': user in current_user.friends_list.all(),
-        }
-        for user in users
-    ]
 
-    return JsonResponse({'users': response_data})
+    # Load the caller's friends and sent requests once, as sets
+    friend_ids = set(current_user.friends_list.values_list('id', flat=True))
+    sent_request_ids = set(
+        FriendRequests.objects.filter(sender=current_user).values_list('receiver_id', flat=True)
+    )
+    users = User.objects.exclude(id=current_user.id).order_by('id')
+
+    def stream():
+        # Write one chunk of lines at a time rather than one per user
+        lines = []
+        for user_id, card in iter_user_cards(users):
+            card['friend_request_sent'] = user_id in sent_request_ids
+            card['is_friend'] = user_id in friend_ids
+            lines.append(json.dumps(card) + '\n')
+            if len(lines) >= 1000:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
 
 
 @login_required(login_url='/login/')
@@ -599,26 +872,63 @@ def delete_user(request: HttpRequest) -> JsonResponse:
     """
     Deletes the logged-in user from the database, along with their friend requests.
 
-    DELETE: Deletes the user and all related friend requests, then redirects to the login page.
+    DELETE: Deactivates the user, which ends all of their sessions, logs them
+        out and queues the deletion of the user and all related friend
+        requests as a background job.
     """
     if request.method == 'DELETE':
         current_user = request.user
 
-        try:
-            # Delete the user and their friend requests
-            current_user.delete()
-            FriendRequests.objects.filter(sender=current_user).delete()
-            FriendRequests.objects.filter(receiver=current_user).delete()
-            return JsonResponse({"success": "Successfully deleted the user."}, status=200)
-        except ObjectDoesNotExist:
-            return JsonResponse({"error": "Unable to delete user"}, status=404)
+        with transaction.atomic():
+            User.objects.filter(pk=current_user.pk).update(is_active=False)
+            enqueue('delete_user', {'user_id': current_user.pk}, key=str(current_user.pk))
+        logout(request)
+        return JsonResponse({"success": "Successfully deleted the user."}, status=202)
 
     return JsonResponse({"error": "Invalid request method."}, status=405)
 
 
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Exposes the per-view request and SQL metrics in Prometheus text format.
+
+    Only staff users and clients listed in `settings.INTERNAL_IPS` can read
+    them; everyone else gets a 404.
+    """
+    if not _is_internal(request):
+        return JsonResponse({'error': 'Not found.'}, status=404)
+
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def page_view_counts(request: HttpRequest) -> JsonResponse:
+    """
+    Returns the view count of every page, including views not yet written
+    to the database. Repeat the `page` parameter to only count some pages.
+
+    Only staff users and clients listed in `settings.INTERNAL_IPS` can read
+    them; everyone else gets a 404.
+    """
+    if not _is_internal(request):
+        return JsonResponse({'error': 'Not found.'}, status=404)
+
+    pages = request.GET.getlist('page') or None
+    return JsonResponse({'page_views': page_views.counts(pages)})
+
+
+def _is_internal(request: HttpRequest) -> bool:
+    return request.user.is_staff or request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', [])
+
+
 @login_required(login_url='/login/')
 def main_spa(request: HttpRequest) -> HttpResponse:
     """
     Renders the Single Page Application (SPA) entry point for the web application.
+
+    The bootstrap data is embedded in the page, so the SPA can start without
+    any further requests.
     """
-    return render(request, 'api/spa/index.html', {})
+    page_views.increment(request.path)
+
+    bootstrap_json = json.dumps(bootstrap_data(request), cls=DjangoJSONEncoder).translate(JSON_SCRIPT_ESCAPES)
+    return render(request, 'api/spa/index.html', {'bootstrap_json': mark_safe(bootstrap_json)})
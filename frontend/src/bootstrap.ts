@@ -0,0 +1,54 @@
+// Startup state for the SPA: auth state, CSRF token, profile, hobby catalog
+// version and pending friend request count, fetched in one round trip.
+// When the page is served by Django the data is embedded in index.html,
+// so first paint needs no request at all.
+
+export interface BootstrapData {
+  authenticated: boolean;
+  csrfToken: string;
+  profile: Record<string, any> | null;
+  hobby_catalog_version: string;
+  pending_request_count: number;
+}
+
+let bootstrapPromise: Promise<BootstrapData> | null = null;
+
+function readEmbedded(): BootstrapData | null {
+  const element = document.getElementById("bootstrap-data");
+  if (!element || !element.textContent) return null;
+  try {
+    return JSON.parse(element.textContent);
+  } catch {
+    return null; // Not rendered by Django (e.g. the Vite dev server)
+  }
+}
+
+async function fetchBootstrap(): Promise<BootstrapData> {
+  const response = await fetch("/api/bootstrap/", {
+    credentials: "include", // Ensure cookies are sent for session authentication
+  });
+  if (!response.ok) {
+    throw new Error(`Failed to load bootstrap data. Status: ${response.status}`);
+  }
+  return response.json();
+}
+
+export function loadBootstrap(): Promise<BootstrapData> {
+  if (!bootstrapPromise) {
+    const embedded = readEmbedded();
+    bootstrapPromise = embedded ? Promise.resolve(embedded) : fetchBootstrap();
+    bootstrapPromise.catch(() => {
+      bootstrapPromise = null; // Retry on the next call
+    });
+  }
+  return bootstrapPromise;
+}
+
+export async function getCsrfToken(): Promise<string> {
+  try {
+    return (await loadBootstrap()).csrfToken;
+  } catch (error) {
+    alert("Error fetching CSRF token:" + error);
+    return "";
+  }
+}
@@ -1,4 +1,5 @@
 import { createRouter, createWebHistory } from "vue-router";
+import { loadBootstrap } from "../bootstrap";
 
 // Import route components
 import Profile from "../pages/Profile.vue";
@@ -28,19 +29,12 @@ const router = createRouter({
 router.beforeEach(async (to: any, _from: any, next: any) => {
   if (to.meta.requiresAuth) {
     try {
-      const response = await fetch("/api/authenticated/", {
-        credentials: "include", // Ensure cookies are sent for session authentication
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        if (data.authenticated) {
-          next(); // Allow access if authenticated
-        } else {
-          window.location.href = "/login/"; // Redirect to login
-        }
+      // Auth state comes from the bootstrap data, loaded once per page load
+      const data = await loadBootstrap();
+      if (data.authenticated) {
+        next(); // Allow access if authenticated
       } else {
-        window.location.href = "/login/"; // Redirect to login if not authenticated
+        window.location.href = "/login/"; // Redirect to login
       }
     } catch (error) {
       console.error("Error during authentication check:", error);
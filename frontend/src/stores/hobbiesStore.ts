@@ -4,6 +4,7 @@ import { ref } from 'vue';
 export const useHobbiesStore = defineStore('hobbies', () => {
   const hobbies = ref<Hobby[]>([]);
   const isLoading = ref(false);
+  const etag = ref<string | null>(null); // Catalog version the store currently holds
 
   interface Hobby {
     id: number;
@@ -13,12 +14,21 @@ export const useHobbiesStore = defineStore('hobbies', () => {
   const fetchHobbies = async () => {
     isLoading.value = true;
     try {
+      const headers: Record<string, string> = {};
+      if (etag.value) headers['If-None-Match'] = etag.value; // Revalidate instead of re-downloading
+
       const response = await fetch(`/api/hobbies/`, {
         method: 'GET',
         credentials: 'include', // Ensures cookies are sent for authentication
+        cache: 'no-store',
+        headers,
       });
+      if (response.status === 304) {
+        return; // Catalog unchanged, keep the hobbies we already have
+      }
       if (response.ok) {
         hobbies.value = await response.json();
+        etag.value = response.headers.get('ETag');
         console.log('Hobbies fetched:', hobbies.value);
       } else {
         console.error(`Failed to fetch hobbies. Status: ${response.status}`);